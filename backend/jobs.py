@@ -0,0 +1,449 @@
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import threading
+import subprocess
+import importlib.util
+from collections import OrderedDict
+
+from metrics_export import fusionner_expositions, ajouter_famille, formater
+
+# Chemin absolu vers data/main.py, quel que soit le répertoire de lancement du backend
+MAIN_PY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'main.py')
+# Configuration des RPA, chargée par son chemin : l'__init__ du paquet rpa_modules importe selenium
+CONFIG_PY_PATH = os.path.join(os.path.dirname(MAIN_PY_PATH), 'rpa_modules', 'config.py')
+
+# RPA lançables : étiquette "rpa" de leurs lignes dans timings_contrats.jsonl et fichier d'arrêt coopératif
+RPAS = {
+    "Affranchigo": {"temps": "affranchigo", "arret": "affranchigo.stop"},
+    "CasDematerialisation": {"temps": "dematerialisation", "arret": None},
+    "Extraction": {"temps": "extraction", "arret": None},
+    "PortageRepas": {"temps": None, "arret": None},
+    "Seres": {"temps": "seres", "arret": None},
+}
+
+# Options d'un job transmises à main.py : clé JSON -> (option de la ligne de commande, type)
+OPTIONS = {
+    "mode": ("--mode", str),
+    "ready_at": ("--ready-at", int),
+    "browser": ("--browser", str),
+    "preset": ("--preset", str),
+    "pool_size": ("--pool-size", int),
+    "shards": ("--shards", int),
+}
+
+EN_COURS = "en_cours"
+ARRET_DEMANDE = "arret_demande"
+TERMINE = "termine"
+ECHOUE = "echoue"
+ARRETE = "arrete"
+
+# Délai laissé à un RPA pour terminer ses contrats en cours avant un arrêt forcé
+ARRET_TIMEOUT = 180
+# Intervalle de récupération des processus terminés (code de sortie, plus de processus zombie)
+SURVEILLANCE_INTERVALLE = 2
+# Nombre maximal de jobs actifs sur l'hôte, tous RPA confondus
+MAX_JOBS_ACTIFS = int(os.getenv('RPA_MAX_JOBS', 4))
+# Jobs terminés gardés pour /jobs
+HISTORIQUE_MAX = 50
+TIMINGS_FILE = "timings_contrats.jsonl"
+# Fichiers de progression écrits par les RPA (un par job, via RPA_PROGRESS_FILE)
+DOSSIER_PROGRESSION = "progression"
+# Métriques au format Prometheus écrites par les RPA (un fichier par job, via RPA_METRICS_FILE)
+DOSSIER_METRIQUES = "metrics"
+# Dossiers des workers d'une exécution répartie (voir rpa_modules.sharding)
+DOSSIER_SHARDS = "shards"
+FICHIER_METRIQUES_SHARD = "metrics.prom"
+
+
+class ErreurJob(Exception):
+    """
+    Demande refusée par le gestionnaire de jobs, avec le code HTTP à renvoyer.
+    """
+    def __init__(self, message, code=400):
+        super().__init__(message)
+        self.code = code
+
+
+def terminer_arborescence(process):
+    """
+    Termine un processus RPA et ses descendants (drivers et navigateurs), pour ne pas laisser de
+    processus Edge orphelins après un arrêt forcé.
+    """
+    if process.poll() is not None:
+        return
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/PID', str(process.pid), '/T', '/F'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try:
+            # Le job a été lancé dans sa propre session : son groupe regroupe toute l'arborescence
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class Job:
+    def __init__(self, rpa, max_workers, options, state_dir):
+        """
+        Exécution d'un RPA dans un sous-processus, identifiée par un run id.
+        :param rpa: Nom du RPA (voir RPAS).
+        :param max_workers: Nombre de threads de traitement du job (None : valeur par défaut de main.py).
+        :param options: Options transmises à main.py (voir OPTIONS).
+        :param state_dir: Dossier d'état où le RPA écrit timings_contrats.jsonl et sa progression.
+        """
+        self.id = uuid.uuid4().hex[:8]
+        self.rpa = rpa
+        self.max_workers = max_workers
+        self.options = options
+        self.etat = EN_COURS
+        self.code_sortie = None
+        self.debut = time.time()
+        self.fin = None
+        self.process = None
+        # Chemin absolu transmis au RPA (RPA_STOP_FILE) : le backend, le coordinateur et les shards voient le même fichier
+        self.fichier_arret = os.path.abspath(os.path.join(state_dir, RPAS[rpa]["arret"])) if RPAS[rpa]["arret"] else None
+        self.lock = threading.Lock()
+        # Progression lue de façon incrémentale dans les temps par contrat, à partir du démarrage du job
+        self.chemin_temps = os.path.join(state_dir, TIMINGS_FILE)
+        self._offset_temps = os.path.getsize(self.chemin_temps) if os.path.exists(self.chemin_temps) else 0
+        self._progression = {"traites": 0, "echecs": 0, "par_type": {}}
+        # Canal de progression du RPA : fichier JSON réécrit de façon atomique par rpa_modules.progress
+        self.chemin_progression = os.path.join(state_dir, DOSSIER_PROGRESSION, f"{self.id}.json")
+        self.chemin_metriques = os.path.join(state_dir, DOSSIER_METRIQUES, f"{self.id}.prom")
+        self.state_dir = state_dir
+
+    def commande(self):
+        commande = [sys.executable, MAIN_PY_PATH, self.rpa]
+        if self.max_workers:
+            commande.append(str(self.max_workers))
+        for cle, valeur in self.options.items():
+            commande += [OPTIONS[cle][0], str(valeur)]
+        return commande
+
+    def demarrer(self):
+        # Une demande d'arrêt restée d'une exécution précédente arrêterait le job dès son démarrage
+        self.effacer_demande_arret()
+        # Dossier d'état transmis explicitement : le RPA écrit là où le backend lit
+        environnement = {**os.environ, "RPA_STATE_DIR": self.state_dir,
+                         "RPA_PROGRESS_FILE": self.chemin_progression, "RPA_METRICS_FILE": self.chemin_metriques}
+        if self.fichier_arret:
+            environnement["RPA_STOP_FILE"] = self.fichier_arret
+        if os.name == 'nt':
+            self.process = subprocess.Popen(self.commande(), env=environnement, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            self.process = subprocess.Popen(self.commande(), env=environnement, start_new_session=True)
+
+    def actif(self):
+        return self.etat in (EN_COURS, ARRET_DEMANDE)
+
+    def recuperer(self):
+        """
+        Relève le code de sortie si le processus est terminé (poll() libère le processus zombie).
+        :return: True si le job vient de se terminer.
+        """
+        with self.lock:
+            if not self.actif() or self.process.poll() is None:
+                return False
+            self.code_sortie = self.process.returncode
+            self.fin = time.time()
+            if self.etat == ARRET_DEMANDE:
+                self.etat = ARRETE
+            else:
+                self.etat = TERMINE if self.code_sortie == 0 else ECHOUE
+        self.effacer_demande_arret()
+        return True
+
+    def arreter(self, timeout=ARRET_TIMEOUT):
+        """
+        Arrêt coopératif si le RPA le gère (il ne soumet plus de contrat et termine ceux en cours),
+        puis arrêt forcé de toute l'arborescence après le délai.
+        """
+        with self.lock:
+            if self.etat != EN_COURS:
+                return
+            self.etat = ARRET_DEMANDE
+        if self.fichier_arret:
+            open(self.fichier_arret, 'w').close()
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                pass
+        terminer_arborescence(self.process)
+        self.recuperer()
+
+    def effacer_demande_arret(self):
+        if self.fichier_arret and os.path.exists(self.fichier_arret):
+            os.remove(self.fichier_arret)
+
+    def progression(self):
+        """
+        Progression publiée par le RPA (terminés, échecs, restants, débit, ETA, répartition par type),
+        ou à défaut les compteurs relevés dans timings_contrats.jsonl.
+        """
+        try:
+            with open(self.chemin_progression, 'r', encoding='utf-8') as file:
+                progression = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return {**self.compteurs_temps(), "source": "temps"}
+        # Ancienneté de la dernière écriture : un RPA bloqué cesse de mettre à jour son fichier
+        progression["age_secondes"] = round(time.time() - progression.get("maj", time.time()), 1)
+        progression["source"] = "rpa"
+        return progression
+
+    def compteurs_temps(self):
+        """
+        Compteurs du job : contrats terminés, en erreur et répartition par type, d'après les lignes
+        "contrat" ajoutées à timings_contrats.jsonl depuis son démarrage.
+        """
+        etiquette = RPAS[self.rpa]["temps"]
+        with self.lock:
+            if etiquette and os.path.exists(self.chemin_temps):
+                with open(self.chemin_temps, 'rb') as file:
+                    if os.fstat(file.fileno()).st_size < self._offset_temps:
+                        self._offset_temps = 0  # Fichier remplacé depuis le démarrage
+                    file.seek(self._offset_temps)
+                    donnees = file.read()
+                # Seules les lignes complètes sont comptées ; la suivante le sera au prochain appel
+                donnees = donnees[:donnees.rfind(b"\n") + 1]
+                self._offset_temps += len(donnees)
+                for ligne in donnees.decode('utf-8', errors='replace').splitlines():
+                    try:
+                        entree = json.loads(ligne)
+                    except json.JSONDecodeError:
+                        continue
+                    if entree.get("etape") != "contrat" or entree.get("rpa") != etiquette:
+                        continue
+                    self._progression["traites"] += 1
+                    if entree.get("erreur"):
+                        self._progression["echecs"] += 1
+                    type_contrat = entree.get("type_contrat") or "inconnu"
+                    self._progression["par_type"][type_contrat] = self._progression["par_type"].get(type_contrat, 0) + 1
+            return {**self._progression, "par_type": dict(self._progression["par_type"])}
+
+    def fichiers_metriques(self):
+        """
+        Fichiers de métriques du job et étiquettes à ajouter : un par worker pour une exécution répartie.
+        """
+        etiquettes = {"job": self.id}
+        nombre_shards = self.options.get("shards")
+        if not nombre_shards:
+            return [(self.chemin_metriques, etiquettes)]
+        return [
+            (os.path.join(self.state_dir, DOSSIER_SHARDS, f"{index}-{nombre_shards}", FICHIER_METRIQUES_SHARD),
+             {**etiquettes, "shard": f"{index}/{nombre_shards}"})
+            for index in range(nombre_shards)
+        ]
+
+    def statut(self):
+        fin = self.fin or time.time()
+        return {
+            "id": self.id,
+            "rpa": self.rpa,
+            "etat": self.etat,
+            "pid": self.process.pid if self.process else None,
+            "max_workers": self.max_workers,
+            "options": self.options,
+            "code_sortie": self.code_sortie,
+            "debut": self.debut,
+            "fin": self.fin,
+            "duree": round(fin - self.debut, 1),
+            "progression": self.progression(),
+        }
+
+
+def charger_config_rpa():
+    """
+    Résout la configuration des RPA (rpa_config.json, variables RPA_*) comme le fait main.py.
+    """
+    spec = importlib.util.spec_from_file_location("rpa_config", CONFIG_PY_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.load_config()
+
+
+class GestionnaireJobs:
+    def __init__(self, state_dir=None, max_actifs=MAX_JOBS_ACTIFS):
+        """
+        Registre des exécutions de RPA du backend : démarrage, arrêt et statut par run id, plusieurs
+        RPA en parallèle sur le même hôte.
+
+        Un seul job actif par RPA : les exécutions d'un même RPA partagent le journal, le fichier
+        d'arrêt et les CSV du dossier d'état (pour paralléliser Affranchigo, utiliser l'option shards).
+        :param state_dir: Dossier d'état des RPA (par défaut, celui de leur configuration : RPA_STATE_DIR,
+                          rpa_config.json ou le répertoire courant).
+        :param max_actifs: Nombre maximal de jobs actifs, tous RPA confondus.
+        """
+        self.state_dir = os.path.abspath(state_dir or charger_config_rpa().state_dir)
+        self.max_actifs = max_actifs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self._surveillance = None
+
+    def demarrer(self, rpa, max_workers=None, options=None):
+        """
+        Démarre un job.
+        :raises ErreurJob: RPA inconnu, option invalide, RPA déjà en cours ou trop de jobs actifs.
+        """
+        if rpa not in RPAS:
+            raise ErreurJob(f"RPA inconnu : {rpa} (disponibles : {', '.join(RPAS)})", 404)
+        options = self._valider_options(options or {})
+        if max_workers is not None:
+            try:
+                max_workers = int(max_workers)
+            except (TypeError, ValueError):
+                raise ErreurJob(f"max_workers invalide : {max_workers!r}")
+            if max_workers < 1:
+                raise ErreurJob("max_workers doit être supérieur ou égal à 1")
+
+        self.recuperer()
+        with self.lock:
+            actifs = [job for job in self.jobs.values() if job.actif()]
+            if any(job.rpa == rpa for job in actifs):
+                raise ErreurJob(f"RPA {rpa} déjà en cours", 409)
+            if len(actifs) >= self.max_actifs:
+                raise ErreurJob(f"{len(actifs)} job(s) déjà en cours (maximum {self.max_actifs})", 429)
+            job = Job(rpa, max_workers, options, self.state_dir)
+            job.demarrer()
+            self.jobs[job.id] = job
+        self.demarrer_surveillance()
+        return job
+
+    def arreter(self, job_id, attendre=False):
+        """
+        Demande l'arrêt d'un job ; l'attente de fin se fait en arrière-plan sauf si `attendre`.
+        :raises ErreurJob: Job inconnu ou déjà terminé.
+        """
+        job = self.job(job_id)
+        self.recuperer()
+        if job.etat != EN_COURS:
+            raise ErreurJob(f"Job {job_id} ({job.rpa}) non actif : {job.etat}", 409)
+        if attendre:
+            job.arreter()
+        else:
+            threading.Thread(target=job.arreter, daemon=True).start()
+        return job
+
+    def job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise ErreurJob(f"Job inconnu : {job_id}", 404)
+        return job
+
+    def job_actif(self, rpa):
+        """
+        Job actif d'un RPA, ou None.
+        """
+        self.recuperer()
+        with self.lock:
+            return next((job for job in self.jobs.values() if job.rpa == rpa and job.actif()), None)
+
+    def dernier_job(self, rpa):
+        with self.lock:
+            return next((job for job in reversed(self.jobs.values()) if job.rpa == rpa), None)
+
+    def progressions(self):
+        """
+        Progression des jobs actifs, par run id.
+        """
+        self.recuperer()
+        with self.lock:
+            actifs = [job for job in self.jobs.values() if job.actif()]
+        return {job.id: {"rpa": job.rpa, "etat_job": job.etat, **job.progression()} for job in actifs}
+
+    def metriques(self):
+        """
+        Métriques de tous les jobs connus, fusionnées, et métriques du registre lui-même.
+        """
+        self.recuperer()
+        with self.lock:
+            jobs = list(self.jobs.values())
+        sources = []
+        for job in jobs:
+            for chemin, etiquettes in job.fichiers_metriques():
+                try:
+                    with open(chemin, 'r', encoding='utf-8') as file:
+                        sources.append((file.read(), etiquettes))
+                except OSError:
+                    continue
+        familles = fusionner_expositions(sources)
+        ajouter_famille(familles, "rpa_jobs_actifs", "Jobs en cours, par RPA.", "gauge",
+                        [({"rpa": rpa}, sum(1 for job in jobs if job.rpa == rpa and job.actif())) for rpa in RPAS])
+        ajouter_famille(familles, "rpa_job_info", "RPA et état de chaque job connu.", "gauge",
+                        [({"job": job.id, "rpa": job.rpa, "etat": job.etat}, 1) for job in jobs])
+        ajouter_famille(familles, "rpa_job_code_sortie", "Code de sortie des jobs terminés.", "gauge",
+                        [({"job": job.id, "rpa": job.rpa}, job.code_sortie) for job in jobs if job.code_sortie is not None])
+        return formater(familles)
+
+    def lister(self, rpa=None):
+        self.recuperer()
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if rpa is None or job.rpa == rpa]
+        return [job.statut() for job in jobs]
+
+    def recuperer(self):
+        """
+        Relève les codes de sortie des jobs terminés et purge l'historique au-delà de HISTORIQUE_MAX.
+        """
+        with self.lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.recuperer()
+        with self.lock:
+            termines = [job_id for job_id, job in self.jobs.items() if not job.actif()]
+            for job_id in termines[:max(0, len(termines) - HISTORIQUE_MAX)]:
+                job = self.jobs.pop(job_id)
+                for chemin in (job.chemin_progression, job.chemin_metriques):
+                    if os.path.exists(chemin):
+                        os.remove(chemin)
+
+    def demarrer_surveillance(self):
+        """
+        Démarre (une seule fois) le thread qui récupère les processus terminés, même sans appel à l'API.
+        """
+        with self.lock:
+            if self._surveillance is not None:
+                return
+            self._surveillance = threading.Thread(target=self._surveiller, daemon=True)
+        self._surveillance.start()
+
+    def _surveiller(self):
+        while True:
+            time.sleep(SURVEILLANCE_INTERVALLE)
+            self.recuperer()
+
+    def arreter_tout(self):
+        """
+        Arrête tous les jobs actifs (arrêt du backend), navigateurs compris.
+        """
+        with self.lock:
+            actifs = [job for job in self.jobs.values() if job.actif()]
+        for job in actifs:
+            with job.lock:
+                job.etat = ARRET_DEMANDE
+            terminer_arborescence(job.process)
+            job.recuperer()
+
+    @staticmethod
+    def _valider_options(options):
+        inconnues = set(options) - set(OPTIONS)
+        if inconnues:
+            raise ErreurJob(f"Options inconnues : {', '.join(sorted(inconnues))} (disponibles : {', '.join(OPTIONS)})")
+        valides = {}
+        for cle, valeur in options.items():
+            if valeur is None:
+                continue
+            try:
+                valides[cle] = OPTIONS[cle][1](valeur)
+            except (TypeError, ValueError):
+                raise ErreurJob(f"Option {cle} invalide : {valeur!r}")
+        return valides
@@ -0,0 +1,126 @@
+import os
+import re
+
+# Volume maximal renvoyé par lecture : un client en retard rattrape le fichier en plusieurs appels
+MAX_OCTETS = 256 * 1024
+# Premier appel sans curseur : seule la fin du fichier est renvoyée
+OCTETS_INITIAUX = 64 * 1024
+NIVEAUX = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+# Format de debug.setup_logger : "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+MOTIF_NIVEAU = re.compile(r"^\S+ \S+ - \S+ - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ")
+
+
+def formater_curseur(inode, offset):
+    return f"{inode}:{offset}"
+
+
+def lire_curseur(curseur):
+    """
+    Lit un curseur "inode:offset" (ou un simple offset).
+    :return: Tuple (inode ou None, offset), ou (None, None) si le curseur est absent ou invalide.
+    """
+    if not curseur:
+        return None, None
+    try:
+        if ":" in curseur:
+            inode, offset = curseur.split(":", 1)
+            return int(inode), max(0, int(offset))
+        return None, max(0, int(curseur))
+    except ValueError:
+        return None, None
+
+
+def niveau_minimal(niveau):
+    """
+    Niveaux retenus pour un niveau minimal donné (WARNING : WARNING, ERROR et CRITICAL).
+    :raises ValueError: Si le niveau est inconnu.
+    """
+    if not niveau:
+        return None
+    niveau = niveau.upper()
+    if niveau not in NIVEAUX:
+        raise ValueError(f"Niveau inconnu : {niveau} (disponibles : {', '.join(NIVEAUX)})")
+    return set(NIVEAUX[NIVEAUX.index(niveau):])
+
+
+def indices_retenus(lignes, niveaux=None, contrat=None):
+    """
+    Indices des lignes retenues par niveau et par numéro de contrat. Les lignes de continuation
+    (traceback) suivent le sort de la ligne qui les précède.
+    """
+    retenus = []
+    garder = niveaux is None and not contrat
+    for index, ligne in enumerate(lignes):
+        correspondance = MOTIF_NIVEAU.match(ligne)
+        if correspondance:
+            garder = niveaux is None or correspondance.group(1) in niveaux
+            if garder and contrat:
+                garder = contrat in ligne
+        if garder:
+            retenus.append(index)
+    return retenus
+
+
+def filtrer_lignes(lignes, niveaux=None, contrat=None):
+    return [lignes[index] for index in indices_retenus(lignes, niveaux, contrat)]
+
+
+def lire_depuis(chemin, curseur=None, niveaux=None, contrat=None, max_octets=MAX_OCTETS):
+    """
+    Lit les lignes complètes ajoutées au fichier de log depuis un curseur.
+
+    Le curseur porte l'inode du fichier : après une rotation (nouvel inode ou fichier plus court
+    que l'offset), la lecture reprend au début du nouveau fichier.
+    :param chemin: Chemin du fichier de log.
+    :param curseur: Curseur renvoyé par l'appel précédent ; sans curseur, fin du fichier uniquement.
+    :param niveaux: Niveaux retenus (voir niveau_minimal), ou None pour tous.
+    :param contrat: Numéro de contrat recherché dans les lignes, ou None.
+    :param max_octets: Volume maximal lu par appel.
+    :return: Dictionnaire {lignes, curseurs, curseur, rotation, reste} ; `curseurs` donne, pour chaque
+             ligne, le curseur juste après elle (reprise ligne à ligne du flux SSE).
+    """
+    if not os.path.exists(chemin):
+        return {"lignes": [], "curseurs": [], "curseur": curseur, "rotation": False, "reste": 0}
+
+    inode_curseur, offset = lire_curseur(curseur)
+    # Un curseur invalide vaut une absence de curseur : lecture de la fin du fichier
+    sans_curseur = offset is None
+    with open(chemin, "rb") as file:
+        stat = os.fstat(file.fileno())
+        rotation = offset is not None and (
+            (inode_curseur is not None and inode_curseur != stat.st_ino) or offset > stat.st_size)
+        if offset is None:
+            offset = max(0, stat.st_size - OCTETS_INITIAUX)
+        elif rotation:
+            offset = 0
+
+        file.seek(offset)
+        donnees = file.read(max_octets)
+        # Seules les lignes complètes sont renvoyées ; la ligne en cours d'écriture le sera au prochain appel
+        fin = donnees.rfind(b"\n")
+        if fin >= 0:
+            donnees = donnees[:fin + 1]
+        elif len(donnees) < max_octets:
+            donnees = b""
+        if offset and sans_curseur and donnees:
+            # Fin de fichier initiale : la première ligne, tronquée, est ignorée
+            debut = donnees.find(b"\n") + 1
+            offset, donnees = offset + debut, donnees[debut:]
+        nouvel_offset = offset + len(donnees)
+
+    lignes, fins = [], []
+    debut = 0
+    while debut < len(donnees):
+        fin = donnees.find(b"\n", debut)
+        fin = len(donnees) if fin < 0 else fin + 1
+        lignes.append(donnees[debut:fin].decode("utf-8", errors="replace").rstrip("\r\n"))
+        fins.append(offset + fin)
+        debut = fin
+    retenus = indices_retenus(lignes, niveaux, contrat)
+    return {
+        "lignes": [lignes[index] for index in retenus],
+        "curseurs": [formater_curseur(stat.st_ino, fins[index]) for index in retenus],
+        "curseur": formater_curseur(stat.st_ino, nouvel_offset),
+        "rotation": rotation,
+        "reste": max(0, stat.st_size - nouvel_offset),
+    }
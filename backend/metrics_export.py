@@ -0,0 +1,67 @@
+import re
+from collections import OrderedDict
+
+# Type de contenu du format texte de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MOTIF_ENTETE = re.compile(r"^# (HELP|TYPE) (\S+) ?(.*)$")
+
+
+def echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def ajouter_etiquettes(ligne, etiquettes):
+    """
+    Ajoute des étiquettes à une ligne d'échantillon ("nom{a="b"} 1" ou "nom 1").
+    """
+    if not etiquettes:
+        return ligne
+    ajout = ",".join(f'{nom}="{echapper(valeur)}"' for nom, valeur in etiquettes.items())
+    # Les valeurs d'étiquettes peuvent contenir des espaces : la dernière accolade ferme les étiquettes
+    fin = ligne.rfind("}")
+    if fin >= 0:
+        return f"{ligne[:fin]},{ajout}{ligne[fin:]}"
+    nom, valeur = ligne.split(" ", 1)
+    return f"{nom}{{{ajout}}} {valeur}"
+
+
+def fusionner_expositions(sources):
+    """
+    Fusionne les fichiers de métriques de plusieurs processus RPA en une exposition valide : une
+    seule ligne HELP/TYPE par métrique, chaque échantillon étiqueté avec sa source.
+    :param sources: Liste de tuples (texte de l'exposition, étiquettes de la source).
+    :return: Dictionnaire ordonné {nom: {"aide", "type", "echantillons"}}.
+    """
+    familles = OrderedDict()
+    for texte, etiquettes in sources:
+        famille = None
+        for ligne in texte.splitlines():
+            ligne = ligne.strip()
+            if not ligne:
+                continue
+            entete = MOTIF_ENTETE.match(ligne)
+            if entete:
+                genre, nom, valeur = entete.groups()
+                famille = familles.setdefault(nom, {"aide": "", "type": "untyped", "echantillons": []})
+                famille["aide" if genre == "HELP" else "type"] = valeur
+            elif not ligne.startswith("#") and famille is not None:
+                famille["echantillons"].append(ajouter_etiquettes(ligne, etiquettes))
+    return familles
+
+
+def ajouter_famille(familles, nom, aide, type_metrique, echantillons):
+    """
+    Ajoute une métrique du backend : échantillons sous forme de tuples (étiquettes, valeur).
+    """
+    famille = familles.setdefault(nom, {"aide": aide, "type": type_metrique, "echantillons": []})
+    for etiquettes, valeur in echantillons:
+        famille["echantillons"].append(ajouter_etiquettes(f"{nom} {valeur}", etiquettes))
+
+
+def formater(familles):
+    lignes = []
+    for nom, famille in familles.items():
+        lignes.append(f"# HELP {nom} {famille['aide']}")
+        lignes.append(f"# TYPE {nom} {famille['type']}")
+        lignes.extend(famille["echantillons"])
+    return "".join(ligne + "\n" for ligne in lignes)
@@ -1,179 +1,179 @@
-from flask import Flask, jsonify
-import subprocess
-import sys
+from flask import Flask, Response, jsonify, request
+import atexit
+import time
 import os
 
+from log_tail import lire_depuis, niveau_minimal
+from jobs import GestionnaireJobs, ErreurJob
+from metrics_export import CONTENT_TYPE
+
 
 app = Flask(__name__)
 
-processes = {}  # Dictionnaire pour stocker les processus en cours
+# Registre des exécutions de RPA (run id, code de sortie, progression)
+jobs = GestionnaireJobs()
+# Aucun navigateur orphelin si le backend s'arrête pendant une exécution
+atexit.register(jobs.arreter_tout)
+
+# Fichier de log suivi par /logs et /logs/stream
+LOG_FILE = os.getenv('RPA_LOG_FILE', 'central_rpa.log')
+# Flux SSE : intervalle de lecture du fichier et commentaire de maintien de la connexion
+STREAM_INTERVALLE = 1.0
+STREAM_HEARTBEAT = 15
+
+# Anciennes routes /start-*, /stop-*, /status-* : suffixe -> (RPA, libellé des messages)
+ROUTES_RPA = {
+    'affranchigo': ('Affranchigo', 'RPA Affranchigo'),
+    'dematerialisation': ('CasDematerialisation', 'RPA Dématerialisation'),
+    'extraction': ('Extraction', 'RPA Extraction'),
+    'portage-repas': ('PortageRepas', 'RPA Portage de Repas'),
+    'seres': ('Seres', 'RPA Seres'),
+}
 
 # Route pour Logs
 @app.route('/logs', methods=['GET'])
 def get_logs():
+    """
+    Lignes ajoutées au log depuis un curseur (paramètre `cursor`, renvoyé par l'appel précédent) ;
+    sans curseur, seule la fin du fichier est renvoyée. Filtres facultatifs : `level` (niveau
+    minimal) et `contrat` (numéro présent dans la ligne).
+    """
     try:
-        with open('central_rpa.log', 'r') as log_file:
-            logs = log_file.read()
-        return logs, 200  # Retourne les logs en tant que texte brut
+        niveaux = niveau_minimal(request.args.get('level'))
+        return jsonify(lire_depuis(LOG_FILE, request.args.get('cursor'), niveaux, request.args.get('contrat'))), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
-# Routes pour Affranchigo
-@app.route('/start-affranchigo', methods=['POST'])
-def start_affranchigo():
-    if 'Affranchigo' in processes:
-        return jsonify({"status": "RPA Affranchigo déjà en cours"}), 400
-    # Récupérer le chemin absolu du répertoire parent (GUI)
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Chemin vers le dossier GUI
-    main_py_path = os.path.join(base_dir, 'data', 'main.py')  # Chemin absolu vers main.py dans GUI/data/
 
+@app.route('/logs/stream', methods=['GET'])
+def stream_logs():
+    """
+    Suivi du log en Server-Sent Events : un événement par ligne, identifié par le curseur situé
+    juste après elle, pour que le navigateur reprenne à la ligne suivante après une reconnexion
+    (Last-Event-ID), même au milieu d'un lot.
+    """
     try:
-        # Lancer main.py en subprocess avec Python
-        process = subprocess.Popen([sys.executable, main_py_path, 'Affranchigo'])
-        
-        # Stocker le processus en cours
-        processes['Affranchigo'] = process
-        return jsonify({"status": "RPA Extraction démarré"}), 200
-    except FileNotFoundError as e:
-        return jsonify({"status": f"Erreur : Fichier non trouvé - {e}"}), 500
+        niveaux = niveau_minimal(request.args.get('level'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    contrat = request.args.get('contrat')
+    curseur = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+
+    def evenements():
+        nonlocal curseur
+        dernier_envoi = time.monotonic()
+        while True:
+            precedent = curseur
+            lecture = lire_depuis(LOG_FILE, curseur, niveaux, contrat)
+            curseur = lecture["curseur"]
+            for ligne, curseur_ligne in zip(lecture["lignes"], lecture["curseurs"]):
+                yield f"id: {curseur_ligne}\ndata: {ligne}\n\n"
+            if lecture["lignes"]:
+                dernier_envoi = time.monotonic()
+            elif time.monotonic() - dernier_envoi >= STREAM_HEARTBEAT:
+                yield ": heartbeat\n\n"
+                dernier_envoi = time.monotonic()
+            # Pause sauf pendant le rattrapage d'un retard (une ligne en cours d'écriture ne compte pas)
+            if curseur == precedent or not lecture["reste"]:
+                time.sleep(STREAM_INTERVALLE)
+
+    return Response(evenements(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+# Routes génériques des jobs
+@app.route('/jobs', methods=['POST'])
+def start_job():
+    """
+    Démarre un RPA : {"rpa": ..., "max_workers": ..., "options": {"mode": ..., "pool_size": ...}}.
+    """
+    donnees = request.get_json(silent=True) or {}
+    try:
+        job = jobs.demarrer(donnees.get('rpa'), donnees.get('max_workers'), donnees.get('options'))
+        return jsonify(job.statut()), 201
+    except ErreurJob as e:
+        return jsonify({"error": str(e)}), e.code
     except Exception as e:
-        return jsonify({"status": f"Erreur : {e}"}), 500
+        return jsonify({"error": str(e)}), 500
 
-@app.route('/stop-affranchigo', methods=['POST'])
-def stop_affranchigo():
-    if 'Affranchigo' in processes:
-        processes['Affranchigo'].terminate()
-        processes['Affranchigo'].wait()
-        del processes['Affranchigo']
-        return jsonify({"status": "Affranchigo RPA arrêté"}), 200
-    return jsonify({"status": "Aucun RPA Affranchigo en cours"}), 400
-
-@app.route('/status-affranchigo', methods=['GET'])
-def status_affranchigo():
-    if 'Affranchigo' in processes and processes['Affranchigo'].poll() is None:
-        return jsonify({"status": "Affranchigo RPA en cours"}), 200
-    return jsonify({"status": "Affranchigo RPA non démarré"}), 200
-
-# Routes pour Dématerialisation
-@app.route('/start-dematerialisation', methods=['POST'])
-def start_dematerialisation():
-    if 'CasDematerialisation' in processes:
-        return jsonify({"status": "RPA CasDematerialisation déjà en cours"}), 400
-    # Récupérer le chemin absolu du répertoire parent (GUI)
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Chemin vers le dossier GUI
-    main_py_path = os.path.join(base_dir, 'data', 'main.py')  # Chemin absolu vers main.py dans GUI/data/
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify(jobs.lister(request.args.get('rpa'))), 200
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def status_job(job_id):
     try:
-        # Lancer main.py en subprocess avec Python
-        process = subprocess.Popen([sys.executable, main_py_path, 'CasDematerialisation'])
-        
-        # Stocker le processus en cours
-        processes['CasDematerialisation'] = process
-        return jsonify({"status": "RPA Extraction démarré"}), 200
-    except FileNotFoundError as e:
-        return jsonify({"status": f"Erreur : Fichier non trouvé - {e}"}), 500
-    except Exception as e:
-        return jsonify({"status": f"Erreur : {e}"}), 500
+        return jsonify(jobs.job(job_id).statut()), 200
+    except ErreurJob as e:
+        return jsonify({"error": str(e)}), e.code
 
-@app.route('/stop-dematerialisation', methods=['POST'])
-def stop_dematerialisation():
-    if 'dematerialisation' in processes:
-        processes['dematerialisation'].terminate()
-        processes['dematerialisation'].wait()
-        del processes['dematerialisation']
-        return jsonify({"status": "RPA Dématerialisation arrêté"}), 200
-    return jsonify({"status": "Aucun RPA Dématerialisation en cours"}), 400
-
-@app.route('/status-dematerialisation', methods=['GET'])
-def status_dematerialisation():
-    if 'dematerialisation' in processes and processes['dematerialisation'].poll() is None:
-        return jsonify({"status": "RPA Dématerialisation en cours"}), 200
-    return jsonify({"status": "RPA Dématerialisation non démarré"}), 200
-
-# Routes pour Extraction Odyssée
-@app.route('/start-extraction', methods=['POST'])
-def start_extraction():
-    if 'extraction' in processes:
-        return jsonify({"status": "RPA Extraction déjà en cours"}), 400
-    
-    # Récupérer le chemin absolu du répertoire parent (GUI)
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Chemin vers le dossier GUI
-    main_py_path = os.path.join(base_dir, 'data', 'main.py')  # Chemin absolu vers main.py dans GUI/data/
+@app.route('/jobs/<job_id>/stop', methods=['POST'])
+def stop_job(job_id):
+    try:
+        return jsonify(jobs.arreter(job_id).statut()), 202
+    except ErreurJob as e:
+        return jsonify({"error": str(e)}), e.code
 
+@app.route('/jobs/<job_id>/progress', methods=['GET'])
+def progress_job(job_id):
     try:
-        # Lancer main.py en subprocess avec Python
-        process = subprocess.Popen([sys.executable, main_py_path, 'Extraction'])
-        
-        # Stocker le processus en cours
-        processes['extraction'] = process
-        return jsonify({"status": "RPA Extraction démarré"}), 200
+        return jsonify(jobs.job(job_id).progression()), 200
+    except ErreurJob as e:
+        return jsonify({"error": str(e)}), e.code
+
+@app.route('/progress', methods=['GET'])
+def progress():
+    """
+    Progression des RPA en cours : terminés, échecs, restants, contrats par minute, ETA et répartition par type.
+    """
+    return jsonify(jobs.progressions()), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Métriques au format texte de Prometheus : pool de WebDrivers, contrats par résultat et par type,
+    durées des étapes (une série par job) et état des jobs.
+    """
+    return Response(jobs.metriques(), content_type=CONTENT_TYPE)
+
+# Anciennes routes par RPA, conservées pour le frontend : elles passent par le registre des jobs
+def start_rpa(suffixe):
+    rpa, libelle = ROUTES_RPA[suffixe]
+    donnees = request.get_json(silent=True) or {}
+    # Mode optionnel d'Affranchigo : "reprise" pour ignorer les contrats déjà traités, "echecs" pour rejouer les problèmes
+    options = {cle: donnees[cle] for cle in ('mode', 'pool_size', 'ready_at', 'browser', 'preset') if cle in donnees}
+    try:
+        job = jobs.demarrer(rpa, donnees.get('max_workers'), options)
+        return jsonify({"status": f"{libelle} démarré", "job": job.statut()}), 200
+    except ErreurJob as e:
+        return jsonify({"status": f"Erreur : {e}"}), e.code
     except FileNotFoundError as e:
         return jsonify({"status": f"Erreur : Fichier non trouvé - {e}"}), 500
     except Exception as e:
         return jsonify({"status": f"Erreur : {e}"}), 500
 
-@app.route('/stop-extraction', methods=['POST'])
-def stop_extraction():
-    if 'extraction' in processes:
-        processes['extraction'].terminate()
-        processes['extraction'].wait()
-        del processes['extraction']
-        return jsonify({"status": "RPA Extraction arrêté"}), 200
-    return jsonify({"status": "Aucun RPA Extraction en cours"}), 400
-
-@app.route('/status-extraction', methods=['GET'])
-def status_extraction():
-    if 'extraction' in processes and processes['extraction'].poll() is None:
-        return jsonify({"status": "RPA Extraction en cours"}), 200
-    return jsonify({"status": "RPA Extraction non démarré"}), 200
-
-# Routes pour Portage de Repas
-@app.route('/start-portage-repas', methods=['POST'])
-def start_portage_repas():
-    if 'portage_repas' in processes:
-        return jsonify({"status": "RPA Portage de Repas déjà en cours"}), 400
-    process = subprocess.Popen([sys.executable, 'data/main.py', 'PortageRepas'])
-    processes['portage_repas'] = process
-    return jsonify({"status": "RPA Portage de Repas démarré"}), 200
-
-@app.route('/stop-portage-repas', methods=['POST'])
-def stop_portage_repas():
-    if 'portage_repas' in processes:
-        processes['portage_repas'].terminate()
-        processes['portage_repas'].wait()
-        del processes['portage_repas']
-        return jsonify({"status": "RPA Portage de Repas arrêté"}), 200
-    return jsonify({"status": "Aucun RPA Portage de Repas en cours"}), 400
-
-@app.route('/status-portage-repas', methods=['GET'])
-def status_portage_repas():
-    if 'portage_repas' in processes and processes['portage_repas'].poll() is None:
-        return jsonify({"status": "RPA Portage de Repas en cours"}), 200
-    return jsonify({"status": "RPA Portage de Repas non démarré"}), 200
-
-# Routes pour Seres
-@app.route('/start-seres', methods=['POST'])
-def start_seres():
-    if 'seres' in processes:
-        return jsonify({"status": "Seres RPA déjà en cours"}), 400
-    process = subprocess.Popen([sys.executable, 'data/main.py', 'Seres'])
-    processes['seres'] = process
-    return jsonify({"status": "Seres RPA démarré"}), 200
-
-@app.route('/stop-seres', methods=['POST'])
-def stop_seres():
-    if 'seres' in processes:
-        processes['seres'].terminate()
-        processes['seres'].wait()
-        del processes['seres']
-        return jsonify({"status": "Seres RPA arrêté"}), 200
-    return jsonify({"status": "Aucun RPA Seres en cours"}), 400
-
-@app.route('/status-seres', methods=['GET'])
-def status_seres():
-    if 'seres' in processes and processes['seres'].poll() is None:
-        return jsonify({"status": "Seres RPA en cours"}), 200
-    return jsonify({"status": "Seres RPA non démarré"}), 200
+def stop_rpa(suffixe):
+    rpa, libelle = ROUTES_RPA[suffixe]
+    job = jobs.job_actif(rpa)
+    if job is None:
+        return jsonify({"status": f"Aucun {libelle} en cours"}), 400
+    try:
+        jobs.arreter(job.id)
+    except ErreurJob as e:
+        return jsonify({"status": f"Erreur : {e}"}), e.code
+    return jsonify({"status": f"Arrêt du {libelle} demandé", "job": job.statut()}), 200
+
+def status_rpa(suffixe):
+    rpa, libelle = ROUTES_RPA[suffixe]
+    job = jobs.job_actif(rpa)
+    if job is not None:
+        return jsonify({"status": f"{libelle} en cours", "job": job.statut()}), 200
+    dernier = jobs.dernier_job(rpa)
+    return jsonify({"status": f"{libelle} non démarré", "job": dernier.statut() if dernier else None}), 200
+
+for suffixe in ROUTES_RPA:
+    app.add_url_rule(f'/start-{suffixe}', f'start_{suffixe}', lambda suffixe=suffixe: start_rpa(suffixe), methods=['POST'])
+    app.add_url_rule(f'/stop-{suffixe}', f'stop_{suffixe}', lambda suffixe=suffixe: stop_rpa(suffixe), methods=['POST'])
+    app.add_url_rule(f'/status-{suffixe}', f'status_{suffixe}', lambda suffixe=suffixe: status_rpa(suffixe), methods=['GET'])
 
 
 if __name__ == "__main__":
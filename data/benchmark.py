@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import threading
+import subprocess
+from datetime import datetime
+
+import pandas as pd
+import psutil
+from werkzeug.serving import make_server
+
+from mock_portal import PortailFictif, creer_app, urls_portail, contrat_fictif, hachage, OFFRES
+from rpa_modules.config import BASE_DIR, get_config
+from rpa_modules.timings import DEFAULT_TIMINGS_PATH
+from rpa_modules.progress import DEFAULT_PROGRESS_PATH, lire_progression
+from rpa_modules.waits import STRATEGIES, STRATEGIE_CONDITIONNELLE
+
+# Fichier d'entrée attendu par chaque RPA dans le dossier des données, et colonnes générées
+ENTREES = {
+    "Affranchigo": "ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx",
+    "Extraction": "Affranchigo_Demat_helene.xlsx",
+    "CasDematerialisation": "Affranchigo_Demat_helene.xlsx",
+    "Seres": "Rejet SERES 2.xlsx",
+}
+TAILLES = [100, 1000, 5000]
+PREMIER_NUMERO = 600000000
+INTERVALLE_ECHANTILLON = 1.0
+TIMEOUT_SCENARIO = 6 * 3600
+
+
+def contrats_synthetiques(taille):
+    return [PREMIER_NUMERO + index for index in range(taille)]
+
+
+def colonnes_regate(numero):
+    """
+    Codes REGATE du fichier de transfert cohérents avec la page du portail fictif : codes actuels
+    tirés des blocs de contrat_fictif, et modification du dépôt, du traitement ou des deux, pour
+    parcourir les mêmes branches des classes de cas qu'en production.
+    """
+    contrat = contrat_fictif(numero)
+    blocs = dict(contrat["blocs"])
+    depot = blocs.get("Dépôt", blocs.get("Dépôt et Traitement"))
+    traitement = blocs.get("Traitement", blocs.get("Dépôt et Traitement"))
+    nouveau_depot = str(100000 + (numero * 7) % 900000)
+    nouveau_traitement = nouveau_depot if contrat["meme_site"] else str(100000 + (numero * 11) % 900000)
+    # 0-1 : dépôt et traitement modifiés ; 2 : dépôt seul ; 3 : traitement seul
+    variante = hachage(numero, "modification") % 4
+    return {
+        "Code REGATE Dépôt actuel": depot if variante != 3 else "",
+        "Nouveau code REGATE Dépôt": nouveau_depot if variante != 3 else "",
+        "Code REGATE Traitement actuel": traitement if variante != 2 else "",
+        "Nouveau code REGATE Traitement": nouveau_traitement if variante != 2 else "",
+    }
+
+
+def ecrire_entree(rpa_name, contrats, data_dir):
+    """
+    Écrit le fichier Excel d'entrée d'un RPA pour une liste de contrats synthétiques.
+    """
+    lignes = []
+    for numero in contrats:
+        ligne = {"Contrat Nb": numero}
+        if rpa_name == "Affranchigo":
+            ligne.update(colonnes_regate(numero))
+        elif rpa_name == "Seres":
+            ligne.update({"SIRET": f"{numero:014d}", "SIRET DESTINATAIRE": f"{numero * 3 % 10 ** 14:014d}"})
+        lignes.append(ligne)
+    os.makedirs(data_dir, exist_ok=True)
+    chemin = os.path.join(data_dir, ENTREES[rpa_name])
+    pd.DataFrame(lignes).to_excel(chemin, index=False)
+    return chemin
+
+
+def percentile(valeurs, rang):
+    """
+    Percentile par interpolation linéaire (rang entre 0 et 100).
+    """
+    if not valeurs:
+        return None
+    valeurs = sorted(valeurs)
+    position = (len(valeurs) - 1) * rang / 100
+    bas = int(position)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return round(valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (position - bas), 3)
+
+
+class EchantillonneurRessources(threading.Thread):
+    def __init__(self, pid, intervalle=INTERVALLE_ECHANTILLON):
+        """
+        Relève périodiquement la mémoire et le temps CPU du processus RPA et de ses navigateurs
+        (drivers et processus de rendu, c'est-à-dire tous ses descendants).
+        """
+        super().__init__(daemon=True)
+        self.processus = psutil.Process(pid)
+        self.intervalle = intervalle
+        self.arret = threading.Event()
+        self.rss_navigateurs = []
+        self.rss_rpa = []
+        # Dernier temps CPU connu par processus, pour compter aussi les navigateurs recyclés
+        self.cpu_navigateurs = {}
+        self.cpu_rpa = 0.0
+
+    @staticmethod
+    def _temps_cpu(processus):
+        temps = processus.cpu_times()
+        return temps.user + temps.system
+
+    def run(self):
+        while not self.arret.is_set():
+            try:
+                self.rss_rpa.append(self.processus.memory_info().rss)
+                self.cpu_rpa = self._temps_cpu(self.processus)
+                enfants = self.processus.children(recursive=True)
+            except psutil.Error:
+                break
+            rss = 0
+            for enfant in enfants:
+                try:
+                    rss += enfant.memory_info().rss
+                    self.cpu_navigateurs[enfant.pid] = self._temps_cpu(enfant)
+                except psutil.Error:
+                    continue
+            self.rss_navigateurs.append(rss)
+            self.arret.wait(self.intervalle)
+
+    def arreter(self):
+        self.arret.set()
+        self.join()
+
+    def resume(self, duree, nombre_drivers):
+        cpu_navigateurs = sum(self.cpu_navigateurs.values())
+        nombre_drivers = max(1, nombre_drivers)
+        mo = 1024 * 1024
+        return {
+            "rss_navigateurs_moyen_mo": round(sum(self.rss_navigateurs) / len(self.rss_navigateurs) / mo, 1) if self.rss_navigateurs else None,
+            "rss_navigateurs_max_mo": round(max(self.rss_navigateurs) / mo, 1) if self.rss_navigateurs else None,
+            "rss_par_worker_mo": round(max(self.rss_navigateurs) / mo / nombre_drivers, 1) if self.rss_navigateurs else None,
+            "rss_rpa_max_mo": round(max(self.rss_rpa) / mo, 1) if self.rss_rpa else None,
+            "cpu_navigateurs_s": round(cpu_navigateurs, 1),
+            "cpu_par_worker_pct": round(100 * cpu_navigateurs / nombre_drivers / duree, 1) if duree else None,
+            "cpu_rpa_pct": round(100 * self.cpu_rpa / duree, 1) if duree else None,
+        }
+
+
+def lire_temps(state_dir):
+    """
+    Durées par contrat (lignes "contrat" du fichier des temps) et fenêtre de traitement.
+    :return: Tuple (durées, nombre d'erreurs, début, fin).
+    """
+    chemin = os.path.join(state_dir, DEFAULT_TIMINGS_PATH)
+    durees, erreurs, debut, fin = [], 0, None, None
+    if not os.path.exists(chemin):
+        return durees, erreurs, debut, fin
+    with open(chemin, "r", encoding="utf-8") as file:
+        for ligne in file:
+            try:
+                span = json.loads(ligne)
+            except json.JSONDecodeError:
+                continue
+            if span.get("etape") != "contrat":
+                continue
+            durees.append(span["duree"])
+            if span.get("erreur"):
+                erreurs += 1
+            debut = min(debut, span["ts"] - span["duree"]) if debut is not None else span["ts"] - span["duree"]
+            fin = max(fin, span["ts"]) if fin is not None else span["ts"]
+    return durees, erreurs, debut, fin
+
+
+def demarrer_portail(portail, host="127.0.0.1", port=0):
+    """
+    Démarre le portail fictif dans un thread du processus de benchmark.
+    :return: Tuple (serveur, URL de base).
+    """
+    serveur = make_server(host, port, creer_app(portail), threaded=True)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur, f"http://{host}:{serveur.server_port}"
+
+
+def executer_scenario(scenario, dossier, base_url, portail, arguments_rpa=(), timeout=TIMEOUT_SCENARIO):
+    """
+    Lance un RPA sur le portail fictif dans un dossier isolé et mesure débit, latences et ressources.
+    :param scenario: Dictionnaire (rpa, taille, max_workers, pool_size, attente).
+    :param dossier: Dossier du scénario (données, état et logs).
+    """
+    data_dir = os.path.join(dossier, "data")
+    state_dir = os.path.join(dossier, "state")
+    os.makedirs(state_dir, exist_ok=True)
+    ecrire_entree(scenario["rpa"], contrats_synthetiques(scenario["taille"]), data_dir)
+
+    urls = urls_portail(base_url)
+    if scenario["rpa"] == "Seres":
+        # Les drivers du pool sont ramenés sur l'URL de départ : pour Seres, la page e-facture
+        urls["RPA_START_URL"] = urls["RPA_SERES_URL"]
+    environnement = {
+        **os.environ,
+        **urls,
+        "RPA_DATA_DIR": data_dir,
+        "RPA_STATE_DIR": state_dir,
+        "RPA_DB_PATH": os.path.join(state_dir, "data_extraction.db"),
+        "RPA_WAIT_STRATEGY": scenario["attente"],
+        "IDENTIFIANT": os.environ.get("IDENTIFIANT", "benchmark"),
+        "MOT_DE_PASSE": os.environ.get("MOT_DE_PASSE", "benchmark"),
+        "IDENTIFIANT_SERES": os.environ.get("IDENTIFIANT_SERES", "benchmark"),
+        "MOT_DE_PASSE_SERES": os.environ.get("MOT_DE_PASSE_SERES", "benchmark"),
+    }
+    commande = [sys.executable, os.path.join(BASE_DIR, "main.py"), scenario["rpa"], str(scenario["max_workers"]),
+                *arguments_rpa]
+    if scenario["pool_size"]:
+        commande += ["--pool-size", str(scenario["pool_size"])]
+
+    compteurs_avant = portail.etat()["compteurs"]
+    debut = time.monotonic()
+    with open(os.path.join(dossier, "console.log"), "w", encoding="utf-8") as console:
+        process = subprocess.Popen(commande, env=environnement, cwd=state_dir, stdout=console, stderr=subprocess.STDOUT)
+        echantillonneur = EchantillonneurRessources(process.pid)
+        echantillonneur.start()
+        try:
+            code = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            code = process.wait()
+        finally:
+            echantillonneur.arreter()
+    duree = time.monotonic() - debut
+    compteurs_apres = portail.etat()["compteurs"]
+
+    durees, erreurs, debut_traitement, fin_traitement = lire_temps(state_dir)
+    fenetre = (fin_traitement - debut_traitement) if durees else 0
+    # Les RPA interceptent leurs erreurs par contrat : seule la progression distingue réussites et échecs
+    progression = lire_progression(os.path.join(state_dir, DEFAULT_PROGRESS_PATH))
+    if progression:
+        contrats, erreurs = progression["traites"], progression["echecs"]
+    else:
+        contrats = len(durees)
+    reussis = max(0, contrats - erreurs)
+    nombre_drivers = min(scenario["max_workers"], scenario["pool_size"] or scenario["max_workers"])
+    return {
+        **scenario,
+        "code_retour": code,
+        "duree_s": round(duree, 1),
+        "contrats": contrats,
+        "reussis": reussis,
+        "erreurs": erreurs,
+        # Débits des seuls contrats réussis : un échec rapide ne compte pas comme du débit
+        "contrats_par_heure": round(reussis * 3600 / duree, 1) if duree else None,
+        # Débit hors démarrage du pool et écriture des résultats
+        "contrats_par_heure_traitement": round(reussis * 3600 / fenetre, 1) if fenetre else None,
+        "latence_p50_s": percentile(durees, 50),
+        "latence_p95_s": percentile(durees, 95),
+        "latence_p99_s": percentile(durees, 99),
+        "portail": {cle: compteurs_apres[cle] - compteurs_avant.get(cle, 0) for cle in compteurs_apres},
+        **echantillonneur.resume(duree, nombre_drivers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de débit des RPA sur le portail fictif.")
+    parser.add_argument("--rpa", nargs="+", choices=list(ENTREES), default=list(ENTREES))
+    parser.add_argument("--tailles", nargs="+", type=int, default=TAILLES, help="Nombres de contrats synthétiques.")
+    parser.add_argument("--max-workers", nargs="+", type=int, default=[5], help="Valeurs de max_workers balayées.")
+    parser.add_argument("--pool-sizes", nargs="+", type=int, default=[0],
+                        help="Tailles maximales du pool balayées (0 : taille par défaut de main.py).")
+    parser.add_argument("--attentes", nargs="+", choices=STRATEGIES, default=[STRATEGIE_CONDITIONNELLE],
+                        help="Stratégies d'attente balayées.")
+    parser.add_argument("--latence", type=float, default=0.2, help="Latence moyenne du portail fictif, en secondes.")
+    parser.add_argument("--gigue", type=float, default=0.3)
+    parser.add_argument("--taux-echec", type=float, default=0.0)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--offre", choices=[nom for nom, _ in OFFRES], default=None,
+                        help="Offre imposée à tous les contrats (par défaut, répartition de mock_portal.OFFRES).")
+    parser.add_argument("--browser", default=None, help="Navigateur transmis à main.py.")
+    parser.add_argument("--preset", default=None, help="Préréglage transmis à main.py.")
+    parser.add_argument("--sortie", default=None, help="Fichier JSON des résultats (par défaut, dans le dossier d'état).")
+    parser.add_argument("--garder", action="store_true", help="Conserve les dossiers de chaque scénario.")
+    args = parser.parse_args()
+
+    horodatage = datetime.now().strftime("%Y%m%d_%H%M%S")
+    racine = get_config().state_path("benchmarks", horodatage)
+    sortie = args.sortie or os.path.join(racine, "benchmark.json")
+    arguments_rpa = []
+    if args.browser:
+        arguments_rpa += ["--browser", args.browser]
+    if args.preset:
+        arguments_rpa += ["--preset", args.preset]
+
+    portail = PortailFictif(args.latence, args.gigue, args.taux_echec, args.graine, offre=args.offre)
+    serveur, base_url = demarrer_portail(portail)
+    rapport = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "portail": portail.etat()["reglages"],
+        "hote": {"cpu": psutil.cpu_count(), "memoire_mo": psutil.virtual_memory().total // (1024 * 1024)},
+        "scenarios": [],
+    }
+    try:
+        for rpa_name, taille, max_workers, pool_size, attente in itertools.product(
+                args.rpa, args.tailles, args.max_workers, args.pool_sizes, args.attentes):
+            scenario = {"rpa": rpa_name, "taille": taille, "max_workers": max_workers,
+                        "pool_size": pool_size or None, "attente": attente}
+            nom = f"{rpa_name}_{taille}_w{max_workers}_p{pool_size}_{attente}"
+            dossier = os.path.join(racine, nom)
+            print(f"Scénario {nom}...")
+            resultat = executer_scenario(scenario, dossier, base_url, portail, arguments_rpa)
+            print(f"  {resultat['contrats']} contrat(s) dont {resultat['erreurs']} en échec, {resultat['contrats_par_heure']} contrats/h, "
+                  f"p95 {resultat['latence_p95_s']}s")
+            rapport["scenarios"].append(resultat)
+            # Rapport réécrit après chaque scénario : une interruption ne perd que le scénario en cours
+            os.makedirs(os.path.dirname(os.path.abspath(sortie)), exist_ok=True)
+            with open(sortie, "w", encoding="utf-8") as file:
+                json.dump(rapport, file, ensure_ascii=False, indent=2)
+            # Dossier conservé en cas d'échec, pour les logs du RPA
+            if not args.garder and resultat["code_retour"] == 0:
+                shutil.rmtree(dossier, ignore_errors=True)
+    finally:
+        serveur.shutdown()
+    print(f"Résultats : {sortie}")
+
+
+if __name__ == "__main__":
+    main()
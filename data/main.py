@@ -1,64 +1,164 @@
 import sys
 import logging
 import os
+import argparse
 from rpa_modules.debug import setup_logger
 from rpa_modules.WebDriverPool import WebDriverPool
-from rpa_modules.affranchigo import AffranchigoRPA
+from rpa_modules.affranchigo import AffranchigoRPA, MODES, MODE_COMPLET
 from rpa_modules.dematerialisation import CasDematerialisationRPA
 from rpa_modules.extraction_odysse import ExtractionRPA
 from rpa_modules.seres import SeresRPA
+from rpa_modules.config import get_config, load_config
+from rpa_modules.driver_factory import DriverFactory, BACKENDS, PRESETS
+from rpa_modules.resource_blocking import statistiques_blocage
+from rpa_modules.sharding import CoordinateurShards, parse_shard
+from rpa_modules.progress import Progression, TERMINE, ECHEC
+from rpa_modules.metrics import registre
 
 # Configuration du logger centralisé
 logger = setup_logger('Affranchigo_ROYE.log')
 
-# Initialisation du pool de WebDrivers
 DEFAULT_MAX_WORKERS = 5
-pool = WebDriverPool(initial_size=DEFAULT_MAX_WORKERS, max_size=30, idle_timeout=100, logger=None)
+# Recyclage des navigateurs pour garder une mémoire stable sur les longues exécutions
+DRIVER_MAX_USES = 200
+DRIVER_MAX_RSS_MB = 1500
+DRIVER_POOL_MAX_SIZE = 30
+AVAILABLE_RPAS = ["Affranchigo", "CasDematerialisation", "Extraction", "Seres"]
+# RPA dont la liste de contrats peut être répartie entre plusieurs processus
+SHARDABLE_RPAS = ["Affranchigo"]
 
-def main_rpa(rpa_name, max_workers=DEFAULT_MAX_WORKERS):
+def create_pool(max_workers=DEFAULT_MAX_WORKERS, ready_at=1, rpa_name=None, browser=None, preset=None, pool_size=None):
+    """
+    Crée le pool de WebDrivers : les drivers initiaux démarrent en parallèle et le traitement peut
+    commencer dès que `ready_at` d'entre eux sont prêts.
+    :param rpa_name: RPA servi par le pool, pour choisir son navigateur dans la configuration.
+    :param browser: Navigateur imposé (edge, chromium, firefox), prioritaire sur la configuration.
+    :param preset: Préréglage d'options imposé, prioritaire sur la configuration.
+    :param pool_size: Nombre maximal de WebDrivers (par défaut, DRIVER_POOL_MAX_SIZE).
+    """
+    config = get_config()
+    backend, preset_config = config.browser_for(rpa_name)
+    driver_factory = DriverFactory(browser or backend, preset or preset_config, config.driver_path,
+                                   config.browser_binary, allowlist=config.resource_allowlist, logger=logger)
+    max_size = pool_size or DRIVER_POOL_MAX_SIZE
+    return WebDriverPool(initial_size=min(max_workers, max_size), max_size=max_size, idle_timeout=100, ready_at=ready_at,
+                         min_size=min(max_workers, max_size), max_uses=DRIVER_MAX_USES, max_rss_mb=DRIVER_MAX_RSS_MB,
+                         driver_factory=driver_factory, logger=None)
+
+def main_rpa(rpa_name, max_workers=DEFAULT_MAX_WORKERS, mode=MODE_COMPLET, ready_at=1, browser=None, preset=None, shard=None,
+             pool_size=None):
     """
     Point d'entrée principal pour gérer les différents RPA.
+    :param mode: Mode de lancement d'Affranchigo (complet, reprise ou echecs).
+    :param ready_at: Nombre de WebDrivers prêts requis avant de commencer le traitement.
+    :param browser: Navigateur du pool (par défaut, celui configuré pour ce RPA).
+    :param preset: Préréglage d'options du navigateur (par défaut, celui configuré pour ce RPA).
+    :param shard: Tuple (index, nombre de shards) : ce processus ne traite que son shard.
+    :param pool_size: Nombre maximal de WebDrivers du pool.
+    :return: État final de l'exécution (TERMINE, ou ECHEC si le RPA a levé une exception).
     """
+    if rpa_name not in AVAILABLE_RPAS:
+        logger.error(f"RPA non reconnu: {rpa_name}")
+        logger.info(f"RPA disponibles : {', '.join(AVAILABLE_RPAS)}")
+        sys.exit(1)
+    if shard is not None and rpa_name not in SHARDABLE_RPAS:
+        logger.error(f"Le RPA {rpa_name} ne peut pas être réparti en shards ({', '.join(SHARDABLE_RPAS)} uniquement).")
+        sys.exit(1)
+
+    # Métriques exportées pour le backend (/metrics), démarrage du pool compris
+    registre.demarrer_export(logger=logger)
+    # Le pool n'est créé qu'une fois le RPA validé
+    pool = create_pool(max_workers, ready_at, rpa_name, browser, preset, pool_size)
+    # Progression lue par le backend (contrats terminés, débit, ETA)
+    progression = Progression(rpa_name, logger=logger)
+    etat_final = TERMINE
     try:
         if rpa_name == "Affranchigo":
             affranchigo_rpa = AffranchigoRPA(pool, logger)
-            affranchigo_rpa.main(max_workers=max_workers)  # Appel de la méthode principale
+            affranchigo_rpa.main(progress_callback=progression, max_workers=max_workers, mode=mode, shard=shard)  # Appel de la méthode principale
 
         elif rpa_name == "CasDematerialisation":
             demat_rpa = CasDematerialisationRPA(pool, logger)
-            demat_rpa.main(max_workers=max_workers)
+            demat_rpa.main(progress_callback=progression)
 
         elif rpa_name == "Extraction":
             extraction_rpa = ExtractionRPA(pool, logger)
-            extraction_rpa.main(max_workers=max_workers)
+            extraction_rpa.main(progress_callback=progression, max_workers=max_workers)
 
         elif rpa_name == "Seres":
             seres_rpa = SeresRPA(pool, logger)
-            seres_rpa.main(max_workers=max_workers)
-
-        else:
-            logger.error(f"RPA non reconnu: {rpa_name}")
-            available_rpas = ["Affranchigo", "CasDematerialisation", "Extraction", "Seres"]
-            logger.info(f"RPA disponibles : {', '.join(available_rpas)}")
-            sys.exit(1)
+            seres_rpa.main(progress_callback=progression)
 
     except Exception as e:
         logger.error(f"Erreur lors de l'exécution du RPA {rpa_name}: {e}")
+        etat_final = ECHEC
     finally:
         # Toujours fermer les WebDrivers à la fin
-        pool.close_all()
+        pool.shutdown()
+        progression.terminer(etat_final)
+        registre.arreter_export()
+        statistiques_blocage.journaliser(logger)
+    return etat_final
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        logger.error("Usage: python main.py <RPA_name> [<max_workers>]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Lancement d'un RPA.")
+    parser.add_argument("rpa_name", help="Nom du RPA à lancer.")
+    parser.add_argument("max_workers", nargs="?", type=int, default=DEFAULT_MAX_WORKERS, help="Nombre de threads de traitement.")
+    parser.add_argument("--mode", choices=MODES, default=MODE_COMPLET,
+                        help="complet : tous les contrats ; reprise : ignore les contrats déjà traités ; echecs : rejoue uniquement les contrats en problème.")
+    parser.add_argument("--ready-at", type=int, default=1,
+                        help="Nombre de WebDrivers prêts avant de commencer ; les autres démarrent en arrière-plan.")
+    parser.add_argument("--browser", choices=list(BACKENDS), default=None,
+                        help="Navigateur du pool ; par défaut, celui configuré pour ce RPA (edge sinon).")
+    parser.add_argument("--preset", choices=list(PRESETS), default=None,
+                        help="Préréglage d'options du navigateur (standard, leger, debug).")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help=f"Nombre maximal de WebDrivers du pool (par défaut, {DRIVER_POOL_MAX_SIZE}).")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Coordinateur : répartit les contrats entre N processus workers puis fusionne leurs journaux et CSV.")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Worker : ne traite que le shard i/N (hachage stable du numéro de contrat) ; sans RPA_STATE_DIR, l'état va dans state_dir/shards/i-N.")
+    parser.add_argument("--merge-shards", type=int, default=None,
+                        help="Fusionne les dossiers d'état de N shards (state_dir/shards) sans rien lancer.")
+    parser.add_argument("--config", default=None,
+                        help="Fichier de configuration JSON (dossiers, base, driver, URLs) ; sinon RPA_CONFIG ou data/rpa_config.json.")
+    args = parser.parse_args()
 
-    # Récupère le nom du RPA à partir des arguments de la ligne de commande
-    rpa_name = sys.argv[1]
-    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_WORKERS
+    if args.shard is not None and not os.getenv("RPA_STATE_DIR"):
+        # Worker lancé à la main : son état va dans le dossier de son shard, comme sous le
+        # coordinateur, pour que --merge-shards le retrouve
+        coordinateur = CoordinateurShards(args.rpa_name, args.shard[1], logger=logger,
+                                          state_dir=load_config(args.config).state_dir)
+        os.environ["RPA_STATE_DIR"] = coordinateur.preparer_worker(args.shard[0])
+
+    # Configuration résolue une seule fois, avant la création du pool et des RPA
+    config = get_config(args.config)
+    logger.info(f"Configuration : {config.as_dict()}")
 
     # Log du nom du RPA reçu
-    logger.info(f"Nom du RPA reçu: {rpa_name}")
+    logger.info(f"Nom du RPA reçu: {args.rpa_name}")
 
-    # Lancer le RPA correspondant
-    main_rpa(rpa_name, max_workers)
\ No newline at end of file
+    if args.shards or args.merge_shards:
+        if args.rpa_name not in SHARDABLE_RPAS:
+            logger.error(f"Le RPA {args.rpa_name} ne peut pas être réparti en shards ({', '.join(SHARDABLE_RPAS)} uniquement).")
+            sys.exit(1)
+        # Chaque worker reçoit les mêmes options ; le coordinateur ne crée pas de pool
+        arguments_worker = [str(args.max_workers), "--mode", args.mode, "--ready-at", str(args.ready_at)]
+        if args.browser:
+            arguments_worker += ["--browser", args.browser]
+        if args.preset:
+            arguments_worker += ["--preset", args.preset]
+        if args.pool_size:
+            arguments_worker += ["--pool-size", str(args.pool_size)]
+        if args.config:
+            arguments_worker += ["--config", args.config]
+        coordinateur = CoordinateurShards(args.rpa_name, args.shards or args.merge_shards, arguments_worker, logger=logger)
+        if args.merge_shards:
+            coordinateur.fusionner()
+        else:
+            sys.exit(coordinateur.executer())
+    else:
+        # Lancer le RPA correspondant ; un code de sortie non nul signale l'échec au backend et au coordinateur
+        etat_final = main_rpa(args.rpa_name, args.max_workers, args.mode, args.ready_at, args.browser, args.preset,
+                              args.shard, args.pool_size)
+        sys.exit(1 if etat_final == ECHEC else 0)
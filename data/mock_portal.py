@@ -0,0 +1,633 @@
+import json
+import argparse
+import random
+import secrets
+import threading
+import time
+import zlib
+
+from flask import Flask, jsonify, make_response, redirect, render_template_string, request
+
+# Portail fictif de deviscontrat et d'e-facture (SERES) : reproduit uniquement les éléments du DOM
+# dont dépendent les robots, pour mesurer pool, attentes et parallélisme sans toucher à la production.
+
+CHEMIN_ACCES = "/appli/ihm/index/acces-dc"
+CHEMIN_CONNEXION = "/appli/ihm/index/connexion"
+CHEMIN_DETAILS = "/appli/ihm/contrat/<numero>/details"
+CHEMIN_CONFIGURATEUR = "/appli/ihm/configurateur/contrat/<numero>"
+CHEMIN_PUT_CONTRACT = "/appli/ihm/configurateur/put-contract"
+CHEMIN_SERES = "/saml/saml-login.php"
+COOKIE_SESSION = "MOCK_SESSION"
+COOKIE_SESSION_SERES = "MOCK_SESSION_SERES"
+
+# Offres reconnues par AffranchigoRPA.modifications_conditions_ventes, avec leur part (en %) des contrats.
+# Seules les offres dont le formulaire est reproduit (BLOCS_REGATE) sont tirées par défaut : les autres
+# échoueraient à chaque contrat et fausseraient latences et taux d'échec ; elles restent disponibles via --offre.
+OFFRES = [
+    ("Affranchigo forfait", 57),
+    ("Affranchigo liberté", 43),
+    ("Affranchigo Premium", 0),
+    ("Destineo esprit libre", 0),
+    ("Frequenceo", 0),
+    ("Proxicompte", 0),
+    ("Collecte et remise", 0),
+]
+# Blocs REGATE reproduits : page, critère des boutons radio, ligne et colonne du code REGATE
+BLOCS_REGATE = {
+    "Affranchigo forfait": {"page": "g0_p159", "radio": "c25258", "ligne": "r486", "colonne": "c487"},
+    "Affranchigo liberté": {"page": "g0_p265", "radio": "c24954", "ligne": "r2055", "colonne": "c2056"},
+}
+# Part (en %) des contrats en annexe multisites, sans bouton de modification
+PART_MULTISITES = 5
+ROLES = ["Dépôt et Traitement", "Dépôt", "Traitement"]
+HEURES = [f"{heure:02d}:00" for heure in range(24)]
+SUPPORTS_FACTURE = ["Papier", "PDF", "EDI", "PDF Signé"]
+
+
+def hachage(numero_contrat, sel=""):
+    return zlib.crc32(f"{sel}{numero_contrat}".strip().encode("utf-8"))
+
+
+def contrat_fictif(numero_contrat, offre=None):
+    """
+    Contrat fictif déterministe : un même numéro donne toujours la même offre, les mêmes rôles et
+    les mêmes codes REGATE, d'une exécution et d'un processus à l'autre.
+    :param offre: Offre imposée (par défaut, tirée du numéro selon les parts de OFFRES).
+    """
+    valeur = hachage(numero_contrat)
+    if offre is None:
+        tirage, cumul = valeur % 100, 0
+        for nom, part in OFFRES:
+            cumul += part
+            if tirage < cumul:
+                offre = nom
+                break
+    multisites = hachage(numero_contrat, "multisites") % 100 < PART_MULTISITES
+    meme_site = valeur % 2 == 0
+    regate_depot = f"{100000 + hachage(numero_contrat, 'depot') % 900000}"
+    regate_traitement = regate_depot if meme_site else f"{100000 + hachage(numero_contrat, 'traitement') % 900000}"
+    return {
+        "numero": numero_contrat,
+        "offre": offre,
+        "multisites": multisites,
+        "categorie": "Annexe Multisites" if multisites else "Contrat Cadre",
+        "type_contrat": offre,
+        "stype_contrat": "Standard",
+        "statut": "Signé",
+        "sstatut": "Actif",
+        # Un seul bloc "Dépôt et Traitement" (radio oui) ou deux blocs "Dépôt" / "Traitement" (radio non)
+        "meme_site": meme_site,
+        "blocs": [("Dépôt et Traitement", regate_depot)] if meme_site else [("Dépôt", regate_depot), ("Traitement", regate_traitement)],
+        "heure": "" if valeur % 3 == 0 else HEURES[8 + valeur % 4],
+        "delai": ["30 jours", "45 jours fin de mois", "60 jours"][valeur % 3],
+        "mode_paiement": ["Prélèvement", "Virement", "Chèque"][valeur % 3],
+        "periodicite": ["Mensuelle", "Trimestrielle"][valeur % 2],
+        "type_client": valeur % 5 == 0,
+        "support_facture": SUPPORTS_FACTURE[valeur % 3],
+        "references": {
+            "facturationClientNumeroBonCommandeI": f"BC{valeur % 100000:05d}" if valeur % 4 else "",
+            "facturationClientReferenceBusinessUnitI": "BU-COURRIER" if valeur % 2 else "",
+            "facturationClientReferenceSite1I": f"SITE{valeur % 1000:03d}",
+            "facturationClientReferenceSite2I": "",
+            "facturationClientDestinataireReferenceSite1I": f"DEST{valeur % 1000:03d}",
+            "facturationClientDestinataireReferenceSite2I": "",
+            "facturationClientNumeroMarcheI": f"M{valeur % 10000:04d}" if valeur % 3 else "",
+        },
+    }
+
+
+def verifier_offre(offre):
+    if offre is not None and offre not in dict(OFFRES):
+        raise ValueError(f"Offre inconnue : {offre} (disponibles : {', '.join(nom for nom, _ in OFFRES)})")
+    return offre
+
+
+def urls_portail(base_url):
+    """
+    URLs à placer dans la configuration des RPA pour les diriger vers le portail fictif.
+    :param base_url: Adresse du portail, par exemple http://127.0.0.1:5050.
+    :return: Dictionnaire {variable d'environnement: URL}.
+    """
+    base_url = base_url.rstrip("/")
+    return {
+        "RPA_START_URL": f"{base_url}{CHEMIN_ACCES}?profil=ADV",
+        "RPA_INDEX_URL": f"{base_url}{CHEMIN_ACCES}",
+        "RPA_PUT_CONTRACT_URL": f"{base_url}{CHEMIN_PUT_CONTRACT}",
+        "RPA_SERES_URL": f"{base_url}{CHEMIN_SERES}?nomSP=ARTIMON_PROD",
+    }
+
+
+class PortailFictif:
+    def __init__(self, latence=0.0, gigue=0.0, taux_echec=0.0, graine=None, authentification=False, offre=None):
+        """
+        Réglages et état du portail fictif, partagés par tous les threads du serveur.
+        :param latence: Délai moyen (en secondes) ajouté à chaque requête.
+        :param gigue: Variation relative de la latence (0.5 : entre 50 % et 150 % de la latence).
+        :param taux_echec: Probabilité d'un échec injecté (contrat introuvable, erreur d'enregistrement...).
+        :param graine: Graine du tirage des latences et des échecs, pour des exécutions reproductibles.
+        :param authentification: Exige la connexion (AUTHENTICATION.LOGIN / PASSWORD, login / acct_pass).
+        :param offre: Offre imposée à tous les contrats (par défaut, tirée du numéro).
+        """
+        verifier_offre(offre)
+        self.latence = latence
+        self.gigue = gigue
+        self.taux_echec = taux_echec
+        self.authentification = authentification
+        self.offre = offre
+        self.lock = threading.Lock()
+        self.aleatoire = random.Random(graine)
+        self.sessions = set()
+        self.compteurs = {
+            "requetes": 0,
+            "consultations": 0,
+            "soumissions": 0,
+            "facturations": 0,
+            "validations_seres": 0,
+            "echecs_injectes": 0,
+        }
+        self.soumissions = {}
+
+    def attendre(self):
+        with self.lock:
+            self.compteurs["requetes"] += 1
+            if self.latence <= 0:
+                return
+            delai = self.latence * self.aleatoire.uniform(1 - self.gigue, 1 + self.gigue)
+        time.sleep(max(0.0, delai))
+
+    def echec(self):
+        """
+        Tire un échec injecté selon le taux configuré.
+        """
+        with self.lock:
+            if self.aleatoire.random() >= self.taux_echec:
+                return False
+            self.compteurs["echecs_injectes"] += 1
+            return True
+
+    def compter(self, compteur):
+        with self.lock:
+            self.compteurs[compteur] += 1
+
+    def contrat(self, numero_contrat):
+        return contrat_fictif(numero_contrat, self.offre)
+
+    def ouvrir_session(self):
+        jeton = secrets.token_hex(16)
+        with self.lock:
+            self.sessions.add(jeton)
+        return jeton
+
+    def session_valide(self, cookie):
+        if not self.authentification:
+            return True
+        with self.lock:
+            return cookie in self.sessions
+
+    def configurer(self, reglages):
+        """
+        Modifie les réglages pendant l'exécution (balayage de latence ou de taux d'échec).
+        :raises ValueError: Si un réglage est invalide ; aucun réglage n'est alors modifié.
+        """
+        valeurs = {}
+        for nom in ("latence", "gigue", "taux_echec"):
+            if nom in reglages:
+                try:
+                    valeurs[nom] = float(reglages[nom])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Réglage {nom} invalide : {reglages[nom]!r} (nombre attendu)")
+        if "offre" in reglages:
+            valeurs["offre"] = verifier_offre(reglages["offre"] or None)
+        with self.lock:
+            for nom, valeur in valeurs.items():
+                setattr(self, nom, valeur)
+
+    def etat(self):
+        with self.lock:
+            return {
+                "reglages": {"latence": self.latence, "gigue": self.gigue, "taux_echec": self.taux_echec,
+                             "authentification": self.authentification, "offre": self.offre},
+                "compteurs": dict(self.compteurs),
+                "contrats_soumis": len(self.soumissions),
+            }
+
+
+STYLE = """
+<style>
+  .modal, .onglet { display: none; }
+  .modal.in, .onglet.actif { display: block; }
+  .bootbox { position: fixed; top: 10%; left: 25%; width: 50%; background: #fff; border: 1px solid #999; z-index: 10; }
+  .swal2-container { position: fixed; top: 0; left: 0; right: 0; bottom: 0; background: rgba(0, 0, 0, .3); z-index: 20; }
+  .alert-danger { color: #a94442; }
+</style>
+<script>
+  function bootbox(classe, contenu, pied) {
+    var modal = document.createElement('div');
+    modal.className = 'bootbox modal fade in ' + classe;
+    modal.innerHTML = '<div class="modal-dialog"><div class="modal-content"><div class="modal-body">' + contenu
+      + '</div><div class="modal-footer">' + pied + '</div></div></div>';
+    document.body.appendChild(modal);
+    return modal;
+  }
+  function alerte(message) {
+    var modal = bootbox('bootbox-alert', message, '<button type="button" class="btn btn-primary">OK</button>');
+    modal.querySelector('.modal-footer > button').onclick = function () { modal.remove(); };
+  }
+  function afficher(id) {
+    document.getElementById(id).classList.add('actif');
+  }
+</script>
+"""
+
+PAGE_CONNEXION = STYLE + """
+<html><body>
+  <form method="post" action="{{ action }}">
+    <input type="hidden" name="suivant" value="{{ suivant }}">
+    {% if etape == 'login' %}
+      <label for="AUTHENTICATION.LOGIN">Identifiant</label>
+      <input type="text" id="AUTHENTICATION.LOGIN" name="login">
+    {% else %}
+      <input type="hidden" name="login" value="{{ login }}">
+      <label for="AUTHENTICATION.PASSWORD">Mot de passe</label>
+      <input type="password" id="AUTHENTICATION.PASSWORD" name="password">
+    {% endif %}
+  </form>
+</body></html>
+"""
+
+PAGE_ACCES = STYLE + """
+<html><body>
+  <h2>Accès au contrat</h2>
+  <input type="text" id="idContrat">
+  <button type="button" id="btnSubmitContrat_accesRDC" onclick="rechercher()">Rechercher</button>
+  <div id="modalRefContrat" class="modal fade"><div class="modal-dialog"><div class="modal-content">
+    <div class="modal-header">Contrat</div><div class="modal-body"></div>
+  </div></div></div>
+  <script>
+    function rechercher() {
+      var numero = document.getElementById('idContrat').value.trim();
+      fetch('/mock/contrat/' + encodeURIComponent(numero)).then(function (reponse) {
+        return reponse.json().then(function (donnees) {
+          if (!reponse.ok) { alerte(donnees.message); return; }
+          var modal = document.getElementById('modalRefContrat');
+          modal.querySelector('.modal-body').innerHTML = '<iframe src="' + donnees.details + '" width="100%" height="600"></iframe>';
+          modal.classList.add('in');
+        });
+      });
+    }
+  </script>
+</body></html>
+"""
+
+PAGE_DETAILS = STYLE + """
+<html><body>
+  <div id="details">
+    <div>Catégorie : <span id="detailsCategorieV">{{ c.categorie }}</span></div>
+    <div>Type : <span id="detailsTypeContratV">{{ c.type_contrat }}</span></div>
+    <div>Sous-type : <span id="detailsSTypeContratV">{{ c.stype_contrat }}</span></div>
+    <div>Statut : <span id="detailsVersionStatutV">{{ c.statut }}</span></div>
+    <div>Sous-statut : <span id="detailsVersionSStatutV">{{ c.sstatut }}</span></div>
+    {% if not c.multisites %}
+    <permission><a href="#amendment"><div id="detailsModificationButton" onclick="window.top.location.href = '{{ configurateur }}';">Modification</div></a></permission>
+    {% endif %}
+    <permission><a href="#facturation"><div id="detailsFacturationButton" onclick="afficher('facturation');">Facturation</div></a></permission>
+  </div>
+  <div id="facturation" class="onglet">
+    <ul>
+      <li><a id="PaiementTitle">Paiement</a></li>
+      <li><a id="ReferenceClientTitle" href="#referenceClient" onclick="afficher('referenceClient');">Référence client</a></li>
+    </ul>
+    <div id="paiement">
+      {% for id, valeur, options in selects %}
+      <select id="{{ id }}">{% for option in options %}<option value="{{ option }}"{% if option == valeur %} selected{% endif %}>{{ option }}</option>{% endfor %}</select>
+      {% endfor %}
+      <input type="checkbox" id="facturationPaiementTypeClientI"{% if c.type_client %} checked{% endif %}>
+      <textarea id="versionComment"></textarea>
+      <button type="button" id="detailsButtonValidationFacturation" onclick="confirmer()">Valider</button>
+    </div>
+    <div id="referenceClient" class="onglet">
+      {% for id, valeur in c.references.items() %}<div><span id="{{ id }}">{{ valeur }}</span></div>{% endfor %}
+    </div>
+  </div>
+  <script>
+    function confirmer() {
+      var conteneur = document.createElement('div');
+      conteneur.className = 'swal2-container swal2-center swal2-fade swal2-shown';
+      conteneur.innerHTML = '<div class="swal2-modal"><div class="swal2-content">Valider la facturation ?</div>'
+        + '<div class="swal2-buttonswrapper"><button type="button" class="swal2-confirm swal2-styled">Oui</button></div></div>';
+      document.body.appendChild(conteneur);
+      conteneur.querySelector('.swal2-confirm').onclick = function () {
+        conteneur.remove();
+        var corps = new URLSearchParams();
+        corps.append('support', document.getElementById('facturationPaiementSupportFactureI').value);
+        corps.append('commentaire', document.getElementById('versionComment').value);
+        fetch('{{ validation }}', {method: 'POST', body: corps}).then(function (reponse) {
+          if (!reponse.ok) { alerte('Erreur lors de la validation de la facturation.'); }
+        });
+      };
+    }
+  </script>
+</body></html>
+"""
+
+MACRO_CRITERE = """
+{% macro select_heure(heure) %}<select><option value="">null</option>{% for option in heures %}<option value="{{ option }}"{% if option == heure %} selected{% endif %}>{{ option }}</option>{% endfor %}</select>{% endmacro %}
+{% macro bloc(identifiant, id_regate, role, regate, heure) %}
+<div id="{{ identifiant }}"><div>
+  <h4>Site {{ role }}</h4>
+  <critere-form><div class="form-group critere_psc"><label>Code REGATE</label><input type="text" id="{{ id_regate }}" value="{{ regate }}" onchange="regateModifie(this)"></div></critere-form>
+  <critere-form><div class="form-group critere_psc"><input-etb-prest><div><select class="etablissement"><option value=""></option><option value="{{ regate }}" title="{{ regate }}" selected>ETABLISSEMENT {{ regate }}</option></select></div></input-etb-prest></div></critere-form>
+  <span></span>
+  <critere-form><div class="form-group critere_psc"><input-component><div class="no-left-gutter col-xs-8 col-sm-8 col-md-8">{{ select_heure(heure) }}</div></input-component></div></critere-form>
+  <span></span>
+  <critere-form><div class="form-group critere_psc"><input-component><div class="no-left-gutter col-xs-8 col-sm-8 col-md-8">{{ select_heure(heure) }}</div></input-component></div></critere-form>
+  <span></span>
+  <critere-form><div class="form-group critere_psc"><select><option value=""></option>{% for option in roles %}<option value="{{ option }}"{% if option == role %} selected{% endif %}>{{ option }}</option>{% endfor %}</select></div></critere-form>
+</div></div>
+{% endmacro %}
+"""
+
+PAGE_CONFIGURATEUR = STYLE + MACRO_CRITERE + """
+<html><body>
+  <div id="header_offre_descr"><h1>{{ c.offre }}</h1></div>
+  <div id="content_offre">
+    <ul>
+      <li><a href="#informations" onclick="onglet('informations')">Informations</a></li>
+      <li><a href="#cpv" onclick="onglet('cpv')">Conditions particulières de vente</a></li>
+      <li><a href="#cpr" onclick="onglet('cpr')">Conditions particulières de réalisation</a></li>
+    </ul>
+    <div id="informations" class="onglet actif"><p>Contrat {{ c.numero }}</p></div>
+    <div id="cpv" class="onglet">
+      <div id="cptLeft">
+        {% for index in range(1, 14) %}
+        {% if index == 7 %}
+        <div><critere-form><div class="form-group critere_offre"><input-itl-ope><input-component><div><select><option value="">null</option><option value="1">Interlocuteur principal</option></select></div></input-component></input-itl-ope></div></critere-form></div>
+        {% else %}
+        <div><select><option value="">null</option><option value="1">Option {{ index }}</option></select></div>
+        {% endif %}
+        {% endfor %}
+      </div>
+      {% if b %}
+      <div>
+        <input type="radio" name="memeSite" id="{{ b.page }}|0_{{ b.radio }}_v0"{% if not c.meme_site %} checked{% endif %}> Non
+        <input type="radio" name="memeSite" id="{{ b.page }}|0_{{ b.radio }}_v1"{% if c.meme_site %} checked{% endif %}> Oui
+      </div>
+      {% for role, regate in c.blocs %}
+      {% set ligne = b.page ~ '|0_' ~ b.ligne ~ '[0]' %}
+      {{ bloc(ligne if loop.first else '[' ~ ligne ~ ']',
+              b.page ~ '|0_' ~ b.ligne ~ '_' ~ b.colonne ~ ('' if loop.first else '[0]'),
+              role, regate, c.heure) }}
+      {% endfor %}
+      {% endif %}
+      <form id="odcFormCPV" method="post" action="{{ put_contract }}" onsubmit="return preparer(this)"><button type="submit">Enregistrer</button></form>
+    </div>
+    <div id="cpr" class="onglet">
+      <div id="p159CPR"><select><option value="">null</option><option value="AM">&lt; 12H00</option><option value="PM">&gt; 12H00</option></select></div>
+      <form id="odcFormCPR" method="post" action="{{ put_contract }}" onsubmit="return preparer(this)"><button type="submit">Enregistrer</button></form>
+    </div>
+  </div>
+  <script>
+    function onglet(id) {
+      document.querySelectorAll('#content_offre .onglet').forEach(function (element) { element.classList.remove('actif'); });
+      afficher(id);
+    }
+    function regateModifie(input) {
+      var bloc = input.closest('critere-form').parentElement;
+      var etablissement = bloc.querySelector('critere-form:nth-child(3)');
+      var erreur = etablissement.querySelector('error-component');
+      if (erreur) { erreur.remove(); }
+      var select = etablissement.querySelector('select');
+      select.innerHTML = '<option value=""></option>';
+      if (!/^[0-9]{6}$/.test(input.value.trim())) {
+        etablissement.insertAdjacentHTML('beforeend', '<error-component><div class="alert alert-danger">Code REGATE inconnu</div></error-component>');
+        return;
+      }
+      select.insertAdjacentHTML('beforeend', '<option value="' + input.value.trim() + '" title="' + input.value.trim() + '">ETABLISSEMENT ' + input.value.trim() + '</option>');
+    }
+    function preparer(formulaire) {
+      // Les champs modifiés sont transmis au serveur pour vérifier ce que les robots ont enregistré
+      var champs = {numero: '{{ c.numero }}'};
+      document.querySelectorAll('#cpv input[type=text], #cpv select, #cpv input[type=radio]:checked').forEach(function (element, index) {
+        champs[element.id || element.name || ('champ' + index)] = element.value;
+      });
+      var cache = document.createElement('input');
+      cache.type = 'hidden';
+      cache.name = 'champs';
+      cache.value = JSON.stringify(champs);
+      formulaire.appendChild(cache);
+      return true;
+    }
+  </script>
+</body></html>
+"""
+
+PAGE_ERREUR_PUT_CONTRACT = """
+<html><body><h1>Erreur</h1><p>L'enregistrement du contrat a échoué.</p></body></html>
+"""
+
+PAGE_SERES_CONNEXION = """
+<html><body>
+  <div class="container"><div>
+    <div class="col-xs-12 col-md-6"><div>
+      <form method="post" action="{{ action }}">
+        <input type="text" id="login" name="login">
+        <input type="password" id="acct_pass" name="acct_pass">
+        <button type="submit">Connexion</button>
+      </form>
+    </div></div>
+  </div></div>
+</body></html>
+"""
+
+PAGE_SERES = STYLE + """
+<html><body>
+  <div id="content">
+    <div class="panel"><div class="panel-body" onclick="afficher('rejets')"><h1>Rejets AIFE</h1></div></div>
+    <div id="rejets" class="onglet">
+      <input type="text" id="gs_NUMFACTURE" onkeydown="if (event.key === 'Enter') { rechercher(this.value); }">
+      <table id="list-documents"><tbody><tr class="jqgfirstrow"><td></td><td></td><td></td></tr></tbody></table>
+    </div>
+  </div>
+  <script>
+    function rechercher(numero) {
+      fetch('/mock/seres/recherche?numero=' + encodeURIComponent(numero.trim())).then(function (reponse) {
+        return reponse.json();
+      }).then(function (lignes) {
+        var corps = document.querySelector('#list-documents > tbody');
+        corps.querySelectorAll('tr:not(.jqgfirstrow)').forEach(function (ligne) { ligne.remove(); });
+        lignes.forEach(function (facture) {
+          var ligne = document.createElement('tr');
+          ligne.innerHTML = '<td>' + facture.numero + '</td><td>' + facture.client + '</td><td>' + facture.motif + '</td>';
+          ligne.onclick = function () { ouvrir(facture); };
+          corps.appendChild(ligne);
+        });
+      });
+    }
+    function ouvrir(facture) {
+      var modal = bootbox('', '<label>SIRET</label><input type="text" id="m_client_siret" value="' + facture.siret + '">'
+        + '<textarea id="m_commentaire_interne"></textarea>',
+        '<button type="button" class="btn btn-default">Sauvegarder</button><button type="button" class="btn btn-primary">Valider</button>');
+      var boutons = modal.querySelectorAll('.modal-footer > button');
+      boutons[0].onclick = function () { facture.siret = document.getElementById('m_client_siret').value; };
+      boutons[1].onclick = function () {
+        var confirmation = bootbox('bootbox-confirm', 'Valider la facture ?', '<button type="button" class="btn btn-default">Annuler</button><button type="button" class="btn btn-primary">OK</button>');
+        confirmation.querySelector('.modal-footer > button.btn.btn-primary').onclick = function () {
+          var corps = new URLSearchParams();
+          corps.append('numero', facture.numero);
+          corps.append('siret', document.getElementById('m_client_siret').value);
+          fetch('/mock/seres/valider', {method: 'POST', body: corps}).then(function (reponse) {
+            confirmation.remove();
+            modal.remove();
+            if (!reponse.ok) {
+              // Même structure que la page d'erreur d'e-facture : #content > h2:nth-child(9)
+              document.getElementById('content').innerHTML = '<h1>Erreur</h1>' + '<p></p>'.repeat(7) + "<h2>Envoyer le rapport d'erreur</h2>";
+            }
+          });
+        };
+      };
+    }
+  </script>
+</body></html>
+"""
+
+
+def creer_app(portail=None):
+    """
+    Application Flask du portail fictif.
+    :param portail: Instance de PortailFictif (par défaut, sans latence ni échec).
+    """
+    portail = portail or PortailFictif()
+    app = Flask(__name__)
+    app.portail = portail
+
+    @app.before_request
+    def latence():
+        # Les routes de pilotage du portail ne subissent pas la latence simulée
+        if not request.path.startswith("/mock/etat") and not request.path.startswith("/mock/configuration"):
+            portail.attendre()
+
+    def page_connexion(etape, action, login=""):
+        return render_template_string(PAGE_CONNEXION, etape=etape, action=action, suivant=request.full_path, login=login)
+
+    @app.route(CHEMIN_ACCES, methods=["GET"])
+    def acces():
+        if not portail.session_valide(request.cookies.get(COOKIE_SESSION)):
+            return page_connexion("login", CHEMIN_CONNEXION)
+        return render_template_string(PAGE_ACCES)
+
+    @app.route(CHEMIN_CONNEXION, methods=["POST"])
+    def connexion():
+        suivant = request.form.get("suivant") or CHEMIN_ACCES
+        if "password" not in request.form:
+            return render_template_string(PAGE_CONNEXION, etape="password", action=CHEMIN_CONNEXION,
+                                          suivant=suivant, login=request.form.get("login", ""))
+        reponse = make_response(redirect(suivant))
+        reponse.set_cookie(COOKIE_SESSION, portail.ouvrir_session())
+        return reponse
+
+    @app.route("/mock/contrat/<numero>", methods=["GET"])
+    def consulter(numero):
+        if not portail.session_valide(request.cookies.get(COOKIE_SESSION)):
+            return jsonify({"message": "Session expirée."}), 401
+        if not numero or portail.echec():
+            return jsonify({"message": f"Le contrat {numero} est introuvable."}), 404
+        portail.compter("consultations")
+        return jsonify({"details": CHEMIN_DETAILS.replace("<numero>", numero)})
+
+    @app.route(CHEMIN_DETAILS, methods=["GET"])
+    def details(numero):
+        contrat = portail.contrat(numero)
+        selects = [
+            ("facturationPaiemenDelaiI", contrat["delai"], ["30 jours", "45 jours fin de mois", "60 jours"]),
+            ("facturationPaiementModePaiementI", contrat["mode_paiement"], ["Prélèvement", "Virement", "Chèque"]),
+            ("facturationPaiementPeriodiciteI", contrat["periodicite"], ["Mensuelle", "Trimestrielle"]),
+            ("facturationPaiementSupportFactureI", contrat["support_facture"], SUPPORTS_FACTURE),
+        ]
+        return render_template_string(PAGE_DETAILS, c=contrat, selects=selects,
+                                      configurateur=CHEMIN_CONFIGURATEUR.replace("<numero>", numero),
+                                      validation=f"/mock/facturation/{numero}")
+
+    @app.route("/mock/facturation/<numero>", methods=["POST"])
+    def facturation(numero):
+        if portail.echec():
+            return jsonify({"message": "Erreur de validation."}), 500
+        portail.compter("facturations")
+        return jsonify({"numero": numero, "support": request.form.get("support")})
+
+    @app.route(CHEMIN_CONFIGURATEUR, methods=["GET"])
+    def configurateur(numero):
+        contrat = portail.contrat(numero)
+        return render_template_string(PAGE_CONFIGURATEUR, c=contrat, b=BLOCS_REGATE.get(contrat["offre"]),
+                                      roles=ROLES, heures=HEURES, put_contract=CHEMIN_PUT_CONTRACT)
+
+    @app.route(CHEMIN_PUT_CONTRACT, methods=["POST"])
+    def put_contract():
+        # En cas d'échec, l'URL reste sur put-contract : les robots le constatent par EC.url_changes
+        if portail.echec():
+            return PAGE_ERREUR_PUT_CONTRACT, 500
+        try:
+            champs = json.loads(request.form.get("champs", "{}"))
+        except ValueError:
+            champs = {}
+        with portail.lock:
+            portail.soumissions[champs.get("numero")] = champs
+        portail.compter("soumissions")
+        return redirect(f"{CHEMIN_ACCES}?profil=ADV", code=303)
+
+    @app.route(CHEMIN_SERES, methods=["GET", "POST"])
+    def seres():
+        if request.method == "POST":
+            reponse = make_response(redirect(request.full_path.rstrip("?")))
+            reponse.set_cookie(COOKIE_SESSION_SERES, portail.ouvrir_session())
+            return reponse
+        if not portail.session_valide(request.cookies.get(COOKIE_SESSION_SERES)):
+            return render_template_string(PAGE_SERES_CONNEXION, action=request.full_path.rstrip("?"))
+        return render_template_string(PAGE_SERES)
+
+    @app.route("/mock/seres/recherche", methods=["GET"])
+    def seres_recherche():
+        numero = request.args.get("numero", "")
+        if not numero or portail.echec():
+            return jsonify([])
+        valeur = hachage(numero)
+        return jsonify([{"numero": numero, "client": f"CLIENT {valeur % 1000:03d}",
+                         "motif": "SIRET destinataire invalide", "siret": f"{valeur % 10 ** 14:014d}"}])
+
+    @app.route("/mock/seres/valider", methods=["POST"])
+    def seres_valider():
+        if portail.echec():
+            return jsonify({"message": "Erreur de validation."}), 500
+        portail.compter("validations_seres")
+        return jsonify({"numero": request.form.get("numero"), "siret": request.form.get("siret")})
+
+    @app.route("/mock/etat", methods=["GET"])
+    def etat():
+        return jsonify(portail.etat())
+
+    @app.route("/mock/configuration", methods=["POST"])
+    def configuration():
+        try:
+            portail.configurer(request.get_json(silent=True) or request.form)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        return jsonify(portail.etat()["reglages"])
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portail fictif deviscontrat / e-facture pour les tests de charge hors ligne.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--latence", type=float, default=0.0, help="Délai moyen ajouté à chaque requête, en secondes.")
+    parser.add_argument("--gigue", type=float, default=0.0, help="Variation relative de la latence (0 à 1).")
+    parser.add_argument("--taux-echec", type=float, default=0.0, help="Probabilité d'un échec injecté (0 à 1).")
+    parser.add_argument("--graine", type=int, default=None, help="Graine des tirages, pour des exécutions reproductibles.")
+    parser.add_argument("--authentification", action="store_true", help="Exige la connexion avant l'accès aux contrats.")
+    parser.add_argument("--offre", choices=[nom for nom, _ in OFFRES], default=None, help="Offre imposée à tous les contrats.")
+    args = parser.parse_args()
+
+    portail = PortailFictif(args.latence, args.gigue, args.taux_echec, args.graine, args.authentification, args.offre)
+    for variable, url in urls_portail(f"http://{args.host}:{args.port}").items():
+        print(f"{variable}={url}")
+    creer_app(portail).run(host=args.host, port=args.port, threaded=True)
@@ -1,126 +1,344 @@
 import os
 import time
 import threading
-from queue import Queue
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
+import psutil
+from collections import deque
 from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+from rpa_modules.driver_factory import DriverFactory
+from rpa_modules.metrics import (pool_taille, pool_libres, pool_occupes, pool_creations, pool_echecs_creation,
+                                 pool_retraits)
+
 
 class WebDriverPool:
-    def __init__(self, initial_size=5, max_size=30, idle_timeout=100, logger=None):
+    def __init__(self, initial_size=5, max_size=30, idle_timeout=100, ready_at=None, min_size=None,
+                 max_uses=None, max_rss_mb=None, reap_interval=30, driver_factory=None, logger=None):
         """
         Pool de WebDrivers avec auto-ajustement dynamique de la taille du pool.
+
+        Le verrou ne protège que la comptabilité (drivers libres, places réservées) : la création
+        d'un navigateur, la navigation et les contrôles de santé se font hors verrou, pour qu'un
+        démarrage lent de navigateur ne bloque pas les autres threads.
         :param initial_size: Taille initiale du pool (pré-chargement).
         :param max_size: Taille maximale du pool.
         :param idle_timeout: Temps d'inactivité maximum d'un WebDriver avant d'être recyclé.
+        :param ready_at: Nombre de drivers à attendre avant de rendre la main (par défaut, tous) ;
+                         les autres finissent de démarrer en arrière-plan.
+        :param min_size: Taille plancher en dessous de laquelle les drivers inactifs ne sont pas
+                         fermés (par défaut, initial_size).
+        :param max_uses: Nombre d'utilisations après lequel un driver est remplacé (None : illimité).
+        :param max_rss_mb: Mémoire résidente (navigateur et sous-processus, en Mo) au-delà de
+                           laquelle un driver est remplacé à son retour (None : pas de limite).
+        :param reap_interval: Intervalle en secondes entre deux passages du nettoyeur.
+        :param driver_factory: Fabrique des navigateurs (par défaut, navigateur et préréglage de la configuration).
         """
-        self.pool = Queue(maxsize=max_size)
         self.max_size = max_size
-        self.current_size = 0
         self.idle_timeout = idle_timeout
-        self.lock = threading.Lock()
+        self.min_size = min(initial_size if min_size is None else min_size, max_size)
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.reap_interval = reap_interval
+        config = get_config()
+        self.start_url = config.start_url
         self.logger = logger or setup_logger('WebDriverPool.log')
-        self.logger.debug("WebDriverPool initialized with max_size=%d", max_size)
+        if driver_factory is None:
+            backend, preset = config.browser_for()
+            driver_factory = DriverFactory(backend, preset, config.driver_path, config.browser_binary,
+                                           allowlist=config.resource_allowlist, logger=self.logger)
+        self.driver_factory = driver_factory
+        self.lock = threading.Lock()
+        self.disponible = threading.Condition(self.lock)
+        # Drivers libres, et nombre total de drivers existants ou en cours de création
+        self._libres = deque()
+        self.current_size = 0
+        # Jauges lues à chaque export des métriques, sans coût sur le chemin des contrats
+        pool_taille.suivre(lambda: self.current_size)
+        pool_libres.suivre(lambda: len(self._libres))
+        pool_occupes.suivre(lambda: max(0, self.current_size - len(self._libres)))
+        self.logger.debug("WebDriverPool initialized with max_size=%d, %r", max_size, self.driver_factory)
 
         # Pré-charger les instances initiales de WebDriver
-        for _ in range(initial_size):
-            driver = self.create_driver()
-            self.pool.put(driver)
-            self.current_size += 1
+        self._prechauffer(min(initial_size, max_size), ready_at)
+
+        # Nettoyeur des drivers inactifs
+        self._arret = threading.Event()
+        self._nettoyeur = threading.Thread(target=self._nettoyer_en_boucle, name="WebDriverPool-nettoyeur", daemon=True)
+        self._nettoyeur.start()
+
+    def _prechauffer(self, nombre, ready_at=None):
+        """
+        Démarre `nombre` drivers en parallèle et attend que `ready_at` d'entre eux aient fini de
+        démarrer (avec succès ou non). Les places sont réservées d'emblée pour que get_driver
+        attende ces drivers plutôt que d'en créer d'autres.
+        """
+        if nombre <= 0:
+            return
+        ready_at = nombre if ready_at is None else max(0, min(ready_at, nombre))
+        termines = threading.Semaphore(0)
+        with self.lock:
+            self.current_size += nombre
+
+        def demarrer():
+            try:
+                self._rendre_disponible(self.create_driver())
+            except Exception as e:
+                self.logger.error(f"Échec du pré-chargement d'un WebDriver : {e}")
+                self._liberer_place()
+            finally:
+                termines.release()
+
+        debut = time.time()
+        for index in range(nombre):
+            threading.Thread(target=demarrer, name=f"WebDriverPool-prechauffage-{index}", daemon=True).start()
+        for _ in range(ready_at):
+            termines.acquire()
+        self.logger.info(
+            f"Pool prêt en {time.time() - debut:.1f}s : {len(self._libres)} WebDriver(s) disponible(s), "
+            f"{nombre - ready_at} en cours de démarrage en arrière-plan."
+        )
 
     def create_driver(self):
         """
         Crée une nouvelle instance de WebDriver configurée avec les options requises.
+        N'affecte pas la comptabilité du pool.
         """
         try:
             self.logger.debug("Creating a new WebDriver instance")
 
-            driver_path = r'data/driver/msedgedriver.exe'
-
-            service = Service(driver_path)
-            options = Options()
-            options.add_argument("--headless")
-            options.add_argument("--disable-software-rasterizer")
-            options.add_argument('--ignore-certificate-errors')
-            options.add_argument('--ignore-ssl-errors')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument("--log-level=3")
-            options.add_argument("--disable-extensions")
-            options.add_argument("--disable-popup-blocking")
-            options.add_argument("--disable-software-rasterizer")
-
-            driver = webdriver.Edge(service=service, options=options)
+            driver = self.driver_factory.create()
 
             # Naviguer vers l'URL de départ
-            driver.get("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV")
+            driver.get(self.start_url)
+            self.driver_factory.mesurer(driver)
             driver.last_used_time = time.time()
+            driver.use_count = 0
+            # État suivi par le pool : dernière URL chargée par le pool, et page modifiée depuis
+            driver.pool_url = self.start_url
+            driver.pool_dirty = False
 
             self.logger.debug("WebDriver instance created successfully")
+            pool_creations.inc()
             return driver
         except Exception as e:
             self.logger.error(f"Erreur lors de la création du WebDriver: {e}")
+            pool_echecs_creation.inc()
             raise
 
-    def get_driver(self, url=None):
+    def _rendre_disponible(self, driver):
+        with self.disponible:
+            self._libres.append(driver)
+            self.disponible.notify()
+
+    def _liberer_place(self):
+        with self.disponible:
+            self.current_size -= 1
+            self.disponible.notify()
+        self.logger.debug(f"Taille du pool décrémentée : {self.current_size}")
+
+    def _fermer(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.error(f"Erreur lors de la fermeture du WebDriver: {e}")
+
+    def get_driver(self, url=None, timeout=None):
         """
         Obtient un WebDriver du pool, en créant un nouveau si nécessaire.
+
+        Si le pool est plein et qu'aucun driver n'est libre, attend qu'un driver soit rendu ou
+        qu'une place se libère. Le driver n'est renavigué que s'il a servi depuis son dernier
+        chargement ou s'il est sur une autre URL : au plus un chargement de page par utilisation.
+        :param url: URL sur laquelle le driver doit être (par défaut, l'URL de départ).
+        :param timeout: Attente maximale en secondes (None : attente illimitée).
+        :raises TimeoutError: Si aucun driver n'est disponible dans le délai.
         """
-        with self.lock:
-            if not self.pool.empty():
-                driver = self.pool.get()
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self.disponible:
+            while True:
+                if self._libres:
+                    driver = self._libres.popleft()
+                    a_creer = False
+                    break
+                if self.current_size < self.max_size:
+                    # Réserver la place avant de créer le driver hors verrou
+                    self.current_size += 1
+                    driver = None
+                    a_creer = True
+                    break
+                restant = None if limite is None else limite - time.monotonic()
+                if restant is not None and restant <= 0:
+                    raise TimeoutError(f"Aucun WebDriver disponible après {timeout}s (taille maximale du pool : {self.max_size}).")
+                self.disponible.wait(restant)
+
+        url = url or self.start_url
+        try:
+            if not a_creer:
                 self.logger.debug("Réutilisation d'une instance WebDriver existante.")
                 try:
-                    driver.execute_script("return document.readyState")
+                    self._preparer(driver, url)
                 except Exception as e:
                     self.logger.warning(f"WebDriver inactif, recréation: {e}")
-                    driver = self.create_driver()
-            else:
-                if self.current_size < self.max_size:
-                    driver = self.create_driver()
-                    self.current_size += 1
-                    self.logger.debug(f"Nouvelle instance créée (taille actuelle: {self.current_size}).")
-                else:
-                    raise Exception("Taille maximale du pool atteinte.")
+                    pool_retraits.inc(motif="defaillant")
+                    self._fermer(driver)
+                    # Déjà fermé : un échec de la recréation ne doit pas le refermer
+                    driver = None
+                    a_creer = True
+            if a_creer:
+                driver = self.create_driver()
+                self.logger.debug(f"Nouvelle instance créée (taille actuelle: {self.current_size}).")
+                # create_driver charge l'URL de départ : pas de navigation si c'est l'URL demandée
+                self._preparer(driver, url)
+        except Exception:
+            # La place réservée est rendue pour ne pas réduire la capacité du pool
+            if driver is not None:
+                self._fermer(driver)
+            self._liberer_place()
+            raise
 
-            if url:
-                driver.get(url)
-            driver.last_used_time = time.time()
-            return driver
+        driver.last_used_time = time.time()
+        driver.use_count = getattr(driver, "use_count", 0) + 1
+        driver.pool_dirty = True
+        return driver
+
+    def _preparer(self, driver, url):
+        """
+        Amène le driver sur l'URL demandée, sans recharger une page déjà propre.
+        """
+        if getattr(driver, "pool_dirty", True) or getattr(driver, "pool_url", None) != url:
+            driver.get(url)
+            driver.pool_url = url
+            driver.pool_dirty = False
+        else:
+            driver.execute_script("return 1")
 
     def return_driver(self, driver):
+        """
+        Remet un WebDriver dans le pool après un simple contrôle de vie (sans navigation) : la
+        réinitialisation sur l'URL de départ est différée au prochain get_driver.
+        Un driver défectueux est fermé et sa place libérée ; un remplaçant sera créé à la demande.
+        """
+        if not driver:
+            return
+
         with self.lock:
-            if driver:
-                try:
-                    driver.get("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV")
-                    status = driver.execute_script("return document.readyState")
-                    if status != "complete":
-                        raise Exception("WebDriver non opérationnel.")
+            if any(libre is driver for libre in self._libres):
+                self.logger.warning("WebDriver déjà présent dans le pool, retour ignoré.")
+                return
 
-                    self.pool.put(driver)
-                    self.logger.debug(f"WebDriver remis dans le pool. Taille actuelle: {self.pool.qsize()}.")
-                except Exception as e:
-                    self.logger.warning(f"Driver inactif, suppression: {e}")
-                    driver.quit()
-                    self.current_size -= 1
-                    self.logger.debug(f"Taille du pool décrémentée : {self.current_size}")
-                    # Recréer un driver pour maintenir la taille du pool
-                    if self.current_size < self.max_size:
-                        new_driver = self.create_driver()
-                        self.pool.put(new_driver)
-                        self.current_size += 1
-                        self.logger.debug(f"Nouvelle instance créée après suppression d'une défectueuse.")
+        try:
+            self.driver_factory.mesurer(driver)
+        except Exception as e:
+            self.logger.debug(f"Mesure des ressources impossible : {e}")
+
+        motif = self._motif_retrait(driver)
+        if motif:
+            self.logger.info(f"WebDriver retiré du pool ({motif}).")
+            pool_retraits.inc(motif="recyclage")
+            self.discard_driver(driver)
+            return
+
+        try:
+            driver.execute_script("return 1")
+        except Exception as e:
+            self.logger.warning(f"Driver inactif, suppression: {e}")
+            pool_retraits.inc(motif="defaillant")
+            self.discard_driver(driver)
+            return
+
+        driver.last_used_time = time.time()
+        self._rendre_disponible(driver)
+        self.logger.debug(f"WebDriver remis dans le pool. Drivers libres: {len(self._libres)}.")
+
+    def memoire_driver_mo(self, driver):
+        """
+        Mémoire résidente du navigateur piloté par ce driver, sous-processus compris, en Mo.
+        :return: La mémoire en Mo, ou None si les processus ne sont pas accessibles.
+        """
+        try:
+            processus = psutil.Process(driver.service.process.pid)
+            arbre = [processus] + processus.children(recursive=True)
+        except (AttributeError, psutil.Error):
+            return None
+
+        total = 0
+        for process in arbre:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def _motif_retrait(self, driver):
+        """
+        Indique pourquoi un driver doit être remplacé plutôt que remis dans le pool, ou None.
+        """
+        utilisations = getattr(driver, "use_count", 0)
+        if self.max_uses and utilisations >= self.max_uses:
+            return f"{utilisations} utilisations"
+        if self.max_rss_mb:
+            memoire = self.memoire_driver_mo(driver)
+            if memoire is not None and memoire > self.max_rss_mb:
+                return f"mémoire {memoire:.0f} Mo > {self.max_rss_mb} Mo"
+        return None
+
+    def _nettoyer_en_boucle(self):
+        while not self._arret.wait(self.reap_interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                self.logger.error(f"Erreur du nettoyeur de WebDrivers : {e}")
+
+    def evict_idle(self):
+        """
+        Ferme les drivers libres inactifs depuis plus de idle_timeout secondes, sans descendre sous
+        min_size. Les plus anciens sont fermés en premier.
+        :return: Le nombre de drivers fermés.
+        """
+        limite = time.time() - self.idle_timeout
+        with self.disponible:
+            a_fermer = []
+            for driver in sorted(self._libres, key=lambda d: getattr(d, "last_used_time", 0)):
+                if self.current_size - len(a_fermer) <= self.min_size:
+                    break
+                if getattr(driver, "last_used_time", 0) < limite:
+                    a_fermer.append(driver)
+            for driver in a_fermer:
+                self._libres.remove(driver)
+            self.current_size -= len(a_fermer)
+            if a_fermer:
+                self.disponible.notify_all()
+
+        for driver in a_fermer:
+            self._fermer(driver)
+        if a_fermer:
+            pool_retraits.inc(len(a_fermer), motif="inactif")
+            self.logger.info(f"{len(a_fermer)} WebDriver(s) inactif(s) fermé(s). Taille actuelle: {self.current_size}.")
+        return len(a_fermer)
 
+    def discard_driver(self, driver):
+        """
+        Ferme un WebDriver obtenu via get_driver et libère sa place dans le pool.
+        """
+        self._fermer(driver)
+        self._liberer_place()
 
     def close_all(self):
         """
-        Ferme toutes les instances de WebDrivers.
+        Ferme toutes les instances de WebDrivers libres.
         """
         self.logger.info("Fermeture de toutes les instances WebDriver...")
-        with self.lock:
-            while not self.pool.empty():
-                driver = self.pool.get()
-                driver.quit()
-            self.current_size = 0
+        with self.disponible:
+            drivers = list(self._libres)
+            self._libres.clear()
+            self.current_size -= len(drivers)
+            self.disponible.notify_all()
+        for driver in drivers:
+            self._fermer(driver)
         self.logger.info("Toutes les instances WebDriver ont été fermées.")
+
+    def shutdown(self):
+        """
+        Arrête le nettoyeur et ferme toutes les instances libres.
+        """
+        self._arret.set()
+        self.close_all()
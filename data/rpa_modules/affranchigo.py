@@ -1,9 +1,9 @@
 import os
 import json
-import copy
 import traceback
 import pandas as pd
 import threading
+from types import MappingProxyType
 import time
 import psutil
 import csv
@@ -12,16 +12,29 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from concurrent.futures import ThreadPoolExecutor
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 # Importation du setup_logger uniquement
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from rpa_modules.debug import setup_logger
-from rpa_modules.data_processing import extract_contrat_numbers_to_json
+from rpa_modules.scheduler import executer_en_flux
+from rpa_modules.waits import Attente, statistiques_attente
+from rpa_modules.timings import open_timings, chronometre, etape, definir_type_contrat
+from rpa_modules.dom_utils import present
+from rpa_modules.journal import open_journal, STATUT_TRAITE, STATUT_NON_MODIFIABLE, STATUT_MULTISITES
+from rpa_modules.config import get_config
+from rpa_modules.sharding import filtrer_shard
 
 load_dotenv()
 
 STOP_FLAG = False
+# Fichier d'arrêt coopératif, dans le dossier d'état si le lanceur n'en impose pas un
+FICHIER_ARRET = "affranchigo.stop"
+
+# Modes de lancement : tous les contrats, reprise après interruption, ou rejeu des contrats en échec
+MODE_COMPLET = "complet"
+MODE_REPRISE = "reprise"
+MODE_ECHECS = "echecs"
+MODES = (MODE_COMPLET, MODE_REPRISE, MODE_ECHECS)
 
 class AffranchigoRPA:
     def __init__(self, pool, logger=None):
@@ -32,12 +45,16 @@ class AffranchigoRPA:
         """
         self.pool = pool
         self.logger = logger or setup_logger('affranchigo.log')
-        self.file_lock = threading.Lock()
+        self.journal = open_journal(logger=self.logger)
+        self.timings = open_timings(logger=self.logger)
         self.submit_lock = threading.Lock()
         self.STOP_FLAG = False
+        # Fichier déposé par le backend pour demander un arrêt propre entre deux contrats : chemin absolu
+        # transmis par le lanceur (RPA_STOP_FILE), commun à tous les shards d'une exécution répartie
+        self.stop_file = os.getenv("RPA_STOP_FILE") or get_config().state_path(FICHIER_ARRET)
 
         # URL spécifique à Affranchigo
-        self.url = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV"
+        self.url = get_config().start_url
 
     def terminate_high_cpu_processes(self, process_name="msedge.exe", cpu_threshold=15, max_runtime=300):
         for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'create_time']):
@@ -80,18 +97,23 @@ class AffranchigoRPA:
 
         types_count_df = pd.DataFrame(list(contrat_types_count.items()), columns=['Type de contrat', 'Nombre'])
         types_count_df['Nombre'] = types_count_df['Nombre'].astype(int)
-        types_count_df.to_csv('contract_types_count.csv', index=False)
+        types_count_path = get_config().state_path('contract_types_count.csv')
+        types_count_df.to_csv(types_count_path, index=False)
 
         with open(csv_file_path, 'a') as f:
             f.write(f"\nNombre de contrats multisites: {multisites_count}")
             f.write(f"\nNombre de contrats non modifiables: {non_modifiables_count}")
 
-        self.logger.info(f"Résultats enregistrés dans {csv_file_path} et décompte des types de contrats dans contract_types_count.csv")
+        self.logger.info(f"Résultats enregistrés dans {csv_file_path} et décompte des types de contrats dans {types_count_path}")
 
     def login(self, driver, wait, identifiant, mot_de_passe):
         self.logger.debug("Tentative de connexion...")
         try:
-            input_identifiant = wait.until(EC.presence_of_element_located((By.ID, "AUTHENTICATION.LOGIN")))
+            # Absence du formulaire : déjà connecté, constaté en moins de 2 s au lieu d'un timeout complet
+            input_identifiant = present(driver, (By.ID, "AUTHENTICATION.LOGIN"), timeout=2)
+            if input_identifiant is None:
+                self.logger.info("Dejà connecté ou le champ d'identifiant n'est pas présent.")
+                return
             input_identifiant.clear()
             input_identifiant.send_keys(identifiant)
             input_identifiant.send_keys(Keys.RETURN)
@@ -122,6 +144,7 @@ class AffranchigoRPA:
 
         return numeros_contrat
 
+    @chronometre()
     def submit_contract_number(self, driver, wait, numero):
         with self.submit_lock:
             try:
@@ -149,110 +172,77 @@ class AffranchigoRPA:
                 self.logger.error(f"Erreur inattendue lors de la soumission du contrat {numero}: {e}")
                 driver.save_screenshot(f"general_error_{numero}.png")
 
-    def save_processed_contracts(self, contrats, file_path="numeros_contrat_traites.json"):
-        try:
-            with self.file_lock, open(file_path, "r+") as file:
-                try:
-                    existing_data = json.load(file)
-                except json.JSONDecodeError:
-                    existing_data = []
-                updated_data = existing_data + [c for c in contrats if c not in existing_data]
-                file.seek(0)
-                file.truncate()
-                json.dump(updated_data, file)
-        except FileNotFoundError:
-            with self.file_lock, open(file_path, "w") as file:
-                json.dump(contrats, file)
+    def save_processed_contracts(self, contrats):
+        """
+        Enregistre les contrats traités dans le journal (ajout seul, O(1) par contrat).
+        """
+        for numero_contrat in contrats:
+            self.journal.record(numero_contrat, STATUT_TRAITE)
 
     def handle_driver_cleanup(self, driver, numero_contrat):
         """
-        Gère le nettoyage, la réinitialisation et le retour du WebDriver au pool.
+        Réinitialise le WebDriver à l'URL de départ après une erreur en cours de traitement.
+        Le driver reste détenu par le thread du contrat, qui le rend au pool (process_single_contract).
         """
         if not driver:
             return
 
         try:
-            # Réinitialiser le WebDriver à l'URL de départ
             driver.get(self.url)
             self.logger.debug(f"WebDriver réinitialisé à l'URL de départ pour le contrat {numero_contrat}.")
-            self.pool.return_driver(driver)
-            self.logger.debug(f"WebDriver retourné au pool pour le contrat {numero_contrat}.")
         except Exception as reset_error:
-            self.logger.error(f"Erreur lors de la réinitialisation ou du retour du WebDriver au pool pour {numero_contrat}: {reset_error}")
-            try:
-                driver.quit()
-                self.logger.debug("WebDriver défectueux fermé avec succès.")
-            except Exception as quit_error:
-                self.logger.error(f"Erreur lors de la fermeture du WebDriver: {quit_error}")
-            finally:
-                try:
-                    # Créer un nouveau WebDriver si le précédent a échoué
-                    new_driver = self.pool.create_driver()
-                    self.pool.return_driver(new_driver)
-                    self.logger.debug("Nouveau WebDriver créé et ajouté au pool après défaillance.")
-                except Exception as creation_error:
-                    self.logger.critical(f"Erreur critique lors de la création d'un nouveau WebDriver: {creation_error}")
+            self.logger.error(f"Erreur lors de la réinitialisation du WebDriver pour {numero_contrat}: {reset_error}")
                     
+    @staticmethod
+    def normaliser_regate(valeur):
+        """
+        Normalise un code REGATE lu dans l'Excel (float, int ou texte) en chaîne, ou None si absent.
+        """
+        if valeur is None or pd.isna(valeur):
+            return None
+        if isinstance(valeur, float):
+            return str(int(valeur))
+        valeur = str(valeur).strip()
+        return valeur or None
+
     def create_dictionnaire(self, excel_path):
-        df = pd.read_excel(excel_path)
+        """
+        Construit l'index partagé des contrats à partir du fichier de transfert.
+
+        Le fichier Excel n'est lu qu'une seule fois par exécution ; l'index retourné est en lecture
+        seule, indexé par 'Contrat Nb', et contient des codes REGATE déjà normalisés.
+        :param excel_path: Chemin vers le fichier Excel de transfert.
+        :return: Mapping en lecture seule {numéro de contrat: codes REGATE}.
+        """
+        colonnes_regate = [
+            'Code REGATE Dépôt actuel',
+            'Nouveau code REGATE Dépôt',
+            'Code REGATE Traitement actuel',
+            'Nouveau code REGATE Traitement'
+        ]
+        df = pd.read_excel(excel_path, usecols=['Contrat Nb'] + colonnes_regate)
         dictionnaire = {}
-        for index, row in df.iterrows():
-            numero_contrat = row['Contrat Nb']
-            regate_depot_ancien = str(int(row['Code REGATE Dépôt actuel'])) if not pd.isna(row['Code REGATE Dépôt actuel']) else None
-            regate_depot_nouveau = str(int(row['Nouveau code REGATE Dépôt'])) if not pd.isna(row['Nouveau code REGATE Dépôt']) else None
-            regate_traitement_ancien = str(int(row['Code REGATE Traitement actuel'])) if not pd.isna(row['Code REGATE Traitement actuel']) else None
-            regate_traitement_nouveau = str(int(row['Nouveau code REGATE Traitement'])) if not pd.isna(row['Nouveau code REGATE Traitement']) else None
-
-            dictionnaire[numero_contrat] = {
-                'Code REGATE Dépôt actuel': regate_depot_ancien,
-                'Nouveau code REGATE Dépôt': regate_depot_nouveau,
-                'Code REGATE Traitement actuel': regate_traitement_ancien,
-                'Nouveau code REGATE Traitement': regate_traitement_nouveau
-            }
-        return dictionnaire
-
-
-    def save_non_modifiable_contract_mutli_sites(self, contrat_number, file_path="annexe_multisites.json"):
-        data = set()
-        try:
-            with self.file_lock, open(file_path, "r") as file:
-                existing_data = json.load(file)
-                data.update(existing_data)
-        except FileNotFoundError:
-            self.logger.debug("Le fichier n'existe pas, il sera créé.")
-        except json.JSONDecodeError:
-            self.logger.error("Erreur de décodage JSON, le fichier est peut-être corrompu.")
-
-        if contrat_number not in data:
-            data.add(contrat_number)
-            with self.file_lock, open(file_path, "w") as file:
-                json.dump(list(data), file)
+        for row in df.to_dict('records'):
+            dictionnaire[row['Contrat Nb']] = MappingProxyType({
+                colonne: self.normaliser_regate(row[colonne]) for colonne in colonnes_regate
+            })
+        self.logger.info(f"Index des contrats construit : {len(dictionnaire)} contrats.")
+        return MappingProxyType(dictionnaire)
+
+
+    def save_non_modifiable_contract_mutli_sites(self, contrat_number):
+        if self.journal.record(contrat_number, STATUT_MULTISITES):
             self.logger.debug(f"Contrat numéro {contrat_number} ajouté.")
             return True
-        else:
-            self.logger.debug(f"Contrat numéro {contrat_number} déjà présent, non ajouté.")
-            return False
+        self.logger.debug(f"Contrat numéro {contrat_number} déjà présent, non ajouté.")
+        return False
 
-    def save_non_modifiable(self, contrat_number, file_path="problèmes_contrats_2.json"):
-        data = set()
-        try:
-            with self.file_lock, open(file_path, "r") as file:
-                existing_data = json.load(file)
-                data.update(existing_data)
-        except FileNotFoundError:
-            self.logger.debug("Le fichier n'existe pas, il sera créé.")
-        except json.JSONDecodeError:
-            self.logger.error("Erreur de décodage JSON, le fichier est peut-être corrompu.")
-
-        if contrat_number not in data:
-            data.add(contrat_number)
-            with self.file_lock, open(file_path, "w") as file:
-                json.dump(list(data), file)
+    def save_non_modifiable(self, contrat_number):
+        if self.journal.record(contrat_number, STATUT_NON_MODIFIABLE):
             self.logger.info(f"Contrat numéro {contrat_number} ajouté aux non modifiables.")
             return True
-        else:
-            self.logger.debug(f"Contrat numéro {contrat_number} déjà présent, non ajouté.")
-            return False
+        self.logger.debug(f"Contrat numéro {contrat_number} déjà présent, non ajouté.")
+        return False
 
     def handle_non_clickable_element(self, driver, numero_contrat):
         """Gestion des contrats multi-sites ou cas spécifiques."""
@@ -274,6 +264,7 @@ class AffranchigoRPA:
         
 
 
+    @chronometre("iframe_modification")
     def switch_to_iframe_and_click_modification(self, driver, wait, contrat_number):
         """
         Change vers un iframe et clique sur un bouton de modification.
@@ -291,7 +282,7 @@ class AffranchigoRPA:
             iframe = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, iframe_selector)))
             driver.switch_to.frame(iframe)
             self.logger.debug(f"{contrat_number} * Passé à l'iframe avec succès.")
-            time.sleep(2)
+            Attente(driver, self.logger).dom_stable("affranchigo.iframe_modification", timeout=2)
             # Cliquer sur le bouton de modification
             bouton_modification = wait.until(EC.element_to_be_clickable((By.XPATH, modification_button_selector)))
             driver.execute_script("arguments[0].scrollIntoView(true);", bouton_modification)
@@ -305,6 +296,7 @@ class AffranchigoRPA:
             driver.switch_to.default_content()
             self.logger.debug(f"{contrat_number} * Retour au contenu principal effectué.")
 
+    @chronometre()
     def wait_for_complete_redirection(self, driver, wait, numero_contrat, timeout=20):
         """
         Attend la redirection complète et clique sur un élément cible.
@@ -328,7 +320,8 @@ class AffranchigoRPA:
         finally:
             self.logger.debug(f"{numero_contrat} * Fin de la tentative de redirection.")
 
-    def modifications_conditions_ventes(self, driver, wait, numero_contrat, dictionnaire, dictionnaire_original):
+    @chronometre()
+    def modifications_conditions_ventes(self, driver, wait, numero_contrat, dictionnaire):
         # Importer les modules localement pour éviter les boucles d'importation circulaire
         from rpa_modules.affranchigo_forfait_case import AffranchigoForfaitCase
         from rpa_modules.affranchigo_lib_case import AffranchigoLibCase
@@ -338,25 +331,26 @@ class AffranchigoRPA:
         from rpa_modules.collecte_remise_case import CollecteRemise
         from rpa_modules.affranchigo_premium import AffranchigoPremiumCase
 
-        affranchigo_premium_case = AffranchigoPremiumCase(driver, self.logger)
-        affranchigo_forfait_case = AffranchigoForfaitCase(driver, self.logger)
-        affranchigo_liberte_case = AffranchigoLibCase(driver, self.logger)
-        destineo_case = DestineoCase(driver, self.logger)
-        frequenceo_case = FrequenceoCase(driver, self.logger)
-        proxicompte_case = ProxicompteCase(driver, self.logger)
-        collecte_remise_case = CollecteRemise(driver, self.logger)
+        affranchigo_premium_case = AffranchigoPremiumCase(driver, self.pool, self.logger, journal=self.journal)
+        affranchigo_forfait_case = AffranchigoForfaitCase(driver, self.pool, self.logger, journal=self.journal)
+        affranchigo_liberte_case = AffranchigoLibCase(driver, self.pool, self.logger, journal=self.journal)
+        destineo_case = DestineoCase(driver, self.pool, self.logger)
+        frequenceo_case = FrequenceoCase(driver, self.pool, self.logger)
+        proxicompte_case = ProxicompteCase(driver, self.pool, self.logger)
+        collecte_remise_case = CollecteRemise(driver, self.pool, self.logger)
 
         try:
-            # Attendre que la page soit complètement chargée
-            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            self.logger.debug("La page est complètement chargée")
+            with etape("detection_entete"):
+                # Attendre que la page soit complètement chargée
+                WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+                self.logger.debug("La page est complètement chargée")
 
-            # Attendre que la page soit complètement chargée avant de chercher l'élément
-            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
-            time.sleep(3)
-            h1_element = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "#header_offre_descr > h1")))
+                # Attendre que la page soit complètement chargée avant de chercher l'élément
+                WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
+                Attente(driver, self.logger).dom_stable("affranchigo.entete_offre", timeout=3)
+                h1_element = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "#header_offre_descr > h1")))
 
-            h1_text = h1_element.text
+                h1_text = h1_element.text
             self.logger.info(f"Texte de l'en-tête H1: {h1_text}")
             if "Affranchigo Premium" in h1_text:
                 self.logger.info("Contrat Affranchigo Premium")
@@ -364,12 +358,7 @@ class AffranchigoRPA:
                 return "Affranchigo liberté"
             elif "Affranchigo forfait" in h1_text:
                 self.logger.info("Contrat Affranchigo forfait")
-                if not isinstance(dictionnaire, dict):
-                    self.logger.error(f"Type incorrect de 'dictionnaire' détecté: {type(dictionnaire)}; restauration en cours.")
-                    dictionnaire = copy.deepcopy(dictionnaire_original)
-                    self.logger.debug(f"Dictionnaire type: {type(dictionnaire)}")
-                else:
-                    affranchigo_forfait_case.handle_case_forfait(driver, numero_contrat, dictionnaire)
+                affranchigo_forfait_case.handle_case_forfait(driver, numero_contrat, dictionnaire)
                 return "Affranchigo forfait"
             elif "Affranchigo liberté" in h1_text:
                 self.logger.info("Contrat Affranchigo liberté")
@@ -402,7 +391,7 @@ class AffranchigoRPA:
             self.handle_driver_cleanup(driver, numero_contrat)
             return "Erreur"
 
-    def process_contract(self, driver, numero_contrat, dictionnaire, dictionnaire_original, identifiant, mot_de_passe):
+    def process_contract(self, driver, numero_contrat, dictionnaire, identifiant, mot_de_passe):
         wait = WebDriverWait(driver, 20)  # Augmentation du délai pour le WebDriver
         start_time = time.time()
 
@@ -413,9 +402,10 @@ class AffranchigoRPA:
             # Traitement du contrat (soumission, modifications, etc.)
             self.submit_contract_number(driver, wait, numero_contrat)
             self.switch_to_iframe_and_click_modification(driver, wait, numero_contrat)
-            time.sleep(3)
+            Attente(driver, self.logger).dom_stable("affranchigo.redirection_modification", timeout=3)
             self.wait_for_complete_redirection(driver, wait, numero_contrat)
-            contrat_type = self.modifications_conditions_ventes(driver, wait, numero_contrat, dictionnaire, dictionnaire_original)
+            contrat_type = self.modifications_conditions_ventes(driver, wait, numero_contrat, dictionnaire)
+            definir_type_contrat(contrat_type)
 
             self.logger.info(f"{numero_contrat} * Traitement terminé.")
             self.save_processed_contracts([numero_contrat])
@@ -428,92 +418,86 @@ class AffranchigoRPA:
         except Exception as e:
             self.logger.error(f"Erreur lors du traitement du contrat {numero_contrat}: {e}")
             self.save_non_modifiable(numero_contrat)
+            definir_type_contrat("Erreur")
 
-            # Réinitialisation du driver après l'erreur
-            try:
-                driver.get(self.url)
-            except Exception as reset_error:
-                self.logger.error(f"Erreur lors de la réinitialisation du WebDriver pour {numero_contrat}: {reset_error}")
-                driver.quit()  # Fermer le driver si la réinitialisation échoue
-                driver = None  # Forcer la recréation d'un nouveau driver pour le prochain contrat
-
+            # Le driver est remis au pool par process_single_contract : un driver mort y est écarté,
+            # sinon il est ramené sur l'URL de départ à sa prochaine utilisation
             end_time = time.time()
             duration = int(end_time - start_time)
             return (numero_contrat, False, "Erreur", duration)
 
 
-    def process_single_contract(self, numero_contrat, dictionnaire, dictionnaire_original, identifiant, mot_de_passe):
+    def process_single_contract(self, numero_contrat, dictionnaire, identifiant, mot_de_passe):
         """
         Fonction qui traite un contrat individuel dans un thread séparé.
         """
-        driver = None
-        try:
-            driver = self.pool.get_driver()  # Récupère un WebDriver pour le contrat
-            self.logger.debug(f"WebDriver récupéré avec succès pour le contrat {numero_contrat}.")
+        with self.timings.contrat(numero_contrat, "affranchigo") as suivi:
+            driver = None
+            try:
+                with etape("get_driver"):
+                    driver = self.pool.get_driver()  # Récupère un WebDriver pour le contrat
+                suivi.associer_driver(driver)
+                self.logger.debug(f"WebDriver récupéré avec succès pour le contrat {numero_contrat}.")
 
-            # Appel à la fonction process_contract pour traiter le contrat
-            return self.process_contract(driver, numero_contrat, dictionnaire, dictionnaire_original, identifiant, mot_de_passe)
+                # Appel à la fonction process_contract pour traiter le contrat
+                return self.process_contract(driver, numero_contrat, dictionnaire, identifiant, mot_de_passe)
 
-        except Exception as e:
-            self.logger.error(f"Erreur lors du traitement du contrat {numero_contrat}: {e}", exc_info=True)
-            return (numero_contrat, False, "Erreur", 0)
+            except Exception as e:
+                self.logger.error(f"Erreur lors du traitement du contrat {numero_contrat}: {e}", exc_info=True)
+                return (numero_contrat, False, "Erreur", 0)
 
-        finally:
-            if driver:
-                try:
-                    # Réinitialiser le WebDriver à l'URL de départ
-                    driver.get(self.url)
-                    self.logger.debug(f"WebDriver réinitialisé à l'URL de départ pour le contrat {numero_contrat}.")
-                except Exception as reset_error:
-                    # Si la réinitialisation échoue, détruire le driver
-                    self.logger.error(f"Erreur lors de la réinitialisation du WebDriver pour {numero_contrat}: {reset_error}")
-                    try:
-                        driver.quit()
-                        self.logger.debug("WebDriver défectueux fermé avec succès.")
-                    except Exception as quit_error:
-                        self.logger.error(f"Erreur lors de la fermeture du WebDriver: {quit_error}")
-                    finally:
-                        driver = None  # Forcer la création d'un nouveau WebDriver
-
-                # Retourner le WebDriver au pool ou en créer un nouveau
+            finally:
                 if driver:
+                    # Le pool vérifie que le driver est vivant et le ramènera sur l'URL de départ à sa prochaine utilisation
                     try:
-                        self.pool.return_driver(driver)
+                        with etape("return_driver"):
+                            self.pool.return_driver(driver)
                         self.logger.debug(f"WebDriver retourné au pool pour le contrat {numero_contrat}.")
                     except Exception as pool_error:
                         self.logger.error(f"Erreur lors du retour du WebDriver au pool pour {numero_contrat}: {pool_error}")
-                        try:
-                            driver.quit()
-                            self.logger.debug("WebDriver fermé après échec de retour au pool.")
-                        except Exception as quit_error:
-                            self.logger.error(f"Erreur lors de la fermeture du WebDriver: {quit_error}")
-                        finally:
-                            driver = None
-                else:
-                    # Créer un nouveau WebDriver si le précédent a échoué
-                    try:
-                        new_driver = self.pool.create_driver()
-                        self.pool.return_driver(new_driver)
-                        self.logger.debug("Nouveau WebDriver créé et ajouté au pool après défaillance.")
-                    except Exception as creation_error:
-                        self.logger.critical(f"Erreur critique lors de la création d'un nouveau WebDriver: {creation_error}")
 
 
-    def main(self, progress_callback=None, max_workers=5):
+    def filtrer_contrats(self, contract_numbers, mode=MODE_COMPLET):
         """
-        Méthode principale pour le traitement du RPA avec multi-threading.
+        Filtre la liste de travail selon le journal des contrats avant toute soumission.
+        :param contract_numbers: Numéros de contrat issus du fichier Excel, dans l'ordre.
+        :param mode: MODE_COMPLET (aucun filtre), MODE_REPRISE (ignore les contrats déjà traités)
+                     ou MODE_ECHECS (ne rejoue que les contrats en échec pas encore traités).
+        :return: La liste filtrée, dans l'ordre d'origine.
         """
-        self.logger.debug("Démarrage du RPA Affranchigo en multi-threading...")
-        excel_path = "data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx"
-        json_path = 'data/numeros_contrat_robot.json'
+        if mode not in MODES:
+            raise ValueError(f"Mode inconnu : {mode}. Modes disponibles : {', '.join(MODES)}")
+
+        if mode == MODE_REPRISE:
+            deja_traites = self.journal.contracts(STATUT_TRAITE)
+            filtres = [numero for numero in contract_numbers if numero not in deja_traites]
+        elif mode == MODE_ECHECS:
+            # Un contrat en échec puis traité lors d'un rejeu précédent n'est plus à rejouer
+            en_echec = self.journal.contracts(STATUT_NON_MODIFIABLE) - self.journal.contracts(STATUT_TRAITE)
+            filtres = [numero for numero in contract_numbers if numero in en_echec]
+        else:
+            filtres = list(contract_numbers)
 
-        # Extraction des numéros de contrat
-        extract_contrat_numbers_to_json(excel_path, json_path)
+        self.logger.info(f"Mode {mode} : {len(filtres)} contrat(s) à traiter sur {len(contract_numbers)}.")
+        return filtres
 
-        dictionnaire_original = self.create_dictionnaire(excel_path)
-        dictionnaire = copy.deepcopy(dictionnaire_original)
+    def main(self, progress_callback=None, max_workers=5, mode=MODE_COMPLET, shard=None):
+        """
+        Méthode principale pour le traitement du RPA avec multi-threading.
+        :param progress_callback: Fonction appelée après chaque contrat (voir progress.Progression).
+        :param max_workers: Nombre de threads de traitement.
+        :param mode: Mode de lancement (voir filtrer_contrats).
+        :param shard: Tuple (index, nombre de shards) pour ne traiter qu'une partie des contrats.
+        """
+        self.logger.debug("Démarrage du RPA Affranchigo en multi-threading...")
+        excel_path = get_config().data_path("ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx")
 
-        contract_numbers = self.process_json_files(json_path)
+        # Index partagé en lecture seule : l'Excel n'est lu qu'une fois et n'est plus relu par les cas de traitement
+        dictionnaire = self.create_dictionnaire(excel_path)
+        contract_numbers = self.filtrer_contrats(list(dictionnaire), mode)
+        if shard is not None:
+            contract_numbers = filtrer_shard(contract_numbers, shard)
+            self.logger.info(f"Shard {shard[0]}/{shard[1]} : {len(contract_numbers)} contrat(s) à traiter.")
 
         identifiant = os.getenv("IDENTIFIANT")
         mot_de_passe = os.getenv("MOT_DE_PASSE")
@@ -524,18 +508,32 @@ class AffranchigoRPA:
         multisites_count = 0
         non_modifiables_count = 0
 
-        # Utilisation d'un ThreadPoolExecutor pour le traitement multi-threading
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for numero_contrat in contract_numbers:
-                self.logger.debug(f"Préparation pour traiter le contrat suivant: {numero_contrat}")
+        # Ordonnancement en flux : au plus 2 x max_workers contrats en vol, le suivant est tiré à la demande
+        total_contrats = len(contract_numbers)
+        traites = 0
+        self.STOP_FLAG = False
+        # Le fichier d'arrêt appartient au lanceur (backend, coordinateur) : il est lu ici mais jamais
+        # effacé, pour qu'une demande arrivée pendant le chargement ne soit pas perdue
+        if os.path.exists(self.stop_file):
+            self.logger.warning(f"Demande d'arrêt présente au démarrage ({self.stop_file}) : aucun contrat ne sera soumis.")
+
+        def traiter(numero_contrat):
+            return self.process_single_contract(numero_contrat, dictionnaire, identifiant, mot_de_passe)
 
-                # Planification du traitement de chaque contrat dans un thread séparé
-                future = executor.submit(self.process_single_contract, numero_contrat, dictionnaire, dictionnaire_original, identifiant, mot_de_passe)
-                futures.append(future)
+        if progress_callback:
+            progress_callback(0, total=total_contrats)
 
-            # Collecter les résultats des threads au fur et à mesure
-            for future in as_completed(futures):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            flux = executer_en_flux(
+                executor,
+                (numero_contrat for numero_contrat in contract_numbers),
+                traiter,
+                max_en_cours=2 * max_workers,
+                arret_demande=self.arret_demande,
+                logger=self.logger
+            )
+            for numero_contrat, future in flux:
+                result, contrat_type = False, None
                 try:
                     numero_contrat, result, contrat_type, duration = future.result()
                     results.append((numero_contrat, result, duration, contrat_type))
@@ -555,10 +553,18 @@ class AffranchigoRPA:
                     else:
                         self.logger.warning(f"Échec du traitement du contrat {numero_contrat}.")
                 except Exception as e:
-                    self.logger.error(f"Erreur dans le thread de traitement: {e}")
+                    self.logger.error(f"Erreur dans le thread de traitement pour {numero_contrat}: {e}")
+
+                traites += 1
+                if progress_callback:
+                    progress_callback((traites / total_contrats) * 100, total=total_contrats,
+                                      succes=bool(result), type_contrat=contrat_type)
+
+        if self.arret_demande():
+            self.logger.warning(f"RPA Affranchigo arrêté à la demande : {traites}/{total_contrats} contrats traités.")
 
         # Enregistrer les statistiques dans un fichier CSV
-        csv_file_path = "resultats_traitement.csv"
+        csv_file_path = get_config().state_path("resultats_traitement.csv")
         self.save_results_to_csv(
             results,
             contrat_types_count,
@@ -567,8 +573,8 @@ class AffranchigoRPA:
             csv_file_path
         )
 
-        self.logger.info("Tous les contrats ont été traités avec multi-threading.")
-
+        # Temps réellement passé à attendre, par étape
+        statistiques_attente.journaliser(self.logger)
 
         self.logger.info("Tous les contrats ont été traités avec multi-threading.")
 
@@ -578,9 +584,16 @@ class AffranchigoRPA:
         """
         self.main()
 
+    def arret_demande(self):
+        """
+        Indique si un arrêt coopératif a été demandé, soit par stop(), soit par le backend via le
+        fichier d'arrêt (le RPA tourne dans un sous-processus).
+        """
+        return self.STOP_FLAG or os.path.exists(self.stop_file)
+
     def stop(self):
         """
-        Arrête le processus du RPA.
+        Arrête le processus du RPA : plus aucun contrat n'est soumis, les contrats en cours se terminent.
         """
         self.logger.info("Arrêt du RPA Affranchigo en cours...")
         self.STOP_FLAG = True
@@ -1,7 +1,4 @@
-import time
 import copy
-import json
-import pandas as pd
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, ElementClickInterceptedException
@@ -10,42 +7,35 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
 
 from rpa_modules.debug import setup_logger
+from rpa_modules.waits import Attente
+from rpa_modules.timings import chronometre
+from rpa_modules.dom_utils import sonder, sonder_bloc
+from rpa_modules.journal import open_journal, STATUT_RE_TRAITEMENT_FORFAIT
+from rpa_modules.config import get_config
 
 class AffranchigoForfaitCase:
-    def __init__(self, driver, pool, logger=None):
+    def __init__(self, driver, pool, logger=None, journal=None):
         """
         Initialise la classe avec un WebDriver, un pool, et un logger.
         :param driver: L'instance de WebDriver à utiliser.
         :param pool: Le pool de WebDrivers partagé.
         :param logger: Logger pour les logs. Un logger par défaut est créé si non fourni.
+        :param journal: Journal des contrats partagé. L'instance par défaut est utilisée si non fourni.
         """
         self.driver = driver  # Initialisation du WebDriver
         self.pool = pool
         self.logger = logger or setup_logger("affranchigo_forfait_case.log")
+        self.journal = journal or open_journal(logger=self.logger)
+        self.attente = Attente(driver, self.logger)
     
     def save_non_modifiable_contract(self, numero_contrat):
-        """Enregistre le numéro de contrat dans un fichier JSON en évitant les doublons."""
-        file_path = "re_traitement_forfait.json"
-        data = set()  # Utiliser un ensemble pour éviter les doublons
-
-        try:
-            self.logger.debug(f"Lecture du fichier existant : {file_path}")
-            with open(file_path, "r") as file:
-                existing_data = json.load(file)
-                data.update(existing_data)  # Mise à jour de l'ensemble avec les données existantes
-        except FileNotFoundError:
-            self.logger.debug("Le fichier n'existe pas, il sera créé.")
-        except json.JSONDecodeError:
-            self.logger.error("Erreur de décodage JSON, le fichier est peut-être corrompu.")
-
-        if numero_contrat not in data:
-            data.add(numero_contrat)
-            with open(file_path, "w") as file:
-                json.dump(list(data), file)  # Convertir l'ensemble en liste pour la sérialisation
+        """Enregistre le numéro de contrat à retraiter dans le journal des contrats."""
+        if self.journal.record(numero_contrat, STATUT_RE_TRAITEMENT_FORFAIT):
             self.logger.debug(f"Contrat numéro {numero_contrat} ajouté.")
         else:
             self.logger.debug(f"Contrat numéro {numero_contrat} déjà présent, non ajouté.")
 
+    @chronometre()
     def submit_forfait(self, numero_contrat):
         button_selectors = [
             "#odcFormCPV > button",
@@ -73,17 +63,12 @@ class AffranchigoForfaitCase:
         try:
             WebDriverWait(self.driver, 10).until(
                 EC.url_changes(
-                    "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/configurateur/put-contract"
+                    get_config().put_contract_url
                 )
             )
             self.logger.info(f"{numero_contrat} * Formulaire soumis avec succès.")
-            time.sleep(3)
-            try:
-                url_de_depart = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc"
-                self.driver.get(url_de_depart)
-                self.logger.debug("Retour à l'URL de départ réussi.")
-            except Exception as e:
-                self.logger.critical(f"Erreur lors de la navigation vers l'URL de départ : {e}")
+            self.attente.dom_stable("forfait.page_apres_soumission", timeout=3)
+            # Le retour à l'URL de départ est fait par le pool, une seule fois, à la prochaine utilisation du driver
         except TimeoutException:
             self.logger.error(f"{numero_contrat} * Le bouton de soumission n'a pas déclenché le changement d'URL dans les temps.")
         except Exception as e:
@@ -102,6 +87,7 @@ class AffranchigoForfaitCase:
         else:
             return selector.get_attribute('value')
 
+    @chronometre()
     def initialize_selectors(self):
         selectors = {}
         try:
@@ -109,21 +95,27 @@ class AffranchigoForfaitCase:
             selectors["radio_non"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v0")))
             selectors["radio_oui"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v1")))
 
-            if selectors["radio_oui"].is_selected():
-                selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select")))
-                selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487")))
-                selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select")))
-            else:
-                selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select")))
-                selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487")))
-                selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select")))
-                selectors["select_second_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(9) select")))
-                selectors["input_second_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487[0]")))
-                selectors["select_second_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(3) select")))
+            localisateurs = {
+                "select_first_role": (By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select"),
+                "input_first_regate": (By.ID, "g0_p159|0_r486_c487"),
+                "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select"),
+            }
+            if not selectors["radio_oui"].is_selected():
+                localisateurs.update({
+                    "select_second_role": (By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(9) select"),
+                    "input_second_regate": (By.ID, "g0_p159|0_r486_c487[0]"),
+                    "select_second_etablissement": (By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(3) select"),
+                })
+            # Tous les champs sont requis : la sonde garde l'attente d'origine
+            selectors.update(sonder(self.driver, localisateurs, timeout=10))
+            manquants = [nom for nom in localisateurs if nom not in selectors]
+            if manquants:
+                self.logger.error(f"Sélecteurs introuvables : {', '.join(manquants)}")
         except Exception as e:
             self.logger.error(f"Erreur lors de l'initialisation des selecteurs: {e}")
         return selectors
     
+    @chronometre()
     def initialize_selectors_radio_oui(self):
         selectors = {}
         try:
@@ -133,17 +125,21 @@ class AffranchigoForfaitCase:
             selectors["radio_oui"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v1")))
             self.logger.debug("Sélecteur radio_oui initialisé.")
 
-            selectors["radio_non"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v0")))
-            self.logger.debug("Sélecteur radio_non initialisé.")
-
-            selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487")))
-            self.logger.debug("Sélecteur input_first_regate initialisé.")
-            
-            selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select")))
-            self.logger.debug("Sélecteur select_first_etablissement initialisé.")
-            
-            selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select")))
-            self.logger.debug("Sélecteur select_first_role initialisé.")
+            # Un seul passage par sonde : les champs du bloc sont attendus comme avant, radio_non,
+            # absent selon la mise en page, ne dispose que d'une courte sonde
+            localisateurs = {
+                "radio_non": (By.ID, "g0_p159|0_c25258_v0"),
+                "input_first_regate": (By.ID, "g0_p159|0_r486_c487"),
+                "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select"),
+                "select_first_role": (By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select"),
+            }
+            requis = ["input_first_regate", "select_first_etablissement", "select_first_role"]
+            selectors.update(sonder_bloc(self.driver, localisateurs, requis=requis, timeout=20))
+            manquants = [nom for nom in requis if nom not in selectors]
+            if manquants:
+                self.logger.error(f"Sélecteurs radio_oui introuvables : {', '.join(manquants)}")
+            else:
+                self.logger.debug("Sélecteurs radio_oui initialisés.")
 
         except TimeoutException as e:
             self.logger.error(f"Timeout lors de l'initialisation des sélecteurs radio_oui: {e}")
@@ -152,6 +148,7 @@ class AffranchigoForfaitCase:
 
         return selectors
     
+    @chronometre()
     def initialize_selectors_radio_non(self):
         selectors = {}
         try:
@@ -160,17 +157,19 @@ class AffranchigoForfaitCase:
             
             selectors["radio_non"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v0")))
 
-            selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select")))
-
-            selectors["select_second_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(9) select")))
-
-            selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487")))
-
-            selectors["input_second_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487[0]")))
-
-            selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select")))
-
-            selectors["select_second_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(3) select")))
+            # Tous les champs des deux blocs sont requis : la sonde garde l'attente d'origine
+            localisateurs = {
+                "select_first_role": (By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(9) select"),
+                "select_second_role": (By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(9) select"),
+                "input_first_regate": (By.ID, "g0_p159|0_r486_c487"),
+                "input_second_regate": (By.ID, "g0_p159|0_r486_c487[0]"),
+                "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p159\\|0_r486\\[0\\] critere-form:nth-child(3) select"),
+                "select_second_etablissement": (By.CSS_SELECTOR, "#\\[g0_p159\\|0_r486\\[0\\]\\] critere-form:nth-child(3) select"),
+            }
+            selectors.update(sonder(self.driver, localisateurs, timeout=10))
+            manquants = [nom for nom in localisateurs if nom not in selectors]
+            if manquants:
+                self.logger.error(f"Sélecteurs radio_non introuvables : {', '.join(manquants)}")
 
         except TimeoutException as e:
             self.logger.error(f"Timeout lors de l'initialisation des sélecteurs radio_non: {e}")
@@ -179,6 +178,7 @@ class AffranchigoForfaitCase:
 
         return selectors
 
+    @chronometre()
     def choice_time(self, numero_contrat):
         select_time_selectors_primary = [
             "#g0_p159\\|0_r486\\[0\\] > div > critere-form:nth-child(5) > div.form-group.critere_psc > input-component select",
@@ -258,6 +258,7 @@ class AffranchigoForfaitCase:
         except TimeoutException:
             return None
 
+    @chronometre()
     def update_input(self, element, new_value, numero_contrat):
         self.logger.debug(f"Tentative de mise à jour de l'input avec la nouvelle valeur: {new_value}")
         if element is None:
@@ -271,6 +272,7 @@ class AffranchigoForfaitCase:
         element.send_keys(Keys.TAB)
         self.logger.debug(f"{numero_contrat} * Nouveau code régate attribué {new_value}")
 
+    @chronometre()
     def update_select_element(self, driver, select_element, numero_contrat):
         self.logger.debug(f"Mise à jour de l'élément select: {select_element}")
 
@@ -321,6 +323,7 @@ class AffranchigoForfaitCase:
         except Exception as e:
             self.logger.error(f"Erreur lors de la sélection du rôle '{role}' : {e}")
 
+    @chronometre()
     def click_condtions_particulieres_de_realisations(self, driver, numero_contrat):
         wait = WebDriverWait(driver, 10)
         target_selector = "#content_offre > ul > li:nth-child(3) > a"
@@ -348,63 +351,42 @@ class AffranchigoForfaitCase:
         except Exception as e:
             self.logger.exception(f"Erreur inattendue : {e}")
 
-    def extraire_valeurs_contrat(self, numero_contrat):
+    def extraire_valeurs_contrat(self, numero_contrat, dictionnaire):
         """
-        Charge le fichier Excel et extrait les valeurs de dépôt et de traitement pour un numéro de contrat donné.
+        Extrait les valeurs de dépôt et de traitement d'un contrat depuis l'index partagé.
         
         :param numero_contrat: Le numéro de contrat à rechercher.
-        :param fichier_excel: Le chemin vers le fichier Excel.
-        :return: Un tuple contenant les valeurs de dépôt et de traitement (ancien_depot_value, ancien_traitement_value).
+        :param dictionnaire: Index des contrats construit par AffranchigoRPA.create_dictionnaire.
+        :return: Un tuple (ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value).
         """
-        try:
-            # Charger le fichier Excel
-            df = pd.read_excel('data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx')
-            self.logger.debug("Fichier Excel chargé.")
-            
-            # Trouver la ligne correspondant au numéro de contrat
-            row = df[df['Contrat Nb'] == numero_contrat]
-            if row.empty:
-                self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
-                return None, None
-
-            # Extraire les valeurs de dépôt et de traitement
-            ancien_depot_value = row['Code REGATE Dépôt actuel'].values[0] if pd.notna(row['Code REGATE Dépôt actuel'].values[0]) else None
-            ancien_traitement_value = row['Code REGATE Traitement actuel'].values[0] if pd.notna(row['Code REGATE Traitement actuel'].values[0]) else None
-
-            nouveau_depot_value = row['Nouveau code REGATE Dépôt'].values[0] if pd.notna(row['Nouveau code REGATE Dépôt'].values[0]) else None
-            nouveau_traitement_value = row['Nouveau code REGATE Traitement'].values[0] if pd.notna(row['Nouveau code REGATE Traitement'].values[0]) else None
-
-            ancien_depot_value = str(int(ancien_depot_value)) if isinstance(ancien_depot_value, float) else str(ancien_depot_value) if ancien_depot_value else None
-            ancien_traitement_value = str(int(ancien_traitement_value)) if isinstance(ancien_traitement_value, float) else str(ancien_traitement_value) if ancien_traitement_value else None
-
-            nouveau_depot_value = str(int(nouveau_depot_value)) if isinstance(nouveau_depot_value, float) else str(nouveau_depot_value) if nouveau_depot_value else None
-            nouveau_traitement_value = str(int(nouveau_traitement_value)) if isinstance(nouveau_traitement_value, float) else str(nouveau_traitement_value) if nouveau_traitement_value else None
-
-            return ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value
+        contrat_data = dictionnaire.get(numero_contrat)
+        if contrat_data is None:
+            self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
+            return None, None, None, None
 
-        except Exception as e:
-            self.logger.error(f"Erreur lors de l'extraction des valeurs pour le contrat {numero_contrat} : {e}")
-            return None, None
+        return (
+            contrat_data['Code REGATE Dépôt actuel'],
+            contrat_data['Code REGATE Traitement actuel'],
+            contrat_data['Nouveau code REGATE Dépôt'],
+            contrat_data['Nouveau code REGATE Traitement'],
+        )
     
+    @chronometre()
     def handle_case_forfait(self, driver, numero_contrat, dictionnaire):
         """Traitement principal pour chaque cas."""
         self.logger.info(f"{numero_contrat} * Traitement du contrat Affranchigo Forfait")
 
-        # Charger le fichier Excel
-        df = pd.read_excel('data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx')
-        self.logger.debug("Fichier Excel chargé.")
 
         # Sélectionner les éléments radio
         radio_non = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v0")))
         radio_oui = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "g0_p159|0_c25258_v1")))
 
-        # Trouver la ligne correspondant au numéro de contrat
-        row = df[df['Contrat Nb'] == numero_contrat]
-        if row.empty:
+        # Vérifier que le contrat figure dans l'index partagé
+        if numero_contrat not in dictionnaire:
             self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
             return
 
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
 
         try:
             wait = WebDriverWait(self.driver, 10)
@@ -501,7 +483,7 @@ class AffranchigoForfaitCase:
         input_element = selectors.get("input_first_regate")
         select_element = selectors.get("select_first_etablissement")
         ancien_valeur_input_first_regate = self.get_selector_value(input_element)
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé 'Dépôt et Traitement'")
         self.logger.info(f"{numero_contrat} * Ancienne valeur Régate {ancien_valeur_input_first_regate}")
         self.logger.info(f"{numero_contrat} * Futur valeur du fichier Excel Dépôt {nouveau_depot_value}")
@@ -518,7 +500,7 @@ class AffranchigoForfaitCase:
         selectors = self.initialize_selectors()
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt'")
@@ -546,13 +528,13 @@ class AffranchigoForfaitCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton oui.")
-            time.sleep(3)
+            self.attente.dom_stable("forfait.blocs_regate_radio_oui", timeout=3)
             
             selectors = self.initialize_selectors_radio_oui()
             if not selectors:
@@ -567,7 +549,7 @@ class AffranchigoForfaitCase:
             
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, new_value_depot, numero_contrat)
@@ -593,7 +575,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc san rôle ")
@@ -618,13 +600,13 @@ class AffranchigoForfaitCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton oui.")
-            time.sleep(3)
+            self.attente.dom_stable("forfait.blocs_regate_radio_oui", timeout=3)
             
             input_regate_first = selectors.get("input_first_regate")
             
@@ -634,7 +616,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -657,7 +639,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -688,13 +670,13 @@ class AffranchigoForfaitCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton non.")
-            time.sleep(3)
+            self.attente.dom_stable("forfait.blocs_regate_radio_oui", timeout=3)
             
             input_regate_first = selectors.get("input_first_regate")
             select_element_first = selectors.get("select_first_etablissement")
@@ -702,7 +684,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, new_value_depot, numero_contrat)
@@ -726,7 +708,7 @@ class AffranchigoForfaitCase:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
         input_regate_first = selectors.get("input_first_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement")
         self.logger.info(f"{numero_contrat} * Ancienne  première valeur Régate  {ancien_valeur_input_first_regate}")
@@ -752,13 +734,13 @@ class AffranchigoForfaitCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton non.")
-            time.sleep(3)
+            self.attente.dom_stable("forfait.blocs_regate_radio_non", timeout=3)
             
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
@@ -785,7 +767,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 return
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -796,7 +778,7 @@ class AffranchigoForfaitCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -819,7 +801,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -846,7 +828,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -857,7 +839,7 @@ class AffranchigoForfaitCase:
             
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -880,7 +862,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -905,7 +887,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -914,7 +896,7 @@ class AffranchigoForfaitCase:
             self.update_select_element(self.driver, select_element_first, numero_contrat)
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -937,7 +919,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -967,7 +949,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
             # Vérification du titre de l'option sélectionnée pour select_role_first
             select_obj_first = Select(select_role_first)
@@ -1004,7 +986,7 @@ class AffranchigoForfaitCase:
                 # Vérification de la valeur de l'input_regate_first
                 self.select_role(select_role_second, "Dépôt")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
    
             self.choice_time(numero_contrat)
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
@@ -1021,7 +1003,7 @@ class AffranchigoForfaitCase:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
         input_regate_first = selectors.get("input_first_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc 'Dépôt et Traitement' ")
         self.logger.info(f"{numero_contrat} * Ancienne  première valeur Régate  {ancien_valeur_input_first_regate}")
@@ -1048,7 +1030,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
             
             if not ancien_valeur_input_first_regate :
@@ -1061,13 +1043,13 @@ class AffranchigoForfaitCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.debug("Clic sur radio_non effectué avec JavaScript.")
-            time.sleep(3)
+            self.attente.dom_stable("forfait.blocs_regate_radio_non", timeout=3)
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
                     EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487[0]"))
@@ -1091,7 +1073,7 @@ class AffranchigoForfaitCase:
             
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
             # MAJ Nouvelle valeur Dépôt
             self.update_input(input_regate_first, ancien_valeur_input_first_regate,numero_contrat)
@@ -1102,7 +1084,7 @@ class AffranchigoForfaitCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -1125,7 +1107,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -1152,7 +1134,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1161,7 +1143,7 @@ class AffranchigoForfaitCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_oui_disponible", timeout=2)
                 pass
             input_regate_first = selectors.get("input_first_regate")
             input_regate_second = selectors.get("input_second_regate")
@@ -1172,7 +1154,7 @@ class AffranchigoForfaitCase:
     
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             # Vérification du titre de l'option sélectionnée pour select_role_first
@@ -1200,7 +1182,7 @@ class AffranchigoForfaitCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {input_regate_first.get_attribute('value')} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
             div_alert = self.check_div_alert()
             
@@ -1208,7 +1190,7 @@ class AffranchigoForfaitCase:
                 # Utilisation de JavaScript pour cliquer sur le bouton radio_non
                 self.driver.execute_script("arguments[0].click();", radio_oui)
                 self.logger.info("Un doublon à été détecter, passage du flag sur oui")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.bascule_doublon_radio_oui", timeout=3)
             else:
                 # Sélection des rôles
                 self.select_role(select_role_first, "Dépôt")
@@ -1229,7 +1211,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1251,7 +1233,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1282,7 +1264,7 @@ class AffranchigoForfaitCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {nouveau_depot_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
             if not select_role_second.get_attribute("value"): 
                 # Sélection des rôles
@@ -1306,7 +1288,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -1327,7 +1309,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1359,7 +1341,7 @@ class AffranchigoForfaitCase:
             else:
                 self.logger.error(f"{numero_contrat} * Valeur actuelle de dépôt {nouveau_depot_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
             if not select_role_first.get_attribute("value"): 
                 # Sélection des rôles
@@ -1384,7 +1366,7 @@ class AffranchigoForfaitCase:
         input_element = selectors.get("input_first_regate")
         select_element = selectors.get("select_first_etablissement")
         ancien_valeur_input_first_regate = self.get_selector_value(input_element)
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé 'Dépôt et Traitement'")
         self.logger.info(f"{numero_contrat} * Ancienne valeur Régate {ancien_valeur_input_first_regate}")
         self.logger.info(f"{numero_contrat} * Futur valeur du fichier Excel traitement {nouveau_traitement_value}")
@@ -1409,7 +1391,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
     
             if not ancien_valeur_input_first_regate :
@@ -1422,13 +1404,13 @@ class AffranchigoForfaitCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.debug("Clic sur radio_non effectué avec JavaScript.")
-            time.sleep(3)
+            self.attente.dom_stable("forfait.blocs_regate_radio_non", timeout=3)
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
                     EC.presence_of_element_located((By.ID, "g0_p159|0_r486_c487[0]"))
@@ -1452,7 +1434,7 @@ class AffranchigoForfaitCase:
             
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(5)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=5)
                 pass
             
             self.update_input(input_regate_first, ancien_valeur_input_first_regate,numero_contrat)
@@ -1463,7 +1445,7 @@ class AffranchigoForfaitCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -1484,7 +1466,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -1513,7 +1495,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value:
@@ -1522,10 +1504,10 @@ class AffranchigoForfaitCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_oui n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("forfait.radio_oui_disponible", timeout=2)
                 pass
             # Ajout d'un délai explicite pour s'assurer que les éléments sont complètement chargés
-            time.sleep(2)
+            self.attente.dom_stable("forfait.roles_regate", timeout=2)
             # Vérification du titre de l'option sélectionnée pour select_role_first
             select_obj_first = Select(select_role_first)
             select_obj_second = Select(select_role_second)
@@ -1546,7 +1528,7 @@ class AffranchigoForfaitCase:
                 self.logger.debug(f"Le titre du sélecteur n'est pas 'Traitement', il est '{title_first_role}'")
                 self.logger.error(f"Valeur actuelle de dépôt {title_first_role} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
 
             div_alert = self.check_div_alert()
@@ -1555,7 +1537,7 @@ class AffranchigoForfaitCase:
                 # Utilisation de JavaScript pour cliquer sur le bouton radio_oui
                 self.driver.execute_script("arguments[0].click();", radio_oui)
                 self.logger.debug("Un doublon a été détecté, passage du flag sur oui")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.bascule_doublon_radio_oui", timeout=3)
         
             self.choice_time(numero_contrat)
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
@@ -1573,7 +1555,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1595,7 +1577,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value :
@@ -1627,7 +1609,7 @@ class AffranchigoForfaitCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {input_regate_first.get_attribute('value')} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -1649,7 +1631,7 @@ class AffranchigoForfaitCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1671,7 +1653,7 @@ class AffranchigoForfaitCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("forfait.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value :
@@ -1703,7 +1685,7 @@ class AffranchigoForfaitCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {nouveau_traitement_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("forfait.chargement_etablissement", timeout=2)
 
 
             # Sélection des rôles
@@ -4,23 +4,28 @@ from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
-import json
-import pandas as pd
-import time
 
 from rpa_modules import setup_logger
+from rpa_modules.waits import Attente
+from rpa_modules.timings import chronometre
+from rpa_modules.dom_utils import sonder_bloc
+from rpa_modules.journal import open_journal, STATUT_RE_TRAITEMENT_LIB
+from rpa_modules.config import get_config
 
 class AffranchigoLibCase:
-    def __init__(self, driver, pool, logger=None):
+    def __init__(self, driver, pool, logger=None, journal=None):
         """
         Initialise la classe avec un WebDriver, un pool, et un logger.
         :param driver: L'instance de WebDriver à utiliser.
         :param pool: Le pool de WebDrivers partagé.
         :param logger: Logger pour les logs. Un logger par défaut est créé si non fourni.
+        :param journal: Journal des contrats partagé. L'instance par défaut est utilisée si non fourni.
         """
         self.driver = driver  # Initialisation du WebDriver
         self.pool = pool
         self.logger = logger or setup_logger("affranchigo_lib_case.log")
+        self.journal = journal or open_journal(logger=self.logger)
+        self.attente = Attente(driver, self.logger)
 
     def get_selector_value(self, selector):
         """
@@ -36,6 +41,7 @@ class AffranchigoLibCase:
             # Pour un input, on retourne la valeur de l'input
             return selector.get_attribute('value')
     
+    @chronometre()
     def initialize_selectors_radio_oui(self):
         selectors = {}
         try:
@@ -45,21 +51,23 @@ class AffranchigoLibCase:
             selectors["radio_oui"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_c24954_v1")))
             self.logger.debug("Sélecteur radio_oui initialisé.")
 
-            selectors["radio_non"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_c24954_v0")))
-            self.logger.debug("Sélecteur radio_non initialisé.")
+            # Un seul passage par sonde : les champs du bloc sont attendus comme avant, radio_non et
+            # select_first_time, absents selon la mise en page, ne disposent que d'une courte sonde
+            localisateurs = {
+                "radio_non": (By.ID, "g0_p265|0_c24954_v0"),
+                "input_first_regate": (By.ID, "g0_p265|0_r2055_c2056"),
+                "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select"),
+                "select_first_role": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select"),
+                "select_first_time": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] input-component select"),
+            }
+            requis = ["input_first_regate", "select_first_etablissement", "select_first_role"]
+            selectors.update(sonder_bloc(self.driver, localisateurs, requis=requis, timeout=20))
+            manquants = [nom for nom in requis if nom not in selectors]
+            if manquants:
+                self.logger.error(f"Sélecteurs radio_oui introuvables : {', '.join(manquants)}")
+            else:
+                self.logger.debug("Sélecteurs radio_oui initialisés.")
 
-            selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056")))
-            self.logger.debug("Sélecteur input_first_regate initialisé.")
-            
-            selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select")))
-            self.logger.debug("Sélecteur select_first_etablissement initialisé.")
-            
-            selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select")))
-            self.logger.debug("Sélecteur select_first_role initialisé.")
-            
-            selectors["select_first_time"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] input-component select")))
-            self.logger.debug("Sélecteur select_first_time initialisé.")
-        
         except TimeoutException as e:
             self.logger.error(f"Timeout lors de l'initialisation des sélecteurs radio_oui: {e}")
         except Exception as e:
@@ -67,6 +75,7 @@ class AffranchigoLibCase:
 
         return selectors
 
+    @chronometre()
     def initialize_selectors(self):
         selectors = {}
         try:
@@ -78,23 +87,36 @@ class AffranchigoLibCase:
 
             if selectors["radio_oui"].is_selected():
                 self.logger.debug("radio_oui est sélectionné.")
-                selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056")))
-                selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select")))
-                selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select")))
-                selectors["select_first_time"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] input-component select")))
+                localisateurs = {
+                    "input_first_regate": (By.ID, "g0_p265|0_r2055_c2056"),
+                    "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select"),
+                    "select_first_role": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select"),
+                    "select_first_time": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] input-component select"),
+                }
+                requis = ["input_first_regate", "select_first_etablissement", "select_first_role"]
             elif selectors["radio_non"].is_selected():
                 self.logger.debug("radio_non est sélectionné.")
-                selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select")))
-                selectors["select_second_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(9) select")))
-                selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056")))
-                selectors["input_second_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056[0]")))
-                selectors["select_second_time"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] input-component select")))
-                selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select")))
-                selectors["select_second_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(3) select")))
+                localisateurs = {
+                    "select_first_role": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select"),
+                    "select_second_role": (By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(9) select"),
+                    "input_first_regate": (By.ID, "g0_p265|0_r2055_c2056"),
+                    "input_second_regate": (By.ID, "g0_p265|0_r2055_c2056[0]"),
+                    "select_second_time": (By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] input-component select"),
+                    "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select"),
+                    "select_second_etablissement": (By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(3) select"),
+                }
+                requis = [nom for nom in localisateurs if nom != "select_second_time"]
             else:
                 self.logger.error("Aucun bouton radio n'est sélectionné.")
                 return None
 
+            # Les champs d'heure, absents selon la mise en page, ne disposent que d'une courte sonde
+            selectors.update(sonder_bloc(self.driver, localisateurs, requis=requis, timeout=10))
+            manquants = [nom for nom in requis if nom not in selectors]
+            if manquants:
+                self.logger.error(f"Sélecteurs introuvables : {', '.join(manquants)}")
+                return None
+
         except TimeoutException as e:
             self.logger.error(f"Timeout lors de l'initialisation des sélecteurs: {e}")
             return None
@@ -105,6 +127,7 @@ class AffranchigoLibCase:
         return selectors
 
 
+    @chronometre()
     def initialize_selectors_radio_non(self):
         selectors = {}
         try:
@@ -112,14 +135,24 @@ class AffranchigoLibCase:
             wait = WebDriverWait(self.driver, 10)
             
             selectors["radio_non"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_c24954_v0")))
-            selectors["select_first_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select")))
-            selectors["select_second_role"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(9) select")))
-            selectors["input_first_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056")))
-            selectors["input_second_regate"] = wait.until(EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056[0]")))
-            selectors["select_first_time"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] input-component select")))
-            selectors["select_second_time"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] input-component select")))
-            selectors["select_first_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select")))
-            selectors["select_second_etablissement"] = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(3) select")))
+
+            # Un seul passage par sonde : les champs des deux blocs sont attendus comme avant,
+            # les champs d'heure, absents selon la mise en page, ne disposent que d'une courte sonde
+            localisateurs = {
+                "select_first_role": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(9) select"),
+                "select_second_role": (By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(9) select"),
+                "input_first_regate": (By.ID, "g0_p265|0_r2055_c2056"),
+                "input_second_regate": (By.ID, "g0_p265|0_r2055_c2056[0]"),
+                "select_first_time": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] input-component select"),
+                "select_second_time": (By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] input-component select"),
+                "select_first_etablissement": (By.CSS_SELECTOR, "#g0_p265\\|0_r2055\\[0\\] critere-form:nth-child(3) select"),
+                "select_second_etablissement": (By.CSS_SELECTOR, "#\\[g0_p265\\|0_r2055\\[0\\]\\] critere-form:nth-child(3) select"),
+            }
+            requis = [nom for nom in localisateurs if nom not in ("select_first_time", "select_second_time")]
+            selectors.update(sonder_bloc(self.driver, localisateurs, requis=requis, timeout=10))
+            manquants = [nom for nom in requis if nom not in selectors]
+            if manquants:
+                self.logger.error(f"Sélecteurs radio_non introuvables : {', '.join(manquants)}")
 
         except TimeoutException as e:
             self.logger.error(f"Timeout lors de l'initialisation des sélecteurs radio_non: {e}")
@@ -128,6 +161,7 @@ class AffranchigoLibCase:
 
         return selectors
 
+    @chronometre()
     def select_time_in_selectors(self, numero_contrat):
         select_time_selectors = [
             "#g0_p265\\|0_r2055\\[0\\] > div > critere-form:nth-child(7) > div.form-group.critere_psc > input-component > div > select",
@@ -160,29 +194,14 @@ class AffranchigoLibCase:
             pass
     
     def save_non_modifiable_contract(self, numero_contrat):
-        """Enregistre le numéro de contrat dans un fichier JSON en évitant les doublons."""
-        file_path = "re_traitement_lib.json"
-        data = set()  # Utiliser un ensemble pour éviter les doublons
-
-        try:
-            self.logger.debug(f"Lecture du fichier existant : {file_path}")
-            with open(file_path, "r") as file:
-                existing_data = json.load(file)
-                data.update(existing_data)  # Mise à jour de l'ensemble avec les données existantes
-        except FileNotFoundError:
-            self.logger.debug("Le fichier n'existe pas, il sera créé.")
-        except json.JSONDecodeError:
-            self.logger.error("Erreur de décodage JSON, le fichier est peut-être corrompu.")
-
-        if numero_contrat not in data:
-            data.add(numero_contrat)
-            with open(file_path, "w") as file:
-                json.dump(list(data), file)  # Convertir l'ensemble en liste pour la sérialisation
+        """Enregistre le numéro de contrat à retraiter dans le journal des contrats."""
+        if self.journal.record(numero_contrat, STATUT_RE_TRAITEMENT_LIB):
             self.logger.debug(f"Contrat numéro {numero_contrat} ajouté.")
         else:
             self.logger.debug(f"Contrat numéro {numero_contrat} déjà présent, non ajouté.")
 
 
+    @chronometre()
     def submit_liberte(self, numero_contrat):
         button_selectors = [
             "#odcFormCPV > button",
@@ -209,17 +228,12 @@ class AffranchigoLibCase:
         try:
             WebDriverWait(self.driver, 10).until(
                 EC.url_changes(
-                    "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/configurateur/put-contract"
+                    get_config().put_contract_url
                 )
             )
             self.logger.info(f"{numero_contrat} * Formulaire soumis avec succès.")
-            time.sleep(3)
-            try:
-                url_de_depart = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc"
-                self.driver.get(url_de_depart)
-                self.logger.debug("Retour à l'URL de départ réussi.")
-            except Exception as e:
-                self.logger.critical(f"Erreur lors de la navigation vers l'URL de départ : {e}")
+            self.attente.dom_stable("liberte.page_apres_soumission", timeout=3)
+            # Le retour à l'URL de départ est fait par le pool, une seule fois, à la prochaine utilisation du driver
         except TimeoutException:
             self.logger.error("Le bouton de soumission n'a pas été trouvé dans les temps.")
         except Exception as e:
@@ -236,6 +250,7 @@ class AffranchigoLibCase:
         except TimeoutException:
             return None
 
+    @chronometre()
     def update_input(self, element, new_value, numero_contrat):
         self.logger.debug(f"Tentative de mise à jour de l'input avec la nouvelle valeur: {new_value}")
         if element is None:
@@ -249,6 +264,7 @@ class AffranchigoLibCase:
         element.send_keys(Keys.TAB)
         self.logger.debug(f"{numero_contrat} * Nouveau code régate attribué {new_value}")
 
+    @chronometre()
     def update_select_element(self, driver, select_element, numero_contrat):
         self.logger.debug(f"Mise à jour de l'élément select: {select_element}")
 
@@ -300,63 +316,42 @@ class AffranchigoLibCase:
             self.logger.error(f"Erreur lors de la sélection du rôle '{role}' : {e}")
 
     
-    def extraire_valeurs_contrat(self, numero_contrat):
+    def extraire_valeurs_contrat(self, numero_contrat, dictionnaire):
         """
-        Charge le fichier Excel et extrait les valeurs de dépôt et de traitement pour un numéro de contrat donné.
+        Extrait les valeurs de dépôt et de traitement d'un contrat depuis l'index partagé.
         
         :param numero_contrat: Le numéro de contrat à rechercher.
-        :param fichier_excel: Le chemin vers le fichier Excel.
-        :return: Un tuple contenant les valeurs de dépôt et de traitement (ancien_depot_value, ancien_traitement_value).
+        :param dictionnaire: Index des contrats construit par AffranchigoRPA.create_dictionnaire.
+        :return: Un tuple (ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value).
         """
-        try:
-            # Charger le fichier Excel
-            df = pd.read_excel('data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx')
-            self.logger.debug("Fichier Excel chargé.")
-            
-            # Trouver la ligne correspondant au numéro de contrat
-            row = df[df['Contrat Nb'] == numero_contrat]
-            if row.empty:
-                self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
-                return None, None
-
-            # Extraire les valeurs de dépôt et de traitement
-            ancien_depot_value = row['Code REGATE Dépôt actuel'].values[0] if pd.notna(row['Code REGATE Dépôt actuel'].values[0]) else None
-            ancien_traitement_value = row['Code REGATE Traitement actuel'].values[0] if pd.notna(row['Code REGATE Traitement actuel'].values[0]) else None
-
-            nouveau_depot_value = row['Nouveau code REGATE Dépôt'].values[0] if pd.notna(row['Nouveau code REGATE Dépôt'].values[0]) else None
-            nouveau_traitement_value = row['Nouveau code REGATE Traitement'].values[0] if pd.notna(row['Nouveau code REGATE Traitement'].values[0]) else None
-
-            ancien_depot_value = str(int(ancien_depot_value)) if isinstance(ancien_depot_value, float) else str(ancien_depot_value) if ancien_depot_value else None
-            ancien_traitement_value = str(int(ancien_traitement_value)) if isinstance(ancien_traitement_value, float) else str(ancien_traitement_value) if ancien_traitement_value else None
-
-            nouveau_depot_value = str(int(nouveau_depot_value)) if isinstance(nouveau_depot_value, float) else str(nouveau_depot_value) if nouveau_depot_value else None
-            nouveau_traitement_value = str(int(nouveau_traitement_value)) if isinstance(nouveau_traitement_value, float) else str(nouveau_traitement_value) if nouveau_traitement_value else None
-
-            return ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value
-
-        except Exception as e:
-            self.logger.error(f"Erreur lors de l'extraction des valeurs pour le contrat {numero_contrat} : {e}")
-            return None, None
+        contrat_data = dictionnaire.get(numero_contrat)
+        if contrat_data is None:
+            self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
+            return None, None, None, None
+
+        return (
+            contrat_data['Code REGATE Dépôt actuel'],
+            contrat_data['Code REGATE Traitement actuel'],
+            contrat_data['Nouveau code REGATE Dépôt'],
+            contrat_data['Nouveau code REGATE Traitement'],
+        )
     
+    @chronometre()
     def handle_case_lib(self, numero_contrat, dictionnaire):
         """Traitement principal pour chaque cas."""
         self.logger.info(f"{numero_contrat} * Traitement du contrat Affranchigo Liberté")
 
-        # Charger le fichier Excel
-        df = pd.read_excel('data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx')
-        self.logger.debug("Fichier Excel chargé.")
 
         # Sélectionner les éléments radio
         radio_non = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "g0_p265|0_c24954_v0")))
         radio_oui = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "g0_p265|0_c24954_v1")))
 
-        # Trouver la ligne correspondant au numéro de contrat
-        row = df[df['Contrat Nb'] == numero_contrat]
-        if row.empty:
+        # Vérifier que le contrat figure dans l'index partagé
+        if numero_contrat not in dictionnaire:
             self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
             return
 
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
 
         # Initialiser les sélecteurs en fonction de la sélection des boutons radio
         if radio_non.is_selected():
@@ -444,7 +439,7 @@ class AffranchigoLibCase:
         input_element = selectors.get("input_first_regate")
         select_element = selectors.get("select_first_etablissement")
         ancien_valeur_input_first_regate = self.get_selector_value(input_element)
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé 'Dépôt et Traitement'")
         self.logger.info(f"{numero_contrat} * Ancienne valeur Régate {ancien_valeur_input_first_regate}")
         self.logger.info(f"{numero_contrat} * Futur valeur du fichier Excel Dépôt {nouveau_depot_value}")
@@ -453,7 +448,7 @@ class AffranchigoLibCase:
         self.update_input(input_element, nouveau_traitement_value, numero_contrat)
         self.update_select_element(self.driver, select_element, numero_contrat)
 
-        time.sleep(2)
+        self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
         self.select_time_in_selectors(numero_contrat)
     
@@ -463,7 +458,7 @@ class AffranchigoLibCase:
         selectors = self.initialize_selectors()
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt'")
@@ -491,13 +486,13 @@ class AffranchigoLibCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton oui.")
-            time.sleep(3)
+            self.attente.dom_stable("liberte.blocs_regate_radio_oui", timeout=3)
             
             selectors = self.initialize_selectors_radio_oui()
             if not selectors:
@@ -512,14 +507,14 @@ class AffranchigoLibCase:
             
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, new_value_depot, numero_contrat)
             
             self.update_select_element(self.driver, select_element_first, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
             
@@ -540,7 +535,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc san rôle ")
@@ -565,13 +560,13 @@ class AffranchigoLibCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton oui.")
-            time.sleep(3)
+            self.attente.dom_stable("liberte.blocs_regate_radio_oui", timeout=3)
             
             input_regate_first = selectors.get("input_first_regate")
             
@@ -581,14 +576,14 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
             
             self.update_select_element(self.driver, select_element_first, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
@@ -605,7 +600,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -636,13 +631,13 @@ class AffranchigoLibCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton non.")
-            time.sleep(3)
+            self.attente.dom_stable("liberte.blocs_regate_radio_oui", timeout=3)
             
             input_regate_first = selectors.get("input_first_regate")
             select_element_first = selectors.get("select_first_etablissement")
@@ -650,14 +645,14 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, new_value_depot, numero_contrat)
 
             self.update_select_element(self.driver, select_element_first, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
 
@@ -676,7 +671,7 @@ class AffranchigoLibCase:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
         input_regate_first = selectors.get("input_first_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement")
         self.logger.info(f"{numero_contrat} * Ancienne  première valeur Régate  {ancien_valeur_input_first_regate}")
@@ -702,13 +697,13 @@ class AffranchigoLibCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton non.")
-            time.sleep(3)
+            self.attente.dom_stable("liberte.blocs_regate_radio_non", timeout=3)
             
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
@@ -735,7 +730,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 return
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -746,7 +741,7 @@ class AffranchigoLibCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -767,7 +762,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -794,7 +789,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -805,7 +800,7 @@ class AffranchigoLibCase:
             
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             self.select_role(select_role_first, "Dépôt")
@@ -825,7 +820,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -850,7 +845,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -859,7 +854,7 @@ class AffranchigoLibCase:
             self.update_select_element(self.driver, select_element_first, numero_contrat)
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
             
 
             # Sélection des rôles
@@ -881,7 +876,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -911,7 +906,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
             # Vérification du titre de l'option sélectionnée pour select_role_first
             select_obj_first = Select(select_role_first)
@@ -962,7 +957,7 @@ class AffranchigoLibCase:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
         input_regate_first = selectors.get("input_first_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc 'Dépôt et Traitement' ")
         self.logger.info(f"{numero_contrat} * Ancienne  première valeur Régate  {ancien_valeur_input_first_regate}")
@@ -989,7 +984,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
             
             if not ancien_valeur_input_first_regate :
@@ -1002,13 +997,13 @@ class AffranchigoLibCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.debug("Clic sur radio_non effectué avec JavaScript.")
-            time.sleep(3)
+            self.attente.dom_stable("liberte.blocs_regate_radio_non", timeout=3)
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
                     EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056[0]"))
@@ -1032,7 +1027,7 @@ class AffranchigoLibCase:
             
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
             # MAJ Nouvelle valeur Dépôt
             self.update_input(input_regate_first, ancien_valeur_input_first_regate,numero_contrat)
@@ -1043,7 +1038,7 @@ class AffranchigoLibCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
 
             # Sélection des rôles
@@ -1064,7 +1059,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -1091,7 +1086,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1100,7 +1095,7 @@ class AffranchigoLibCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_oui_disponible", timeout=2)
                 pass
             input_regate_first = selectors.get("input_first_regate")
             input_regate_second = selectors.get("input_second_regate")
@@ -1111,7 +1106,7 @@ class AffranchigoLibCase:
     
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             # Vérification du titre de l'option sélectionnée pour select_role_first
@@ -1139,7 +1134,7 @@ class AffranchigoLibCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {input_regate_first.get_attribute('value')} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
             
             div_alert = self.check_div_alert()
@@ -1148,7 +1143,7 @@ class AffranchigoLibCase:
                 # Utilisation de JavaScript pour cliquer sur le bouton radio_non
                 self.driver.execute_script("arguments[0].click();", radio_oui)
                 self.logger.debug("Un doublon à été détecter, passage du flag sur oui")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.bascule_doublon_radio_oui", timeout=3)
             else:
                 # Sélection des rôles
                 self.select_role(select_role_first, "Dépôt")
@@ -1168,7 +1163,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1190,7 +1185,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1221,7 +1216,7 @@ class AffranchigoLibCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {nouveau_depot_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
             
             if not select_role_second.get_attribute("value"): 
@@ -1245,7 +1240,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -1266,7 +1261,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1298,7 +1293,7 @@ class AffranchigoLibCase:
             else:
                 self.logger.error(f"{numero_contrat} * Valeur actuelle de dépôt {nouveau_depot_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
             
             if not select_role_first.get_attribute("value"): 
@@ -1323,7 +1318,7 @@ class AffranchigoLibCase:
         input_element = selectors.get("input_first_regate")
         select_element = selectors.get("select_first_etablissement")
         ancien_valeur_input_first_regate = self.get_selector_value(input_element)
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé 'Dépôt et Traitement'")
         self.logger.info(f"{numero_contrat} * Ancienne valeur Régate {ancien_valeur_input_first_regate}")
         self.logger.info(f"{numero_contrat} * Futur valeur du fichier Excel traitement {nouveau_traitement_value}")
@@ -1348,7 +1343,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
     
             if not ancien_valeur_input_first_regate :
@@ -1361,13 +1356,13 @@ class AffranchigoLibCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.debug("Clic sur radio_non effectué avec JavaScript.")
-            time.sleep(3)
+            self.attente.dom_stable("liberte.blocs_regate_radio_non", timeout=3)
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
                     EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056[0]"))
@@ -1391,7 +1386,7 @@ class AffranchigoLibCase:
             
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(5)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=5)
                 pass
             
             self.update_input(input_regate_first, ancien_valeur_input_first_regate,numero_contrat)
@@ -1402,7 +1397,7 @@ class AffranchigoLibCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
 
             # Sélection des rôles
@@ -1423,7 +1418,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -1452,7 +1447,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value:
@@ -1461,10 +1456,10 @@ class AffranchigoLibCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_oui n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("liberte.radio_oui_disponible", timeout=2)
                 pass
             # Ajout d'un délai explicite pour s'assurer que les éléments sont complètement chargés
-            time.sleep(2)
+            self.attente.dom_stable("liberte.roles_regate", timeout=2)
             # Vérification du titre de l'option sélectionnée pour select_role_first
             select_obj_first = Select(select_role_first)
             select_obj_second = Select(select_role_second)
@@ -1485,7 +1480,7 @@ class AffranchigoLibCase:
                 self.logger.debug(f"Le titre du sélecteur n'est pas 'Traitement', il est '{title_first_role}'")
                 self.logger.error(f"Valeur actuelle de dépôt {title_first_role} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
 
 
             div_alert = self.check_div_alert()
@@ -1494,7 +1489,7 @@ class AffranchigoLibCase:
                 # Utilisation de JavaScript pour cliquer sur le bouton radio_oui
                 self.driver.execute_script("arguments[0].click();", radio_oui)
                 self.logger.debug("Un doublon a été détecté, passage du flag sur oui")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.bascule_doublon_radio_oui", timeout=3)
         
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
             self.select_time_in_selectors(numero_contrat)
@@ -1511,7 +1506,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1533,7 +1528,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value :
@@ -1565,7 +1560,7 @@ class AffranchigoLibCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {input_regate_first.get_attribute('value')} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
             
 
             # Sélection des rôles
@@ -1587,7 +1582,7 @@ class AffranchigoLibCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1609,7 +1604,7 @@ class AffranchigoLibCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("liberte.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value :
@@ -1641,7 +1636,7 @@ class AffranchigoLibCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {nouveau_traitement_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("liberte.chargement_etablissement", timeout=2)
             
 
             # Sélection des rôles
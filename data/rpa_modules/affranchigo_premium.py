@@ -4,23 +4,28 @@ from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
-import json
-import pandas as pd
-import time
 
 from rpa_modules import setup_logger
+from rpa_modules.waits import Attente
+from rpa_modules.timings import chronometre
+from rpa_modules.dom_utils import sonder
+from rpa_modules.journal import open_journal, STATUT_RE_TRAITEMENT_LIB
+from rpa_modules.config import get_config
 
 class AffranchigoPremiumCase:
-    def __init__(self, driver, pool, logger=None):
+    def __init__(self, driver, pool, logger=None, journal=None):
         """
         Initialise la classe avec un WebDriver, un pool, et un logger.
         :param driver: L'instance de WebDriver à utiliser.
         :param pool: Le pool de WebDrivers partagé.
         :param logger: Logger pour les logs. Un logger par défaut est créé si non fourni.
+        :param journal: Journal des contrats partagé. L'instance par défaut est utilisée si non fourni.
         """
         self.driver = driver  # Initialisation du WebDriver
         self.pool = pool
         self.logger = logger or setup_logger("affranchigo_lib_case.log")
+        self.journal = journal or open_journal(logger=self.logger)
+        self.attente = Attente(driver, self.logger)
 
     def get_selector_value(self, selector):
         """
@@ -36,6 +41,7 @@ class AffranchigoPremiumCase:
             # Pour un input, on retourne la valeur de l'input
             return selector.get_attribute('value')
     
+    @chronometre()
     def initialize_selectors(self, numero_contrat, max_retries=3): 
         selectors = {}
         retries = 0
@@ -48,30 +54,34 @@ class AffranchigoPremiumCase:
                 selectors["input_first_regate"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72239\\[0\\]")))
                 self.logger.debug("Sélecteur input_first_regate initialisé.")
 
-                selectors["select_first_etablissement"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#\\[g0_p10858\\|0_r72238\\[0\\]\\] > div > critere-form:nth-child(3) > div.form-group.critere_psc > input-etb-prest > div > select")))
-                self.logger.debug("Sélecteur select_first_etablissement initialisé.")
-                
-                try:
-                    selectors["select_first_role"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[0\\]_v1"))) 
-                    self.logger.debug("Sélecteur select_first_role  (1er) initialisé.")
-                except:
-                    selectors["select_first_role"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[0\\]_v2"))) 
-                    self.logger.debug("Sélecteur select_first_role (2 ème) initialisé.")
-
-
-                selectors["input_second_regate"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72239\\[1\\]")))
-                self.logger.debug("Sélecteur input_second_regate initialisé.")
-
-                selectors["select_second_etablissement"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#\\[\\[g0_p10858\\|0_r72238\\[0\\]\\]\\] > div > critere-form:nth-child(3) > div.form-group.critere_psc > input-etb-prest > div > select")))
-                self.logger.debug("Sélecteur select_second_etablissement initialisé.")
-
-                try:
-
-                    selectors["select_second_role"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[1\\]_v2")))
-                    self.logger.debug("Sélecteur select_second_role initialisé.")
-                except:
-                    selectors["select_second_role"] = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[1\\]_v1")))
-                    self.logger.debug("Sélecteur select_second_role initialisé.")
+                # Un seul passage pour les autres champs, tous requis (attente d'origine de 20 s),
+                # y compris les deux variantes (_v1/_v2) des rôles dont une seule existe selon le contrat
+                trouves = sonder(self.driver, {
+                    "select_first_etablissement": (By.CSS_SELECTOR, "#\\[g0_p10858\\|0_r72238\\[0\\]\\] > div > critere-form:nth-child(3) > div.form-group.critere_psc > input-etb-prest > div > select"),
+                    "select_first_role_v1": (By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[0\\]_v1"),
+                    "select_first_role_v2": (By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[0\\]_v2"),
+                    "input_second_regate": (By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72239\\[1\\]"),
+                    "select_second_etablissement": (By.CSS_SELECTOR, "#\\[\\[g0_p10858\\|0_r72238\\[0\\]\\]\\] > div > critere-form:nth-child(3) > div.form-group.critere_psc > input-etb-prest > div > select"),
+                    "select_second_role_v2": (By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[1\\]_v2"),
+                    "select_second_role_v1": (By.CSS_SELECTOR, "#g0_p10858\\|0_r72238_c72243\\[1\\]_v1"),
+                }, timeout=20, visibles=True, requis=[
+                    "select_first_etablissement",
+                    ("select_first_role_v1", "select_first_role_v2"),
+                    "input_second_regate",
+                    "select_second_etablissement",
+                    ("select_second_role_v2", "select_second_role_v1"),
+                ])
+
+                selectors["select_first_etablissement"] = trouves.get("select_first_etablissement")
+                selectors["select_first_role"] = trouves.get("select_first_role_v1") or trouves.get("select_first_role_v2")
+                selectors["input_second_regate"] = trouves.get("input_second_regate")
+                selectors["select_second_etablissement"] = trouves.get("select_second_etablissement")
+                selectors["select_second_role"] = trouves.get("select_second_role_v2") or trouves.get("select_second_role_v1")
+
+                manquants = [nom for nom, element in selectors.items() if element is None]
+                if manquants:
+                    raise TimeoutException(f"Sélecteurs introuvables : {', '.join(manquants)}")
+                self.logger.debug("Sélecteurs initialisés.")
 
                 # Si tous les sélecteurs sont initialisés, on retourne le dictionnaire
                 return selectors
@@ -87,6 +97,7 @@ class AffranchigoPremiumCase:
         return None
 
 
+    @chronometre()
     def select_time_in_selectors(self, numero_contrat):
         select_time_selectors = [
             "#\\[g0_p10858\\|0_r72238\\[0\\]\\] > div > critere-form:nth-child(7) > div.form-group.critere_psc > input-component > div > select",
@@ -119,29 +130,14 @@ class AffranchigoPremiumCase:
             pass
     
     def save_non_modifiable_contract(self, numero_contrat):
-        """Enregistre le numéro de contrat dans un fichier JSON en évitant les doublons."""
-        file_path = "re_traitement_lib.json"
-        data = set()  # Utiliser un ensemble pour éviter les doublons
-
-        try:
-            self.logger.debug(f"Lecture du fichier existant : {file_path}")
-            with open(file_path, "r") as file:
-                existing_data = json.load(file)
-                data.update(existing_data)  # Mise à jour de l'ensemble avec les données existantes
-        except FileNotFoundError:
-            self.logger.debug("Le fichier n'existe pas, il sera créé.")
-        except json.JSONDecodeError:
-            self.logger.error("Erreur de décodage JSON, le fichier est peut-être corrompu.")
-
-        if numero_contrat not in data:
-            data.add(numero_contrat)
-            with open(file_path, "w") as file:
-                json.dump(list(data), file)  # Convertir l'ensemble en liste pour la sérialisation
+        """Enregistre le numéro de contrat à retraiter dans le journal des contrats."""
+        if self.journal.record(numero_contrat, STATUT_RE_TRAITEMENT_LIB):
             self.logger.debug(f"Contrat numéro {numero_contrat} ajouté.")
         else:
             self.logger.debug(f"Contrat numéro {numero_contrat} déjà présent, non ajouté.")
 
 
+    @chronometre()
     def submit_liberte(self, numero_contrat):
         button_selectors = [
             "#odcFormCPV > button",
@@ -159,7 +155,6 @@ class AffranchigoPremiumCase:
 
                 # Scroller jusqu'au bouton
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-                time.sleep(1)  # Pause optionnelle pour le scroll
 
                 # Clic via JavaScript
                 self.driver.execute_script("arguments[0].click();", submit_button)
@@ -180,19 +175,13 @@ class AffranchigoPremiumCase:
             # Attente du changement d'URL après la soumission
             WebDriverWait(self.driver, 10).until(
                 EC.url_changes(
-                    "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/configurateur/put-contract"
+                    get_config().put_contract_url
                 )
             )
             self.logger.info(f"{numero_contrat} * Formulaire soumis avec succès.")
-            time.sleep(3)
+            self.attente.dom_stable("premium.page_apres_soumission", timeout=3)
 
-            # Navigation vers l'URL de départ
-            try:
-                url_de_depart = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc"
-                self.driver.get(url_de_depart)
-                self.logger.debug("Retour à l'URL de départ réussi.")
-            except Exception as e:
-                self.logger.critical(f"Erreur lors de la navigation vers l'URL de départ : {e}")
+            # Le retour à l'URL de départ est fait par le pool, une seule fois, à la prochaine utilisation du driver
         except TimeoutException:
             self.logger.error("Le bouton de soumission n'a pas été trouvé dans les temps.")
         except Exception as e:
@@ -209,6 +198,7 @@ class AffranchigoPremiumCase:
         except TimeoutException:
             return None
 
+    @chronometre()
     def update_input(self, element, new_value, numero_contrat):
         self.logger.debug(f"Tentative de mise à jour de l'input avec la nouvelle valeur: {new_value}")
         if element is None:
@@ -222,6 +212,7 @@ class AffranchigoPremiumCase:
         element.send_keys(Keys.TAB)
         self.logger.debug(f"{numero_contrat} * Nouveau code régate attribué {new_value}")
 
+    @chronometre()
     def update_select_element(self, driver, select_element, numero_contrat):
         self.logger.debug(f"Mise à jour de l'élément select: {select_element}")
 
@@ -273,61 +264,39 @@ class AffranchigoPremiumCase:
             self.logger.error(f"Erreur lors de la sélection du rôle '{role}' : {e}")
 
     
-    def extraire_valeurs_contrat(self, numero_contrat):
+    def extraire_valeurs_contrat(self, numero_contrat, dictionnaire):
         """
-        Charge le fichier Excel et extrait les valeurs de dépôt et de traitement pour un numéro de contrat donné.
+        Extrait les valeurs de dépôt et de traitement d'un contrat depuis l'index partagé.
         
         :param numero_contrat: Le numéro de contrat à rechercher.
-        :param fichier_excel: Le chemin vers le fichier Excel.
-        :return: Un tuple contenant les valeurs de dépôt et de traitement (ancien_depot_value, ancien_traitement_value).
+        :param dictionnaire: Index des contrats construit par AffranchigoRPA.create_dictionnaire.
+        :return: Un tuple (ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value).
         """
-        try:
-            # Charger le fichier Excel
-            df = pd.read_excel('data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx')
-            self.logger.debug("Fichier Excel chargé.")
-            
-            # Trouver la ligne correspondant au numéro de contrat
-            row = df[df['Contrat Nb'] == numero_contrat]
-            if row.empty:
-                self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
-                return None, None
-
-            # Extraire les valeurs de dépôt et de traitement
-            ancien_depot_value = row['Code REGATE Dépôt actuel'].values[0] if pd.notna(row['Code REGATE Dépôt actuel'].values[0]) else None
-            ancien_traitement_value = row['Code REGATE Traitement actuel'].values[0] if pd.notna(row['Code REGATE Traitement actuel'].values[0]) else None
-
-            nouveau_depot_value = row['Nouveau code REGATE Dépôt'].values[0] if pd.notna(row['Nouveau code REGATE Dépôt'].values[0]) else None
-            nouveau_traitement_value = row['Nouveau code REGATE Traitement'].values[0] if pd.notna(row['Nouveau code REGATE Traitement'].values[0]) else None
-
-            ancien_depot_value = str(int(ancien_depot_value)) if isinstance(ancien_depot_value, float) else str(ancien_depot_value) if ancien_depot_value else None
-            ancien_traitement_value = str(int(ancien_traitement_value)) if isinstance(ancien_traitement_value, float) else str(ancien_traitement_value) if ancien_traitement_value else None
-
-            nouveau_depot_value = str(int(nouveau_depot_value)) if isinstance(nouveau_depot_value, float) else str(nouveau_depot_value) if nouveau_depot_value else None
-            nouveau_traitement_value = str(int(nouveau_traitement_value)) if isinstance(nouveau_traitement_value, float) else str(nouveau_traitement_value) if nouveau_traitement_value else None
-
-            return ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value
-
-        except Exception as e:
-            self.logger.error(f"Erreur lors de l'extraction des valeurs pour le contrat {numero_contrat} : {e}")
-            return None, None
+        contrat_data = dictionnaire.get(numero_contrat)
+        if contrat_data is None:
+            self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
+            return None, None, None, None
+
+        return (
+            contrat_data['Code REGATE Dépôt actuel'],
+            contrat_data['Code REGATE Traitement actuel'],
+            contrat_data['Nouveau code REGATE Dépôt'],
+            contrat_data['Nouveau code REGATE Traitement'],
+        )
     
+    @chronometre()
     def handle_case_premium(self, numero_contrat, dictionnaire):
         """Traitement principal pour chaque cas."""
         self.logger.info(f"{numero_contrat} * Traitement du contrat Affranchigo Premium")
-        # Charger le fichier Excel
-        df = pd.read_excel('data/data_traitement/ROYE PIC - Transfert des contrats Affranchigo 070125 V2.xlsx')
-        self.logger.debug("Fichier Excel chargé.")
 
-        # Trouver la ligne correspondant au numéro de contrat
-        row = df[df['Contrat Nb'] == numero_contrat]
-        if row.empty:
+        # Vérifier que le contrat figure dans l'index partagé
+        if numero_contrat not in dictionnaire:
             self.logger.error(f'Contrat {numero_contrat} introuvable dans le fichier Excel')
             return
 
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
-        time.sleep(2)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
+        self.attente.dom_stable("premium.formulaire_contrat", timeout=5)
         elements = self.initialize_selectors(numero_contrat)
-        time.sleep(5)
         if not elements:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
@@ -393,7 +362,7 @@ class AffranchigoPremiumCase:
         input_element = selectors.get("input_first_regate")
         select_element = selectors.get("select_first_etablissement")
         ancien_valeur_input_first_regate = self.get_selector_value(input_element)
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé 'Dépôt et Traitement'")
         self.logger.info(f"{numero_contrat} * Ancienne valeur Régate {ancien_valeur_input_first_regate}")
         self.logger.info(f"{numero_contrat} * Futur valeur du fichier Excel Dépôt {nouveau_depot_value}")
@@ -402,7 +371,7 @@ class AffranchigoPremiumCase:
         self.update_input(input_element, nouveau_traitement_value, numero_contrat)
         self.update_select_element(self.driver, select_element, numero_contrat)
 
-        time.sleep(2)
+        self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
         self.select_time_in_selectors(numero_contrat)
     
@@ -412,7 +381,7 @@ class AffranchigoPremiumCase:
         selectors = self.initialize_selectors(numero_contrat)
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt'")
@@ -440,13 +409,13 @@ class AffranchigoPremiumCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("premium.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton oui.")
-            time.sleep(3)
+            self.attente.dom_stable("premium.blocs_regate_radio_oui", timeout=3)
             
             selectors = self.initialize_selectors_radio_oui()
             if not selectors:
@@ -461,14 +430,14 @@ class AffranchigoPremiumCase:
             
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, new_value_depot, numero_contrat)
             
             self.update_select_element(self.driver, select_element_first, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
             
@@ -489,7 +458,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc san rôle ")
@@ -514,13 +483,13 @@ class AffranchigoPremiumCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("premium.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton oui.")
-            time.sleep(3)
+            self.attente.dom_stable("premium.blocs_regate_radio_oui", timeout=3)
             
             input_regate_first = selectors.get("input_first_regate")
             
@@ -530,14 +499,14 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
             
             self.update_select_element(self.driver, select_element_first, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
@@ -554,7 +523,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -585,13 +554,13 @@ class AffranchigoPremiumCase:
 
             if not radio_oui.is_displayed() or not radio_oui.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("premium.radio_oui_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_oui)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton non.")
-            time.sleep(3)
+            self.attente.dom_stable("premium.blocs_regate_radio_oui", timeout=3)
             
             input_regate_first = selectors.get("input_first_regate")
             select_element_first = selectors.get("select_first_etablissement")
@@ -599,14 +568,14 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, new_value_depot, numero_contrat)
 
             self.update_select_element(self.driver, select_element_first, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
 
@@ -625,7 +594,7 @@ class AffranchigoPremiumCase:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
         input_regate_first = selectors.get("input_first_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement")
         self.logger.info(f"{numero_contrat} * Ancienne  première valeur Régate  {ancien_valeur_input_first_regate}")
@@ -651,13 +620,13 @@ class AffranchigoPremiumCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("premium.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.info(f"{numero_contrat} * Clic sur le bouton non.")
-            time.sleep(3)
+            self.attente.dom_stable("premium.blocs_regate_radio_non", timeout=3)
             
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
@@ -684,7 +653,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 return
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -695,7 +664,7 @@ class AffranchigoPremiumCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             #self.select_role(select_role_first, "Dépôt")
@@ -716,7 +685,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -743,7 +712,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -754,7 +723,7 @@ class AffranchigoPremiumCase:
             
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
             
             # Sélection des rôles
             #self.select_role(select_role_first, "Dépôt")
@@ -774,7 +743,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -799,7 +768,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             self.update_input(input_regate_first, nouveau_depot_value, numero_contrat)
@@ -808,7 +777,7 @@ class AffranchigoPremiumCase:
             self.update_select_element(self.driver, select_element_first, numero_contrat)
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
             
 
             # Sélection des rôles
@@ -830,7 +799,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -860,7 +829,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
             # Vérification du titre de l'option sélectionnée pour select_role_first
             select_obj_first = Select(select_role_first)
@@ -911,7 +880,7 @@ class AffranchigoPremiumCase:
             self.logger.error(f"Impossible d'initialiser les sélecteurs pour le contrat {numero_contrat}")
             return
         input_regate_first = selectors.get("input_first_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc 'Dépôt et Traitement' ")
         self.logger.info(f"{numero_contrat} * Ancienne  première valeur Régate  {ancien_valeur_input_first_regate}")
@@ -938,7 +907,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
             
             if not ancien_valeur_input_first_regate :
@@ -951,13 +920,13 @@ class AffranchigoPremiumCase:
 
             if not radio_non.is_displayed() or not radio_non.is_enabled():
                 self.logger.debug(f"L'élément radio_non n'est pas visible ou activé pour le contrat {numero_contrat}")
-                time.sleep(2)
+                self.attente.dom_stable("premium.radio_non_disponible", timeout=2)
                 pass
 
             # Utilisation de JavaScript pour cliquer sur le bouton radio_non
             self.driver.execute_script("arguments[0].click();", radio_non)
             self.logger.debug("Clic sur radio_non effectué avec JavaScript.")
-            time.sleep(3)
+            self.attente.dom_stable("premium.blocs_regate_radio_non", timeout=3)
             try:
                 input_second_regate = WebDriverWait(self.driver, 30).until(
                     EC.presence_of_element_located((By.ID, "g0_p265|0_r2055_c2056[0]"))
@@ -981,7 +950,7 @@ class AffranchigoPremiumCase:
             
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
             # MAJ Nouvelle valeur Dépôt
             self.update_input(input_regate_first, ancien_valeur_input_first_regate,numero_contrat)
@@ -992,7 +961,7 @@ class AffranchigoPremiumCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
 
             # Sélection des rôles
@@ -1013,7 +982,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc Dépôt")
@@ -1034,7 +1003,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1050,7 +1019,7 @@ class AffranchigoPremiumCase:
     
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             # Vérification du titre de l'option sélectionnée pour select_role_first
@@ -1078,7 +1047,7 @@ class AffranchigoPremiumCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {input_regate_first.get_attribute('value')} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             self.select_time_in_selectors(numero_contrat)
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
@@ -1095,7 +1064,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1117,7 +1086,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1148,7 +1117,7 @@ class AffranchigoPremiumCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {nouveau_depot_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             
             if not select_role_second.get_attribute("value"): 
@@ -1172,7 +1141,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Traitement et un bloc sans rôle")
@@ -1193,7 +1162,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_depot_value:
@@ -1225,7 +1194,7 @@ class AffranchigoPremiumCase:
             else:
                 self.logger.error(f"{numero_contrat} * Valeur actuelle de dépôt {nouveau_depot_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             
             if not select_role_first.get_attribute("value"): 
@@ -1250,7 +1219,7 @@ class AffranchigoPremiumCase:
         input_element = selectors.get("input_first_regate")
         select_element = selectors.get("select_first_etablissement")
         ancien_valeur_input_first_regate = self.get_selector_value(input_element)
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé 'Dépôt et Traitement'")
         self.logger.info(f"{numero_contrat} * Ancienne valeur Régate {ancien_valeur_input_first_regate}")
         self.logger.info(f"{numero_contrat} * Futur valeur du fichier Excel traitement {nouveau_traitement_value}")
@@ -1269,7 +1238,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, select_element_first, select_role_first]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
     
             if not ancien_valeur_input_first_regate :
@@ -1299,7 +1268,7 @@ class AffranchigoPremiumCase:
             
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(5)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=5)
                 pass
             
             self.update_input(input_regate_first, ancien_valeur_input_first_regate,numero_contrat)
@@ -1310,7 +1279,7 @@ class AffranchigoPremiumCase:
 
             self.update_select_element(self.driver, select_element_second, numero_contrat)
 
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
 
             # Sélection des rôles
@@ -1335,7 +1304,7 @@ class AffranchigoPremiumCase:
 
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
 
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
@@ -1357,7 +1326,7 @@ class AffranchigoPremiumCase:
             # Vérification de la présence des sélecteurs
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 return
 
             if not nouveau_traitement_value:
@@ -1365,7 +1334,7 @@ class AffranchigoPremiumCase:
                 return
 
             # Attendre pour s'assurer que les éléments sont chargés
-            time.sleep(2)
+            self.attente.dom_stable("premium.roles_regate", timeout=2)
 
             # Récupérer les titres des sélecteurs
             title_first_role = select_role_first.get_attribute('title')
@@ -1386,7 +1355,7 @@ class AffranchigoPremiumCase:
                 self.logger.error(f"Valeur actuelle de dépôt {title_first_role} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
 
             # Attente pour appliquer les modifications
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
 
             self.logger.debug(f"{numero_contrat} * Mise à jour des inputs et sélecteurs effectuée.")
             self.select_time_in_selectors(numero_contrat)
@@ -1405,7 +1374,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1427,7 +1396,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value :
@@ -1459,7 +1428,7 @@ class AffranchigoPremiumCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {input_regate_first.get_attribute('value')} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
             
 
             # Sélection des rôles
@@ -1481,7 +1450,7 @@ class AffranchigoPremiumCase:
             return
         input_regate_first = selectors.get("input_first_regate")
         input_regate_second = selectors.get("input_second_regate")
-        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat)
+        ancien_depot_value, ancien_traitement_value, nouveau_depot_value, nouveau_traitement_value = self.extraire_valeurs_contrat(numero_contrat, dictionnaire)
         ancien_valeur_input_first_regate = self.get_selector_value(input_regate_first)
         ancien_valeur_input_second_regate = self.get_selector_value(input_regate_second)
         self.logger.info(f"{numero_contrat} * Rôle à l'arrivé un bloc Dépôt et un bloc sans rôle")
@@ -1503,7 +1472,7 @@ class AffranchigoPremiumCase:
 
             if not all([input_regate_first, input_regate_second, select_element_first, select_element_second, select_role_first, select_role_second]):
                 self.logger.error(f"Un ou plusieurs sélecteurs sont manquants après le clic sur radio_non pour le contrat {numero_contrat}")
-                time.sleep(3)
+                self.attente.dom_stable("premium.selecteurs_regate", timeout=3)
                 pass
 
             if not nouveau_traitement_value :
@@ -1535,7 +1504,7 @@ class AffranchigoPremiumCase:
             else:
                 self.logger.error(f"Valeur actuelle de dépôt {nouveau_traitement_value} ne correspond pas à la valeur cible {ancien_valeur_input_first_regate}")
             
-            time.sleep(2)
+            self.attente.reseau_inactif("premium.chargement_etablissement", timeout=2)
             
 
             # Sélection des rôles
@@ -6,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
 
 from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
 
 class CollecteRemise:
     def __init__(self, driver, pool, logger=None):
@@ -31,14 +32,14 @@ class CollecteRemise:
 
                 WebDriverWait(driver, 10).until(
                     EC.url_changes(
-                        "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/configurateur/put-contract"
+                        get_config().put_contract_url
                     )
                 )
                 self.logger.info("Formulaire soumis avec succes.")
             
                 try:
                     # Retour à l'URL de depart
-                    url_de_depart = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc"
+                    url_de_depart = get_config().index_url
                     driver.get(url_de_depart)
                     self.logger.info("Retour à l'URL de depart reussi.")
                 except Exception as e:
@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+
+# Dossier data/ du projet : base des chemins relatifs de la configuration
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fichier de configuration facultatif (surchargé par la variable RPA_CONFIG)
+DEFAULT_CONFIG_FILE = os.path.join(BASE_DIR, "rpa_config.json")
+
+# Valeur par défaut, variable d'environnement et nature (chemin ou non) de chaque paramètre
+PARAMETRES = {
+    # Fichiers d'entrée (Excel) et bases partagées
+    "data_dir": (os.path.join(BASE_DIR, "data_traitement"), "RPA_DATA_DIR", True),
+    # État écrit en continu (journaux, temps, JSON de suivi, CSV de résultats) : de préférence sur disque local
+    "state_dir": (None, "RPA_STATE_DIR", True),
+    "db_path": (None, "RPA_DB_PATH", True),
+    # Navigateur et préréglage du pool : une valeur, ou un dictionnaire {nom du RPA: valeur, "default": valeur}
+    "browser": ("edge", "RPA_BROWSER", False),
+    "browser_preset": ("standard", "RPA_BROWSER_PRESET", False),
+    "browser_binary": (None, "RPA_BROWSER_BINARY", True),
+    # Motifs d'URL jamais bloqués par le blocage des ressources (liste, ou motifs séparés par des virgules)
+    "resource_allowlist": ([], "RPA_RESOURCE_ALLOWLIST", False),
+    # Driver explicite ; sinon data/driver/<driver du navigateur> s'il existe, puis Selenium Manager ou PATH
+    "driver_path": (None, "RPA_DRIVER_PATH", True),
+    # Stratégie des attentes d'Attente : "conditionnelle" (par défaut) ou "fixe" (timeout complet, comme les anciennes pauses)
+    "wait_strategy": ("conditionnelle", "RPA_WAIT_STRATEGY", False),
+    "start_url": ("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV", "RPA_START_URL", False),
+    "index_url": ("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc", "RPA_INDEX_URL", False),
+    "put_contract_url": ("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/configurateur/put-contract", "RPA_PUT_CONTRACT_URL", False),
+    "seres_url": ("https://portail.e-facture.net/saml/saml-login.php?nomSP=ARTIMON_PROD", "RPA_SERES_URL", False),
+}
+
+_config = None
+_config_lock = threading.Lock()
+
+
+class RPAConfig:
+    def __init__(self, valeurs):
+        """
+        Configuration résolue des RPA : dossiers, base SQLite, driver et URLs.
+        :param valeurs: Dictionnaire {paramètre: valeur} déjà résolu.
+        """
+        for nom in PARAMETRES:
+            setattr(self, nom, valeurs[nom])
+
+    def data_path(self, *morceaux):
+        """
+        Chemin d'un fichier dans le dossier des données.
+        """
+        return os.path.join(self.data_dir, *morceaux)
+
+    def state_path(self, *morceaux):
+        """
+        Chemin d'un fichier d'état ; le dossier d'état est créé au besoin.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        return os.path.join(self.state_dir, *morceaux)
+
+    def browser_for(self, rpa_name=None):
+        """
+        Navigateur et préréglage à utiliser pour un RPA donné.
+        :return: Tuple (navigateur, préréglage).
+        """
+        return _valeur_rpa(self.browser, rpa_name, "edge"), _valeur_rpa(self.browser_preset, rpa_name, "standard")
+
+    def as_dict(self):
+        return {nom: getattr(self, nom) for nom in PARAMETRES}
+
+
+def _valeur_rpa(valeur, rpa_name, defaut):
+    if isinstance(valeur, dict):
+        return valeur.get(rpa_name) or valeur.get("default") or defaut
+    return valeur or defaut
+
+
+def _resoudre_chemin(valeur):
+    valeur = os.path.expanduser(os.path.expandvars(valeur))
+    return os.path.normpath(valeur if os.path.isabs(valeur) else os.path.join(BASE_DIR, valeur))
+
+
+def load_config(config_file=None):
+    """
+    Résout la configuration : valeurs par défaut, puis fichier JSON, puis variables d'environnement.
+    Les chemins relatifs sont résolus par rapport au dossier data/ du projet.
+    :param config_file: Fichier JSON (par défaut : RPA_CONFIG, sinon data/rpa_config.json s'il existe).
+    """
+    config_file = config_file or os.getenv("RPA_CONFIG") or DEFAULT_CONFIG_FILE
+    fichier = {}
+    if os.path.exists(config_file):
+        with open(config_file, "r", encoding="utf-8") as file:
+            fichier = json.load(file)
+        inconnus = set(fichier) - set(PARAMETRES)
+        if inconnus:
+            raise ValueError(f"Paramètres inconnus dans {config_file} : {', '.join(sorted(inconnus))}")
+    elif config_file != DEFAULT_CONFIG_FILE:
+        raise FileNotFoundError(f"Fichier de configuration introuvable : {config_file}")
+
+    valeurs = {}
+    for nom, (defaut, variable, est_chemin) in PARAMETRES.items():
+        valeur = os.getenv(variable) or fichier.get(nom) or defaut
+        valeurs[nom] = _resoudre_chemin(valeur) if est_chemin and valeur else valeur
+
+    if isinstance(valeurs["resource_allowlist"], str):
+        valeurs["resource_allowlist"] = [motif.strip() for motif in valeurs["resource_allowlist"].split(",") if motif.strip()]
+
+    # Par défaut, l'état reste dans le répertoire de lancement et la base dans le dossier des données
+    valeurs["state_dir"] = valeurs["state_dir"] or os.getcwd()
+    valeurs["db_path"] = valeurs["db_path"] or os.path.join(valeurs["data_dir"], "data_extraction.db")
+    return RPAConfig(valeurs)
+
+
+def get_config(config_file=None):
+    """
+    Retourne la configuration partagée, résolue une seule fois au premier appel.
+    :param config_file: Fichier JSON à utiliser lors de la résolution (ignoré ensuite).
+    """
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = load_config(config_file)
+        return _config
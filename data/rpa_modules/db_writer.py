@@ -0,0 +1,128 @@
+import time
+import queue
+import sqlite3
+import threading
+
+from rpa_modules.debug import setup_logger
+
+_FIN = object()
+
+
+class SQLiteWriter:
+    def __init__(self, db_path, table, cle="numero_contrat", taille_lot=50, intervalle_commit=1.0, logger=None):
+        """
+        Écrivain SQLite dédié : un thread unique détient une connexion longue durée en mode WAL
+        et regroupe les commits, les threads de traitement ne font que déposer des lignes.
+
+        Chaque ligne est écrite par un upsert sur `cle` ; une valeur None ne remplace pas une
+        valeur déjà présente en base.
+        :param db_path: Chemin de la base SQLite.
+        :param table: Table cible (doit exister, avec une contrainte UNIQUE sur `cle`).
+        :param cle: Colonne d'unicité utilisée pour l'upsert.
+        :param taille_lot: Nombre de lignes au-delà duquel un commit est fait.
+        :param intervalle_commit: Délai maximal en secondes avant le commit des lignes en attente.
+        :param logger: Logger pour les logs.
+        """
+        self.db_path = db_path
+        self.table = table
+        self.cle = cle
+        self.taille_lot = taille_lot
+        self.intervalle_commit = intervalle_commit
+        self.logger = logger or setup_logger('db_writer.log')
+        self.file = queue.Queue()
+        self.erreurs = 0
+        self._colonnes = None
+        self._thread = threading.Thread(target=self._boucle, name=f"SQLiteWriter-{table}", daemon=True)
+        self._thread.start()
+
+    def ecrire(self, ligne):
+        """
+        Dépose une ligne à écrire ; retourne immédiatement.
+        """
+        self.file.put(dict(ligne))
+
+    def flush(self):
+        """
+        Attend que toutes les lignes déposées aient été écrites et validées.
+        """
+        self.file.join()
+
+    def close(self):
+        """
+        Écrit les lignes restantes, valide et ferme la connexion.
+        """
+        if self._thread.is_alive():
+            self.file.put(_FIN)
+            self._thread.join()
+
+    def _connecter(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._colonnes = {ligne[1] for ligne in conn.execute(f"PRAGMA table_info({self.table})")}
+        return conn
+
+    def _upsert(self, conn, ligne):
+        inconnues = [colonne for colonne in ligne if colonne not in self._colonnes]
+        if inconnues:
+            self.logger.warning(f"Colonnes inconnues ignorées pour {self.table} : {', '.join(inconnues)}")
+        colonnes = [colonne for colonne in ligne if colonne in self._colonnes]
+        mises_a_jour = [
+            f"{colonne} = COALESCE(excluded.{colonne}, {colonne})" for colonne in colonnes if colonne != self.cle
+        ]
+        requete = (
+            f"INSERT INTO {self.table} ({', '.join(colonnes)}) VALUES ({', '.join(['?'] * len(colonnes))}) "
+            f"ON CONFLICT({self.cle}) DO "
+            + (f"UPDATE SET {', '.join(mises_a_jour)}" if mises_a_jour else "NOTHING")
+        )
+        self.logger.debug(f"Upsert {self.table} : {requete}")
+        conn.execute(requete, [ligne[colonne] for colonne in colonnes])
+
+    def _boucle(self):
+        try:
+            conn = self._connecter()
+        except sqlite3.Error as e:
+            self.logger.critical(f"Connexion impossible à la base {self.db_path} : {e}")
+            # Vider la file pour ne pas bloquer flush()/close()
+            while True:
+                element = self.file.get()
+                self.file.task_done()
+                if element is _FIN:
+                    return
+
+        en_attente = 0
+        dernier_commit = time.monotonic()
+        termine = False
+        while not termine:
+            try:
+                element = self.file.get(timeout=self.intervalle_commit)
+            except queue.Empty:
+                element = None
+
+            if element is _FIN:
+                termine = True
+            elif element is not None:
+                try:
+                    self._upsert(conn, element)
+                    en_attente += 1
+                except sqlite3.Error as e:
+                    self.erreurs += 1
+                    self.logger.error(f"Erreur lors de l'écriture du contrat {element.get(self.cle)} : {e}")
+
+            # Commit par lot, au plus tard après intervalle_commit, ou dès que la file est vide
+            if en_attente and (termine or en_attente >= self.taille_lot or self.file.empty()
+                               or time.monotonic() - dernier_commit >= self.intervalle_commit):
+                try:
+                    conn.commit()
+                    self.logger.debug(f"{en_attente} ligne(s) validée(s) dans {self.table}.")
+                except sqlite3.Error as e:
+                    self.erreurs += en_attente
+                    self.logger.error(f"Erreur lors du commit dans {self.table} : {e}")
+                en_attente = 0
+                dernier_commit = time.monotonic()
+
+            if element is not None:
+                self.file.task_done()
+
+        conn.close()
+        self.logger.info(f"Écrivain SQLite {self.table} fermé ({self.erreurs} erreur(s)).")
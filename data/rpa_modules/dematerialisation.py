@@ -2,6 +2,7 @@ import os
 import json
 import time
 import csv
+import threading
 from dotenv import load_dotenv
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
@@ -14,9 +15,13 @@ import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
 from rpa_modules.data_processing import extract_contrat_numbers_to_json
+from rpa_modules.waits import Attente, statistiques_attente
+from rpa_modules.timings import open_timings, chronometre, etape
+from rpa_modules.session import SessionManager
 
 
 from rpa_modules import setup_logger
+from rpa_modules.config import get_config
 
 load_dotenv()
 
@@ -33,9 +38,14 @@ class CasDematerialisationRPA:
         self.processed_count = 0
         self.error_count = 0
         self.start_time = None
+        self.timings = open_timings(logger=self.logger)
+        self.url = get_config().start_url
+        self.session = None
+        self.session_lock = threading.Lock()
 
 
-    def save_metrics_to_csv(self, results, total_error_count, file_path="metrics.csv"):
+    def save_metrics_to_csv(self, results, total_error_count, file_path=None):
+        file_path = file_path or get_config().state_path("metrics.csv")
         # Sauvegarder les métriques dans un fichier CSV
         with open(file_path, mode='a', newline='') as file:
             writer = csv.writer(file)
@@ -51,6 +61,7 @@ class CasDematerialisationRPA:
         self.logger.info(f"Métriques sauvegardées dans {file_path}")
 
 
+    @chronometre()
     def login(self, driver, wait, identifiant, mot_de_passe):
         self.logger.debug("Tentative de connexion...")
         try:
@@ -68,6 +79,19 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"Problème Login : {e}")
 
+    def obtenir_session(self, identifiant, mot_de_passe):
+        """
+        Retourne la session partagée par les drivers du pool, créée au premier appel.
+        """
+        with self.session_lock:
+            if self.session is None:
+                self.session = SessionManager(
+                    self.url,
+                    lambda driver: self.login(driver, WebDriverWait(driver, 10), identifiant, mot_de_passe),
+                    logger=self.logger
+                )
+            return self.session
+
     def process_json_files(self, file_path):
         self.logger.info("Traitement du fichier JSON pour les contrats...")
         if os.path.exists(file_path):
@@ -76,6 +100,7 @@ class CasDematerialisationRPA:
                 return list(data.values())
         return []
 
+    @chronometre()
     def submit_contract_number(self, driver, wait, numero):
         self.logger.info(f"Soumission du numéro de contrat {numero}...")
         try:
@@ -93,7 +118,8 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"Erreur soumission contrat : {e}")
 
-    def save_processed_contracts(self, contrats, file_path="numeros_contrat_traites_extraction.json"):
+    def save_processed_contracts(self, contrats, file_path=None):
+        file_path = file_path or get_config().state_path("numeros_contrat_traites_extraction.json")
         try:
             if os.path.exists(file_path):
                 with open(file_path, "r+") as file:
@@ -124,7 +150,8 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"Erreur lors de la gestion de la modal d'erreur : {e}")
 
-    def save_non_modifiable_contract(self, contrat_number, file_path="cas_non_modifiable.json"):
+    def save_non_modifiable_contract(self, contrat_number, file_path=None):
+        file_path = file_path or get_config().state_path("cas_non_modifiable.json")
         try:
             if os.path.exists(file_path):
                 with open(file_path, "r+") as file:
@@ -139,6 +166,7 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"Erreur sauvegarde contrat non modifiable : {e}")
     
+    @chronometre()
     def write_version_comment(self, driver, wait, numeros_contrat):
         try:
             # Attendre que l'élément de commentaire soit présent et visible
@@ -155,6 +183,7 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"Erreur lors de l'écriture dans le champ 'versionComment': {e}")
         
+    @chronometre()
     def switch_to_iframe(self, driver, wait, contrat_number):
         """
         Bascule vers l'iframe pour un contrat donné.
@@ -169,6 +198,7 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"{contrat_number} * Erreur lors du basculement vers l'iframe: {e}")
     
+    @chronometre()
     def click_facturation_button(self, driver, wait, contrat_number):
         """
         Clique sur le bouton 'Facturation' dans l'iframe.
@@ -183,6 +213,7 @@ class CasDematerialisationRPA:
         except Exception as e:
             self.logger.error(f"{contrat_number} * Erreur lors du clic sur 'Facturation': {e}")
     
+    @chronometre()
     def click_submit_button_and_confirm(self, driver, wait, numero_contrat):
         try:
             # Attendre que le premier bouton soit cliquable et cliquer dessus
@@ -201,10 +232,11 @@ class CasDematerialisationRPA:
         
         finally:
             # Redirection vers l'URL de base après le clic sur le deuxième bouton, que ça réussisse ou non
-            driver.get("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV")
+            driver.get(self.url)
             self.logger.info("Redirection vers l'URL de base après le clic.")
 
 
+    @chronometre()
     def select_pdf_signe(self, driver, wait, numero_contrat):
         try:
             # Attendre que l'élément <select> soit visible et interactif
@@ -222,8 +254,10 @@ class CasDematerialisationRPA:
             self.logger.error(f"{numero_contrat}*Erreur lors de la sélection de l'option 'PDF Signé': {e}")
             self.save_non_modifiable_contract(numero_contrat)
     
-    def process_batches(self, contract_numbers, batch_size, identifiant, mot_de_passe):
+    def process_batches(self, contract_numbers, batch_size, identifiant, mot_de_passe, progress_callback=None):
         total_contracts = len(contract_numbers)
+        if progress_callback:
+            progress_callback(0, total=total_contracts)
         num_batches = (total_contracts + batch_size - 1) // batch_size
         results = []
         total_error_count = 0  # Initialiser un compteur global d'erreurs
@@ -244,7 +278,7 @@ class CasDematerialisationRPA:
 
             with ThreadPoolExecutor(max_workers=self.pool.max_size) as executor:
                 futures = [
-                    executor.submit(self.worker, queue, identifiant, mot_de_passe)
+                    executor.submit(self.worker, queue, identifiant, mot_de_passe, progress_callback, total_contracts)
                     for _ in range(self.pool.max_size)
                 ]
 
@@ -264,11 +298,11 @@ class CasDematerialisationRPA:
 
 
     
-    def worker(self, queue, identifiant, mot_de_passe):
+    def worker(self, queue, identifiant, mot_de_passe, progress_callback=None, total_contracts=None):
         results = []
         error_count = 0  # Initialiser un compteur d'erreurs
         try:
-            driver = self.pool.get_driver("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV")
+            driver = self.pool.get_driver(self.url)
             while not self.STOP_FLAG:
                 try:
                     numero_contrat = queue.get(timeout=1)
@@ -288,6 +322,9 @@ class CasDematerialisationRPA:
                     if result[1] == 'Erreur':
                         error_count += 1  # Incrémenter le compteur d'erreurs
                     results.append((numero_contrat, result[1], contract_time))  # (numéro de contrat, succès/erreur, temps)
+                    if progress_callback:
+                        # Pourcentage inconnu ici (plusieurs workers) : la progression compte elle-même les contrats
+                        progress_callback(None, total=total_contracts, succes=result[1] is True)
                     queue.task_done()
 
                     if self.STOP_FLAG:
@@ -305,43 +342,50 @@ class CasDematerialisationRPA:
 
 
     def process_contract(self, driver, numero_contrat, identifiant, mot_de_passe):
-        try:
-            self.logger.info(f"Tentative de login pour le contrat {numero_contrat}")
-            wait = WebDriverWait(driver, 10)
-            self.login(driver, wait, identifiant, mot_de_passe)
+        with self.timings.contrat(numero_contrat, "dematerialisation", driver):
+            try:
+                wait = WebDriverWait(driver, 10)
+                with etape("session"):
+                    self.obtenir_session(identifiant, mot_de_passe).assurer_session(driver)
             
-            self.logger.info(f"Soumission du numéro de contrat {numero_contrat}")
-            self.submit_contract_number(driver, wait, numero_contrat)
+                self.logger.info(f"Soumission du numéro de contrat {numero_contrat}")
+                self.submit_contract_number(driver, wait, numero_contrat)
  
-            self.logger.info(f"Passage à l'iframe pour le contrat {numero_contrat}")
-            self.switch_to_iframe(driver, wait, numero_contrat)
+                self.logger.info(f"Passage à l'iframe pour le contrat {numero_contrat}")
+                self.switch_to_iframe(driver, wait, numero_contrat)
            
-            self.logger.info(f"Cliquer sur Facturation pour le contrat {numero_contrat}")
-            self.click_facturation_button(driver, wait, numero_contrat)
+                self.logger.info(f"Cliquer sur Facturation pour le contrat {numero_contrat}")
+                self.click_facturation_button(driver, wait, numero_contrat)
             
-            self.logger.info(f"Sélectionner PDF Signé pour le contrat {numero_contrat}")
-            self.select_pdf_signe(driver, wait, numero_contrat)
-            time.sleep(3)
-            self.logger.info(f"Écriture du commentaire version pour le contrat {numero_contrat}")
-            self.write_version_comment(driver, wait, numero_contrat)
+                self.logger.info(f"Sélectionner PDF Signé pour le contrat {numero_contrat}")
+                self.select_pdf_signe(driver, wait, numero_contrat)
+                Attente(driver, self.logger).dom_stable("dematerialisation.pdf_signe", timeout=3)
+                self.logger.info(f"Écriture du commentaire version pour le contrat {numero_contrat}")
+                self.write_version_comment(driver, wait, numero_contrat)
            
-            self.logger.info(f"Cliquer sur le bouton de soumission pour le contrat {numero_contrat}")
-            self.click_submit_button_and_confirm(driver, wait, numero_contrat)
+                self.logger.info(f"Cliquer sur le bouton de soumission pour le contrat {numero_contrat}")
+                self.click_submit_button_and_confirm(driver, wait, numero_contrat)
           
-            self.logger.info(f"{numero_contrat} * Traitement terminé.")
-            self.save_processed_contracts([numero_contrat])
+                self.logger.info(f"{numero_contrat} * Traitement terminé.")
+                self.save_processed_contracts([numero_contrat])
 
-            return (numero_contrat, True, "Succès")
-        except Exception as e:
-            self.logger.critical(f"Erreur lors du traitement du contrat {numero_contrat} : {e}")
-            self.save_non_modifiable_contract(numero_contrat)
-            return (numero_contrat, False, "Erreur")
-        finally:
-            driver.get("https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV")
+                return (numero_contrat, True, "Succès")
+            except Exception as e:
+                self.logger.critical(f"Erreur lors du traitement du contrat {numero_contrat} : {e}")
+                self.save_non_modifiable_contract(numero_contrat)
+                return (numero_contrat, False, "Erreur")
+            finally:
+                with etape("reinitialisation_driver"):
+                    driver.get(self.url)
 
 
-    def main(self, excel_path="C:/Users/PHSX095/OneDrive - LA POSTE GROUPE/Documents/GUI/data/data_traitement/Affranchigo_Demat_helene.xlsx"):
+    def main(self, excel_path=None, progress_callback=None):
+        """
+        Méthode principale du RPA Dématérialisation : traitement des contrats par lots.
+        :param progress_callback: Fonction appelée après chaque contrat (voir progress.Progression).
+        """
         self.logger.info("Démarrage du script pour la dématérialisation...")
+        excel_path = excel_path or get_config().data_path("Affranchigo_Demat_helene.xlsx")
 
         # Initialiser la variable start_time
         self.start_time = time.time()
@@ -350,23 +394,25 @@ class CasDematerialisationRPA:
         mot_de_passe = os.getenv("MOT_DE_PASSE")
 
         # Extraire les numéros de contrats depuis l'Excel et les sauvegarder en JSON
-        json_file_path = "cas_privée_a_traiter.json"
+        json_file_path = get_config().state_path("cas_privée_a_traiter.json")
         extract_contrat_numbers_to_json(excel_path, json_file_path)
 
         # Charger les numéros de contrats à traiter depuis le fichier JSON
         numeros_contrat = self.process_json_files(json_file_path)
 
         # Traiter les contrats en lots
-        results, total_error_count = self.process_batches(numeros_contrat, 10, identifiant, mot_de_passe)
+        results, total_error_count = self.process_batches(numeros_contrat, 10, identifiant, mot_de_passe, progress_callback)
 
         # Sauvegarder les métriques après traitement
         self.save_metrics_to_csv(results, total_error_count)
+        statistiques_attente.journaliser(self.logger)
 
         return results
 
 
 
-    def start(self, excel_path="C:/Users/PHSX095/OneDrive - LA POSTE GROUPE/Documents/GUI/data/data_traitement/Affranchigo_Demat_helene.xlsx"):
+    def start(self, excel_path=None):
+        excel_path = excel_path or get_config().data_path("Affranchigo_Demat_helene.xlsx")
         self.logger.info(f"Lancement du RPA Dématerialisation avec le fichier {excel_path}")
         self.STOP_FLAG = False
         self.main(excel_path)
@@ -0,0 +1,151 @@
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
+
+# Modes de lecture de lire_champs
+MODE_TEXTE = "texte"
+MODE_OPTION = "option"
+MODE_COCHE = "coche"
+
+# Résolution de plusieurs localisateurs en un seul aller-retour avec le navigateur
+SCRIPT_SONDER = """
+var localisateurs = arguments[0], visibles = arguments[1], trouves = {};
+function resoudre(strategie, valeur) {
+    switch (strategie) {
+        case 'id': return document.getElementById(valeur);
+        case 'css selector': return document.querySelector(valeur);
+        case 'xpath': return document.evaluate(valeur, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case 'name': return document.getElementsByName(valeur)[0] || null;
+        case 'class name': return document.getElementsByClassName(valeur)[0] || null;
+        case 'tag name': return document.getElementsByTagName(valeur)[0] || null;
+    }
+    return null;
+}
+for (var i = 0; i < localisateurs.length; i++) {
+    var nom = localisateurs[i][0], element = null;
+    try { element = resoudre(localisateurs[i][1], localisateurs[i][2]); } catch (e) { element = null; }
+    if (element && visibles && !(element.offsetWidth || element.offsetHeight || element.getClientRects().length)) {
+        element = null;
+    }
+    if (element) { trouves[nom] = element; }
+}
+return trouves;
+"""
+
+
+# Lecture de plusieurs champs (texte, option sélectionnée, case cochée) en un seul aller-retour
+SCRIPT_LIRE_CHAMPS = """
+var champs = arguments[0], valeurs = {}, presents = [];
+for (var i = 0; i < champs.length; i++) {
+    var nom = champs[i][0], element = document.getElementById(champs[i][1]), mode = champs[i][2];
+    if (!element) { continue; }
+    presents.push(nom);
+    if (mode === 'option') {
+        var option = element.selectedIndex >= 0 ? element.options[element.selectedIndex] : null;
+        valeurs[nom] = option ? option.text.trim() : null;
+    } else if (mode === 'coche') {
+        valeurs[nom] = !!element.checked;
+    } else {
+        valeurs[nom] = (element.innerText || element.textContent || '').trim();
+    }
+}
+return {valeurs: valeurs, presents: presents};
+"""
+
+
+def sonder(driver, localisateurs, timeout=1, intervalle=0.1, visibles=False, requis=None):
+    """
+    Retourne les éléments présents parmi un ensemble de localisateurs, sans attente longue.
+
+    Tous les localisateurs sont résolus en un seul execute_script par passage ; les passages
+    sont répétés jusqu'à ce que les éléments requis soient trouvés ou que `timeout` soit écoulé.
+    Les éléments absents ne coûtent donc au plus que `timeout`, au lieu d'un WebDriverWait complet.
+    :param driver: Instance de WebDriver.
+    :param localisateurs: Dictionnaire {nom: (By.X, valeur)}.
+    :param timeout: Durée maximale de scrutation en secondes.
+    :param intervalle: Intervalle entre deux passages en secondes.
+    :param visibles: Ne retenir que les éléments affichés.
+    :param requis: Éléments à attendre (par défaut, tous) : un nom, ou un tuple de noms dont un seul
+                   suffit (variantes d'un même champ dont une seule existe selon la page).
+    :return: Dictionnaire {nom: WebElement} des seuls éléments présents.
+    """
+    liste = [[nom, strategie, valeur] for nom, (strategie, valeur) in localisateurs.items()]
+    requis = localisateurs if requis is None else requis
+    groupes = [(nom,) if isinstance(nom, str) else tuple(nom) for nom in requis]
+    limite = time.monotonic() + timeout
+    trouves = {}
+    while True:
+        trouves = driver.execute_script(SCRIPT_SONDER, liste, visibles) or {}
+        complet = all(any(nom in trouves for nom in groupe) for groupe in groupes)
+        if complet or time.monotonic() >= limite:
+            return trouves
+        time.sleep(intervalle)
+
+
+def sonder_bloc(driver, localisateurs, requis=None, timeout=10, delai_facultatifs=2, visibles=False):
+    """
+    Sonde un bloc de formulaire : les éléments requis disposent de tout `timeout`, les autres
+    (absents selon la mise en page) d'une courte sonde de `delai_facultatifs` une fois les requis trouvés.
+    :param driver: Instance de WebDriver.
+    :param localisateurs: Dictionnaire {nom: (By.X, valeur)}.
+    :param requis: Éléments requis, au format de `sonder` (par défaut, tous).
+    :param timeout: Attente maximale des éléments requis, en secondes.
+    :param delai_facultatifs: Durée maximale de scrutation des éléments facultatifs, en secondes.
+    :param visibles: Ne retenir que les éléments affichés.
+    :return: Dictionnaire {nom: WebElement} des seuls éléments présents.
+    """
+    trouves = sonder(driver, localisateurs, timeout=timeout, visibles=visibles, requis=requis)
+    if requis is None:
+        return trouves
+    groupes = [(entree,) if isinstance(entree, str) else tuple(entree) for entree in requis]
+    if not all(any(nom in trouves for nom in groupe) for groupe in groupes):
+        # Bloc incomplet : inutile de prolonger la sonde pour les éléments facultatifs
+        return trouves
+    noms_requis = {nom for groupe in groupes for nom in groupe}
+    facultatifs = {nom: loc for nom, loc in localisateurs.items() if nom not in trouves and nom not in noms_requis}
+    if facultatifs:
+        trouves.update(sonder(driver, facultatifs, timeout=delai_facultatifs, visibles=visibles))
+    return trouves
+
+
+def present(driver, localisateur, timeout=1, visibles=False):
+    """
+    Retourne l'élément s'il apparaît dans le délai, sinon None.
+    """
+    return sonder(driver, {"element": localisateur}, timeout=timeout, visibles=visibles).get("element")
+
+
+def ids(*identifiants):
+    """
+    Construit un dictionnaire de localisateurs par id : {id: (By.ID, id)}.
+    """
+    return {identifiant: (By.ID, identifiant) for identifiant in identifiants}
+
+
+def lire_champs(driver, champs, requis=None, timeout=10, intervalle=0.2):
+    """
+    Lit un ensemble de champs en un seul execute_script par passage, au lieu d'un aller-retour
+    WebDriver par attente et par lecture.
+    :param driver: Instance de WebDriver.
+    :param champs: Dictionnaire {nom: (id de l'élément, mode)} avec mode MODE_TEXTE,
+                   MODE_OPTION (texte de l'option sélectionnée) ou MODE_COCHE (booléen).
+    :param requis: Noms des champs à attendre (par défaut, tous) ; les autres sont facultatifs.
+    :param timeout: Attente maximale des champs requis, en secondes.
+    :param intervalle: Intervalle entre deux passages en secondes.
+    :return: Dictionnaire {nom: valeur}, avec None pour un champ absent.
+    :raises TimeoutException: Si un champ requis est toujours absent après `timeout`.
+    """
+    requis = list(champs) if requis is None else list(requis)
+    liste = [[nom, identifiant, mode] for nom, (identifiant, mode) in champs.items()]
+    limite = time.monotonic() + timeout
+    while True:
+        resultat = driver.execute_script(SCRIPT_LIRE_CHAMPS, liste) or {}
+        presents = set(resultat.get("presents", []))
+        manquants = [nom for nom in requis if nom not in presents]
+        if not manquants:
+            valeurs = resultat.get("valeurs", {})
+            return {nom: valeurs.get(nom) for nom in champs}
+        if time.monotonic() >= limite:
+            raise TimeoutException(f"Champs introuvables après {timeout}s : {', '.join(manquants)}")
+        time.sleep(intervalle)
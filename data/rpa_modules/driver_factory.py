@@ -0,0 +1,166 @@
+import os
+from selenium import webdriver
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import BASE_DIR
+from rpa_modules.resource_blocking import BlocageRessources
+
+BACKEND_EDGE = "edge"
+BACKEND_CHROMIUM = "chromium"
+BACKEND_FIREFOX = "firefox"
+
+# Préréglages d'options partagés par tous les navigateurs
+PRESETS = {
+    # Options historiques du pool : headless, logs réduits, images chargées
+    "standard": {"headless": True, "images": True, "logs_reduits": True, "bloquer_ressources": False, "bloquer_css": False},
+    # Hôtes denses : images, polices et domaines tiers bloqués, requêtes économisées mesurées
+    "leger": {"headless": True, "images": False, "logs_reduits": True, "bloquer_ressources": True, "bloquer_css": False},
+    # Mise au point : navigateur visible et logs complets
+    "debug": {"headless": False, "images": True, "logs_reduits": False, "bloquer_ressources": False, "bloquer_css": False},
+}
+DEFAULT_PRESET = "standard"
+
+# Drivers livrés avec le projet, utilisés s'ils existent et qu'aucun driver n'est configuré
+DRIVERS_LOCAUX = {
+    BACKEND_EDGE: ["msedgedriver.exe", "msedgedriver"],
+    BACKEND_CHROMIUM: ["chromedriver.exe", "chromedriver"],
+    BACKEND_FIREFOX: ["geckodriver.exe", "geckodriver"],
+}
+
+# Arguments communs à Edge et Chromium
+ARGUMENTS_CHROMIUM = [
+    "--disable-software-rasterizer",
+    "--ignore-certificate-errors",
+    "--ignore-ssl-errors",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-popup-blocking",
+    "--disable-gpu",
+]
+
+
+def _options_chromium(options, reglages, binary=None, blocage=None, capacite_logs="goog:loggingPrefs"):
+    if reglages["headless"]:
+        options.add_argument("--headless")
+    for argument in ARGUMENTS_CHROMIUM:
+        options.add_argument(argument)
+    if reglages["logs_reduits"]:
+        options.add_argument("--log-level=3")
+        options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    if blocage is not None:
+        # Images bloquées par CDP, en respectant l'allowlist
+        blocage.preparer_options_chromium(options, capacite_logs)
+    elif not reglages["images"]:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if binary:
+        options.binary_location = binary
+    return options
+
+
+def _creer_edge(reglages, driver_path, binary, blocage):
+    from selenium.webdriver.edge.service import Service
+    from selenium.webdriver.edge.options import Options
+
+    options = _options_chromium(Options(), reglages, binary, blocage, "ms:loggingPrefs")
+    return webdriver.Edge(service=Service(driver_path), options=options)
+
+
+def _creer_chromium(reglages, driver_path, binary, blocage):
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    options = _options_chromium(Options(), reglages, binary, blocage)
+    return webdriver.Chrome(service=Service(driver_path), options=options)
+
+
+def _creer_firefox(reglages, driver_path, binary, blocage):
+    from selenium.webdriver.firefox.service import Service
+    from selenium.webdriver.firefox.options import Options
+
+    options = Options()
+    if reglages["headless"]:
+        options.add_argument("-headless")
+    options.accept_insecure_certs = True
+    options.set_preference("dom.disable_open_during_load", False)
+    if blocage is not None:
+        blocage.preparer_options_firefox(options)
+    elif not reglages["images"]:
+        options.set_preference("permissions.default.image", 2)
+    if binary:
+        options.binary_location = binary
+    # geckodriver journalise chaque commande par défaut
+    service = Service(driver_path, log_output=os.devnull) if reglages["logs_reduits"] else Service(driver_path)
+    return webdriver.Firefox(service=service, options=options)
+
+
+BACKENDS = {
+    BACKEND_EDGE: _creer_edge,
+    BACKEND_CHROMIUM: _creer_chromium,
+    BACKEND_FIREFOX: _creer_firefox,
+}
+
+
+class DriverFactory:
+    def __init__(self, backend=BACKEND_EDGE, preset=DEFAULT_PRESET, driver_path=None, binary=None,
+                 allowlist=None, logger=None):
+        """
+        Fabrique de WebDrivers : le navigateur et ses options sont choisis par RPA, sans que le pool
+        ne dépende d'un navigateur particulier.
+        :param backend: Navigateur (edge, chromium ou firefox).
+        :param preset: Nom d'un préréglage de PRESETS, ou dictionnaire de réglages complétant "standard".
+        :param driver_path: Chemin du driver (msedgedriver, chromedriver, geckodriver) ; None : Selenium Manager ou PATH.
+        :param binary: Chemin du navigateur s'il n'est pas à l'emplacement par défaut.
+        :param allowlist: Motifs d'URL jamais bloqués quand le préréglage bloque les ressources.
+        :param logger: Logger pour les logs.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Navigateur inconnu : {backend} (disponibles : {', '.join(BACKENDS)})")
+        if isinstance(preset, dict):
+            self.reglages = {**PRESETS[DEFAULT_PRESET], **preset}
+        elif preset in PRESETS:
+            self.reglages = dict(PRESETS[preset])
+        else:
+            raise ValueError(f"Préréglage inconnu : {preset} (disponibles : {', '.join(PRESETS)})")
+        self.backend = backend
+        self.preset = preset if isinstance(preset, str) else "personnalise"
+        self.driver_path = driver_path or self._driver_local(backend)
+        self.binary = binary
+        self.logger = logger or setup_logger('driver_factory.log')
+        self.blocage = None
+        if self.reglages.get("bloquer_ressources"):
+            self.blocage = BlocageRessources(
+                bloquer_images=not self.reglages["images"],
+                bloquer_css=self.reglages.get("bloquer_css", False),
+                allowlist=allowlist,
+                logger=self.logger
+            )
+
+    @staticmethod
+    def _driver_local(backend):
+        for nom in DRIVERS_LOCAUX[backend]:
+            chemin = os.path.join(BASE_DIR, "driver", nom)
+            if os.path.exists(chemin):
+                return chemin
+        return None
+
+    def create(self):
+        """
+        Démarre un nouveau navigateur et retourne son WebDriver.
+        """
+        self.logger.debug(f"Démarrage d'un navigateur {self.backend} (préréglage {self.preset}).")
+        driver = BACKENDS[self.backend](self.reglages, self.driver_path, self.binary, self.blocage)
+        if self.blocage is not None and self.backend != BACKEND_FIREFOX:
+            self.blocage.appliquer(driver)
+        return driver
+
+    def mesurer(self, driver):
+        """
+        Relève les requêtes chargées et bloquées par ce navigateur depuis la dernière mesure.
+        """
+        if self.blocage is None or not getattr(driver, "blocage_actif", False):
+            return None
+        return self.blocage.mesurer(driver)
+
+    def __repr__(self):
+        return f"DriverFactory(backend={self.backend!r}, preset={self.preset!r})"
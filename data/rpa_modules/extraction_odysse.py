@@ -12,12 +12,17 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from selenium.webdriver.support.ui import Select 
 from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
 from dotenv import load_dotenv
 
 from rpa_modules import setup_logger
 from rpa_modules.data_processing import extract_contrat_numbers_to_json
+from rpa_modules.waits import Attente, statistiques_attente
+from rpa_modules.timings import open_timings, chronometre, etape
+from rpa_modules.session import SessionManager
+from rpa_modules.dom_utils import lire_champs, MODE_TEXTE, MODE_OPTION, MODE_COCHE
+from rpa_modules.db_writer import SQLiteWriter
+from rpa_modules.config import get_config
 # Charger les variables d'environnement
 
 load_dotenv()
@@ -31,18 +36,28 @@ class ExtractionRPA:
         """
         self.pool = pool
         self.logger = logger or setup_logger("seres_case.log")
-        self.url = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc?profil=ADV"
+        self.url = get_config().start_url
         self.file_lock = threading.Lock()  # Lock pour les fichiers
         self.lock = threading.Lock()  # Lock pour gérer la concurrence
+        self.timings = open_timings(logger=self.logger)
+        self.session = None
+        self.processed_path = get_config().state_path("numeros_contrat_traites.json")
+        # Ligne en cours de constitution par contrat, écrite en une fois en fin de traitement
+        self.lignes = {}
+        self.db_writer = None
+        # Création et fermeture de l'écrivain SQLite (réentrant : init_db appelle close_db)
+        self.db_lock = threading.RLock()
 
         # Vérification pour log le type de self.pool
         self.logger.info(f"Type de self.pool: {type(self.pool)}")
 
 
-    def init_db(self, db_path="C:/Users/PHSX095/OneDrive - LA POSTE GROUPE\Documents/GUI/data/data_traitement/data_extraction.db"):
+    def init_db(self, db_path=None):
         """
         Initialise la base de données SQLite si elle n'existe pas déjà.
+        :param db_path: Chemin de la base (par défaut, db_path de la configuration).
         """
+        db_path = db_path or get_config().db_path
         try:
             # Assure-toi que le chemin de la base de données est une chaîne valide
             if not isinstance(db_path, (str, bytes, os.PathLike)):
@@ -99,6 +114,11 @@ class ExtractionRPA:
             conn.close()
             self.logger.info("Base de données initialisée avec succès.")
 
+            # Écrivain unique sur une connexion longue durée (WAL, commits groupés)
+            with self.db_lock:
+                self.close_db()
+                self.db_writer = SQLiteWriter(db_path, "infos_extraites", logger=self.logger)
+
         except sqlite3.Error as e:
             self.logger.error(f"Erreur SQLite lors de l'initialisation de la base de données: {e}")
         except Exception as e:
@@ -106,56 +126,48 @@ class ExtractionRPA:
             raise
 
 
-    def save_info_to_db(self, info, db_path="C:/Users/PHSX095/OneDrive - LA POSTE GROUPE/Documents/GUI/data/data_traitement/data_extraction.db"):
+    def save_info_to_db(self, info):
         """
-        Sauvegarde les informations extraites dans la base de données avec mise à jour si le contrat existe déjà.
+        Fusionne des informations extraites dans la ligne en mémoire du contrat.
+        Les valeurs None ne remplacent pas une valeur déjà extraite ; la ligne est écrite en base
+        par write_contract_row une fois toutes les étapes passées.
         """
-        try:
-            # Récupérer le chemin absolu de la base de données
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            db_full_path = os.path.join(base_dir, db_path)
-
-            # Se connecter à la base de données
-            conn = sqlite3.connect(db_full_path)
-            cursor = conn.cursor()
-
-            # Vérification si le numero_contrat existe déjà
-            cursor.execute("SELECT COUNT(1) FROM infos_extraites WHERE numero_contrat = ?", (info['numero_contrat'],))
-            exists = cursor.fetchone()[0]
-
-            if exists:
-                # Mettre à jour les informations du contrat existant
-                update_keys = [f"{key} = ?" for key, value in info.items() if value is not None]
-                update_values = [value for key, value in info.items() if value is not None]
-                update_query = f"UPDATE infos_extraites SET {', '.join(update_keys)} WHERE numero_contrat = ?"
-                
-                self.logger.info(f"Requête de mise à jour générée : {update_query}")
-                self.logger.info(f"Valeurs pour mise à jour : {update_values}")
+        numero_contrat = info['numero_contrat']
+        with self.lock:
+            ligne = self.lignes.setdefault(numero_contrat, {"numero_contrat": numero_contrat})
+            ligne.update({cle: valeur for cle, valeur in info.items() if valeur is not None})
 
-                # Exécuter la requête de mise à jour
-                cursor.execute(update_query, update_values + [info['numero_contrat']])
-            else:
-                # Insérer un nouveau contrat
-                keys = [key for key, value in info.items() if value is not None]
-                values = [info[key] for key in keys]
-                insert_query = f"INSERT INTO infos_extraites ({', '.join(keys)}) VALUES ({', '.join(['?'] * len(values))})"
-
-                self.logger.info(f"Requête d'insertion générée : {insert_query}")
-                self.logger.info(f"Valeurs à insérer : {values}")
 
-                # Exécuter la requête d'insertion
-                cursor.execute(insert_query, values)
+    def write_contract_row(self, numero_contrat):
+        """
+        Transmet la ligne fusionnée du contrat à l'écrivain SQLite (un seul upsert par contrat).
+        """
+        with self.lock:
+            ligne = self.lignes.pop(numero_contrat, None)
+        if not ligne or len(ligne) == 1:
+            return
+        db_writer = self.db_writer
+        if db_writer is None:
+            with self.db_lock:
+                # Double vérification : un autre thread a pu créer l'écrivain entre-temps,
+                # init_db le fermerait pour en recréer un
+                if self.db_writer is None:
+                    self.init_db()
+                db_writer = self.db_writer
+        if db_writer is None:
+            self.logger.error(f"Aucun écrivain SQLite disponible, informations du contrat {numero_contrat} perdues.")
+            return
+        db_writer.ecrire(ligne)
 
-            # Commit les modifications
-            conn.commit()
-            self.logger.info("Les informations ont été insérées ou mises à jour dans la base de données avec succès.")
 
-        except sqlite3.Error as e:
-            self.logger.error(f"Erreur lors de l'insertion ou de la mise à jour dans la base de données: {e}")
-        
-        finally:
-            if conn:
-                conn.close()
+    def close_db(self):
+        """
+        Écrit les lignes en attente et ferme la connexion de l'écrivain SQLite.
+        """
+        with self.db_lock:
+            if self.db_writer is not None:
+                self.db_writer.close()
+                self.db_writer = None
 
 
     def process_json_files(self, json_path):
@@ -192,6 +204,7 @@ class ExtractionRPA:
         except Exception as e:
             self.logger.error(f"Erreur lors de la gestion de la modal d'erreur : {e}")
 
+    @chronometre()
     def login(self, driver, wait, identifiant, mot_de_passe):
         if driver is None:
             self.logger.error("Driver non initialisé, impossible de se connecter.")
@@ -212,6 +225,19 @@ class ExtractionRPA:
         except Exception as e:
             self.logger.error(f"Problème Login: {e}")
 
+    def obtenir_session(self, identifiant, mot_de_passe):
+        """
+        Retourne la session partagée par les drivers du pool, créée au premier appel.
+        """
+        with self.lock:
+            if self.session is None:
+                self.session = SessionManager(
+                    self.url,
+                    lambda driver: self.login(driver, WebDriverWait(driver, 20), identifiant, mot_de_passe),
+                    logger=self.logger
+                )
+            return self.session
+
     def load_processed_contracts(self, file_path):
         if not os.path.exists(file_path):
             with open(file_path, "w") as file:
@@ -247,7 +273,8 @@ class ExtractionRPA:
             with open(json_file_path, "w") as file:
                 json.dump(list(contrats), file)
 
-    def save_non_modifiable(self, contrat_number, file_path="problemes_contrats.json"):
+    def save_non_modifiable(self, contrat_number, file_path=None):
+        file_path = file_path or get_config().state_path("problemes_contrats.json")
         data = set()
         try:
             with open(file_path, "r") as file:
@@ -267,6 +294,7 @@ class ExtractionRPA:
         else:
             self.logger.debug(f"Contrat numéro {contrat_number} déjà présent, non ajouté.")
 
+    @chronometre()
     def submit_contract_number(self, driver, wait, numero):
         if not driver:
             self.logger.error("Driver non initialisé, impossible de soumettre le numéro de contrat.")
@@ -288,6 +316,7 @@ class ExtractionRPA:
             self.logger.error(f"Erreur Submit_contrat: {e}")
 
 
+    @chronometre()
     def switch_to_iframe(self, driver, wait, contrat_number):
         """
         Bascule vers l'iframe pour un contrat donné.
@@ -302,6 +331,7 @@ class ExtractionRPA:
         except Exception as e:
             self.logger.error(f"{contrat_number} * Erreur lors du basculement vers l'iframe: {e}")
     
+    @chronometre()
     def click_facturation_button(self, driver, wait, contrat_number):
         """
         Clique sur le bouton 'Facturation' dans l'iframe.
@@ -318,6 +348,7 @@ class ExtractionRPA:
 
 
 
+    @chronometre()
     def extract_details_num(self, driver, wait, contrat_number, max_retries=3):
         """
         Extrait les informations d'un contrat sur la base des éléments ID. Réessaye en cas d'échec.
@@ -325,12 +356,19 @@ class ExtractionRPA:
         retries = 0
         while retries < max_retries:
             try:
-                # Attendre que les éléments soient disponibles et extraire leurs valeurs
-                detailsCategorieV = wait.until(EC.presence_of_element_located((By.ID, "detailsCategorieV"))).text.strip()
-                detailsTypeContratV = wait.until(EC.presence_of_element_located((By.ID, "detailsTypeContratV"))).text.strip()
-                detailsSTypeContratV = wait.until(EC.presence_of_element_located((By.ID, "detailsSTypeContratV"))).text.strip()
-                detailsVersionStatutV = wait.until(EC.presence_of_element_located((By.ID, "detailsVersionStatutV"))).text.strip()
-                detailsVersionSStatutV = wait.until(EC.presence_of_element_located((By.ID, "detailsVersionSStatutV"))).text.strip()
+                # Attendre que les éléments soient disponibles et extraire leurs valeurs en un seul aller-retour
+                details = lire_champs(driver, {
+                    "detailsCategorieV": ("detailsCategorieV", MODE_TEXTE),
+                    "detailsTypeContratV": ("detailsTypeContratV", MODE_TEXTE),
+                    "detailsSTypeContratV": ("detailsSTypeContratV", MODE_TEXTE),
+                    "detailsVersionStatutV": ("detailsVersionStatutV", MODE_TEXTE),
+                    "detailsVersionSStatutV": ("detailsVersionSStatutV", MODE_TEXTE),
+                }, timeout=20)
+                detailsCategorieV = details["detailsCategorieV"]
+                detailsTypeContratV = details["detailsTypeContratV"]
+                detailsSTypeContratV = details["detailsSTypeContratV"]
+                detailsVersionStatutV = details["detailsVersionStatutV"]
+                detailsVersionSStatutV = details["detailsVersionSStatutV"]
 
                 # Log des résultats
                 self.logger.info(f"{contrat_number} * Détails extraits: {detailsCategorieV}, {detailsTypeContratV}, {detailsSTypeContratV}, {detailsVersionStatutV}, {detailsVersionSStatutV}")
@@ -357,6 +395,7 @@ class ExtractionRPA:
                     self.save_non_modifiable(contrat_number)
 
     
+    @chronometre()
     def extract_facturation_element(self, driver, wait, contrat_number, max_retries=3):
         """
         Extrait les éléments de facturation, incluant les sélecteurs et la checkbox, avec gestion stricte et retries.
@@ -364,21 +403,29 @@ class ExtractionRPA:
         retries = 0
         while retries < max_retries:
             try:
-                # Partie 1 : Extraction des sélecteurs
-                facturation_delai = Select(wait.until(EC.presence_of_element_located((By.ID, "facturationPaiemenDelaiI")))).first_selected_option.text.strip()
-                facturation_mode_paiement = Select(wait.until(EC.presence_of_element_located((By.ID, "facturationPaiementModePaiementI")))).first_selected_option.text.strip()
-                facturation_periodicite = Select(wait.until(EC.presence_of_element_located((By.ID, "facturationPaiementPeriodiciteI")))).first_selected_option.text.strip()
+                # Sélecteurs, checkbox et support de facture lus en un seul aller-retour
+                facturation = lire_champs(driver, {
+                    "facturation_delai": ("facturationPaiemenDelaiI", MODE_OPTION),
+                    "facturation_mode_paiement": ("facturationPaiementModePaiementI", MODE_OPTION),
+                    "facturation_periodicite": ("facturationPaiementPeriodiciteI", MODE_OPTION),
+                    "type_client": ("facturationPaiementTypeClientI", MODE_COCHE),
+                    "facturation_support_facture": ("facturationPaiementSupportFactureI", MODE_OPTION),
+                }, timeout=20)
+
+                # Partie 1 : Sélecteurs
+                facturation_delai = facturation["facturation_delai"]
+                facturation_mode_paiement = facturation["facturation_mode_paiement"]
+                facturation_periodicite = facturation["facturation_periodicite"]
 
                 self.logger.info(f"{contrat_number} * Facturation Délai: {facturation_delai}, Mode Paiement: {facturation_mode_paiement}, Périodicité: {facturation_periodicite}")
 
-                # Partie 2 : Extraction de la valeur de la checkbox
-                type_client_checkbox = wait.until(EC.presence_of_element_located((By.ID, "facturationPaiementTypeClientI"))).is_selected()
-                type_client_value = "True" if type_client_checkbox else "False"
+                # Partie 2 : Valeur de la checkbox
+                type_client_value = "True" if facturation["type_client"] else "False"
                 
                 self.logger.info(f"{contrat_number} * Checkbox Type Client: {type_client_value}")
 
-                # Partie 3 : Extraction de l'élément facturationPaiementSupportFactureI (option sélectionnée uniquement)
-                facturation_support_facture = Select(wait.until(EC.presence_of_element_located((By.ID, "facturationPaiementSupportFactureI")))).first_selected_option.text.strip()
+                # Partie 3 : Élément facturationPaiementSupportFactureI (option sélectionnée uniquement)
+                facturation_support_facture = facturation["facturation_support_facture"]
 
                 self.logger.info(f"{contrat_number} * Support Facture sélectionné: {facturation_support_facture}")
                 
@@ -407,6 +454,7 @@ class ExtractionRPA:
                     
 
 
+    @chronometre()
     def click_reference_client_tab(self, driver, wait):
         """
         Fonction pour cliquer sur l'onglet 'Référence Client'.
@@ -417,12 +465,13 @@ class ExtractionRPA:
             reference_client_tab.click()
             self.logger.info("Onglet 'Référence Client' cliqué avec succès.")
             
-            # Attendre un peu après le clic pour s'assurer que le contenu est chargé
-            time.sleep(2)
+            # Attendre que le contenu de l'onglet soit chargé
+            Attente(driver, self.logger).dom_stable("extraction.onglet_reference_client", timeout=2)
             
         except Exception as e:
             self.logger.error(f"Erreur lors du clic sur l'onglet 'Référence Client': {e}")
 
+    @chronometre()
     def extract_element_reference_client(self, driver, wait, contrat_number, max_retries=3):
         """
         Extrait les éléments de l'onglet 'Référence Client' et les sauvegarde dans la base de données avec retries.
@@ -430,24 +479,30 @@ class ExtractionRPA:
         retries = 0
         while retries < max_retries:
             try:
-                # Fonction pour extraire le texte d'un élément ou retourner None si l'élément est absent
-                def get_element_text_by_id(element_id):
-                    try:
-                        element = wait.until(EC.presence_of_element_located((By.ID, element_id)))
-                        text = element.text.strip()
-                        return text if text else None
-                    except Exception as e:
-                        self.logger.warning(f"Élément {element_id} non trouvé ou vide.")
-                        return None
+                # Champs facultatifs lus en un seul aller-retour ; absents ou vides : None
+                identifiants = [
+                    "facturationClientNumeroBonCommandeI",
+                    "facturationClientReferenceBusinessUnitI",
+                    "facturationClientReferenceSite1I",
+                    "facturationClientReferenceSite2I",
+                    "facturationClientDestinataireReferenceSite1I",
+                    "facturationClientDestinataireReferenceSite2I",
+                    "facturationClientNumeroMarcheI"
+                ]
+                references = lire_champs(driver, {identifiant: (identifiant, MODE_TEXTE) for identifiant in identifiants}, requis=())
+                for identifiant in identifiants:
+                    if not references[identifiant]:
+                        references[identifiant] = None
+                        self.logger.warning(f"Élément {identifiant} non trouvé ou vide.")
 
                 # Extraction des éléments
-                numero_bon_commande = get_element_text_by_id("facturationClientNumeroBonCommandeI")
-                reference_business_unit = get_element_text_by_id("facturationClientReferenceBusinessUnitI")
-                reference_site1 = get_element_text_by_id("facturationClientReferenceSite1I")
-                reference_site2 = get_element_text_by_id("facturationClientReferenceSite2I")
-                destinataire_reference_site1 = get_element_text_by_id("facturationClientDestinataireReferenceSite1I")
-                destinataire_reference_site2 = get_element_text_by_id("facturationClientDestinataireReferenceSite2I")
-                numero_marche = get_element_text_by_id("facturationClientNumeroMarcheI")
+                numero_bon_commande = references["facturationClientNumeroBonCommandeI"]
+                reference_business_unit = references["facturationClientReferenceBusinessUnitI"]
+                reference_site1 = references["facturationClientReferenceSite1I"]
+                reference_site2 = references["facturationClientReferenceSite2I"]
+                destinataire_reference_site1 = references["facturationClientDestinataireReferenceSite1I"]
+                destinataire_reference_site2 = references["facturationClientDestinataireReferenceSite2I"]
+                numero_marche = references["facturationClientNumeroMarcheI"]
 
                 # Sauvegarder dans la base de données
                 self.save_info_to_db({
@@ -478,65 +533,75 @@ class ExtractionRPA:
 
 
     def process_contract(self, numero_contrat, identifiant, mot_de_passe, processed_contracts, retry_count=3):
-        retry_attempts = 0
-        while retry_attempts < retry_count:
-            try:
-                driver = self.pool.get_driver(self.url)  
-                self.logger.info(f"Début du traitement du contrat {numero_contrat}")
-                start_time = time.time()
-
-                # Vérification si le contrat a déjà été traité
-                with self.lock:
-                    if numero_contrat in processed_contracts:
-                        self.logger.info(f"Le contrat {numero_contrat} a déjà été traité.")
-                        return (numero_contrat, "Déjà traité", 0)
-
-                # 1. Connexion
-                self.logger.info(f"Tentative de connexion pour le contrat {numero_contrat}")
-                self.login(driver, WebDriverWait(driver, 20), identifiant, mot_de_passe)
-
-                # 2. Soumettre le numéro de contrat
-                self.logger.info(f"Soumission du numéro de contrat {numero_contrat}")
-                self.submit_contract_number(driver, WebDriverWait(driver, 20), numero_contrat)
-
-                # 3. Extraction des détails du contrat
-                self.logger.info(f"Extraction des détails pour le contrat {numero_contrat}")
-                self.switch_to_iframe(driver, WebDriverWait(driver, 20), numero_contrat)
-                self.extract_details_num(driver, WebDriverWait(driver, 20), numero_contrat)
-
-                # 4. Extraction des éléments de facturation
-                self.logger.info(f"Extraction des éléments de facturation pour le contrat {numero_contrat}")
-                self.click_facturation_button(driver, WebDriverWait(driver, 20), numero_contrat)
-                self.extract_facturation_element(driver, WebDriverWait(driver, 20), numero_contrat)
-
-                # 5. Extraction des références client
-                self.logger.info(f"Extraction des références client pour le contrat {numero_contrat}")
-                self.click_reference_client_tab(driver, WebDriverWait(driver, 20))
-                self.extract_element_reference_client(driver, WebDriverWait(driver, 20), numero_contrat)
-
-                # Sauvegarde de l'état du contrat traité
-                self.logger.info(f"Le contrat {numero_contrat} a été traité avec succès.")
-                with self.lock:
-                    processed_contracts.add(numero_contrat)
-                    self.save_processed_contracts(processed_contracts, "numeros_contrat_traites.json")
-
-                # Calcul de la durée du traitement
-                end_time = time.time()
-                duration = end_time - start_time
-                return (numero_contrat, "Mise à jour réussie", duration)
-
-            except Exception as e:
-                retry_attempts += 1
-                self.logger.error(f"Erreur pour le contrat {numero_contrat} : {e}")
-                if retry_attempts >= retry_count:
-                    self.save_non_modifiable(numero_contrat)
-                    return (numero_contrat, "Échec après plusieurs tentatives", 0)
-            finally:
-                self.pool.return_driver(driver)  # Retourne le WebDriver au pool
+        with self.timings.contrat(numero_contrat, "extraction") as suivi:
+            retry_attempts = 0
+            while retry_attempts < retry_count:
+                driver = None
+                try:
+                    with etape("get_driver"):
+                        driver = self.pool.get_driver(self.url)
+                    suivi.associer_driver(driver)
+                    self.logger.info(f"Début du traitement du contrat {numero_contrat}")
+                    start_time = time.time()
+
+                    # Vérification si le contrat a déjà été traité
+                    with self.lock:
+                        if numero_contrat in processed_contracts:
+                            self.logger.info(f"Le contrat {numero_contrat} a déjà été traité.")
+                            return (numero_contrat, "Déjà traité", 0)
+
+                    # 1. Session partagée : connexion uniquement si la page de connexion est affichée
+                    with etape("session"):
+                        self.obtenir_session(identifiant, mot_de_passe).assurer_session(driver)
+
+                    # 2. Soumettre le numéro de contrat
+                    self.logger.info(f"Soumission du numéro de contrat {numero_contrat}")
+                    self.submit_contract_number(driver, WebDriverWait(driver, 20), numero_contrat)
+
+                    # 3. Extraction des détails du contrat
+                    self.logger.info(f"Extraction des détails pour le contrat {numero_contrat}")
+                    self.switch_to_iframe(driver, WebDriverWait(driver, 20), numero_contrat)
+                    self.extract_details_num(driver, WebDriverWait(driver, 20), numero_contrat)
+
+                    # 4. Extraction des éléments de facturation
+                    self.logger.info(f"Extraction des éléments de facturation pour le contrat {numero_contrat}")
+                    self.click_facturation_button(driver, WebDriverWait(driver, 20), numero_contrat)
+                    self.extract_facturation_element(driver, WebDriverWait(driver, 20), numero_contrat)
+
+                    # 5. Extraction des références client
+                    self.logger.info(f"Extraction des références client pour le contrat {numero_contrat}")
+                    self.click_reference_client_tab(driver, WebDriverWait(driver, 20))
+                    self.extract_element_reference_client(driver, WebDriverWait(driver, 20), numero_contrat)
+
+                    # Écriture en base de la ligne complète du contrat
+                    with etape("sauvegarde"):
+                        self.write_contract_row(numero_contrat)
+
+                    # Sauvegarde de l'état du contrat traité
+                    self.logger.info(f"Le contrat {numero_contrat} a été traité avec succès.")
+                    with self.lock:
+                        processed_contracts.add(numero_contrat)
+                        self.save_processed_contracts(processed_contracts, self.processed_path)
+
+                    # Calcul de la durée du traitement
+                    end_time = time.time()
+                    duration = end_time - start_time
+                    return (numero_contrat, "Mise à jour réussie", duration)
+
+                except Exception as e:
+                    retry_attempts += 1
+                    self.logger.error(f"Erreur pour le contrat {numero_contrat} : {e}")
+                    if retry_attempts >= retry_count:
+                        self.save_non_modifiable(numero_contrat)
+                        # Conserver en base les informations partielles déjà extraites
+                        self.write_contract_row(numero_contrat)
+                        return (numero_contrat, "Échec après plusieurs tentatives", 0)
+                finally:
+                    self.pool.return_driver(driver)  # Retourne le WebDriver au pool
 
 
     def worker(self, queue, progress_callback, total_contracts, identifiant, mot_de_passe):
-        processed_contracts = self.load_processed_contracts("numeros_contrat_traites.json")
+        processed_contracts = self.load_processed_contracts(self.processed_path)
         results = []
         processed_count = 0
 
@@ -592,33 +657,43 @@ class ExtractionRPA:
         return all_results
 
     
-    def process_contract_in_parallel(self, contract_numbers, identifiant, mot_de_passe, max_workers=5):
+    def process_contract_in_parallel(self, contract_numbers, identifiant, mot_de_passe, max_workers=5, progress_callback=None):
         """
         Fonction pour traiter plusieurs contrats en parallèle en utilisant ThreadPoolExecutor.
         :param contract_numbers: Dictionnaire des numéros de contrat à traiter.
         :param identifiant: Identifiant pour se connecter à la plateforme.
         :param mot_de_passe: Mot de passe pour se connecter à la plateforme.
         :param max_workers: Nombre maximum de threads (WebDrivers) à utiliser en parallèle.
+        :param progress_callback: Fonction appelée après chaque contrat (voir progress.Progression).
         """
         # Liste pour stocker les résultats des contrats traités
         all_results = []
+        total_contracts = len(contract_numbers)
+        termines = 0
+        if progress_callback:
+            progress_callback(0, total=total_contracts)
 
         # Pool de threads pour traiter les contrats en parallèle
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
-                executor.submit(self.process_contract, numero_contrat, identifiant, mot_de_passe, self.load_processed_contracts("numeros_contrat_traites.json")): numero_contrat
+                executor.submit(self.process_contract, numero_contrat, identifiant, mot_de_passe, self.load_processed_contracts(self.processed_path)): numero_contrat
                 for numero_contrat in contract_numbers.values()  # Utilisez les valeurs réelles des numéros de contrat
             }
 
             # Traiter les contrats au fur et à mesure que les threads terminent
             for future in as_completed(futures):
                 numero_contrat = futures[future]
+                succes = False
                 try:
                     result = future.result()  # Obtenir le résultat du thread terminé
                     self.logger.info(f"Contrat {numero_contrat} traité avec succès : {result}")
                     all_results.append(result)
+                    succes = bool(result) and result[1] != "Échec après plusieurs tentatives"
                 except Exception as exc:
                     self.logger.error(f"Erreur lors du traitement du contrat {numero_contrat}: {exc}")
+                termines += 1
+                if progress_callback:
+                    progress_callback((termines / total_contracts) * 100, total=total_contracts, succes=succes)
 
         # Retourner tous les résultats des contrats traités
         return all_results
@@ -638,17 +713,19 @@ class ExtractionRPA:
             self.logger.info(f"Résultats enregistrés dans {csv_file_path}")
 
 
-    def main(self, excel_path=None, progress_callback=None):
+    def main(self, excel_path=None, progress_callback=None, max_workers=5):
         """
         Méthode principale pour le traitement du RPA Extraction avec multi-traitement.
+        :param progress_callback: Fonction appelée après chaque contrat (voir progress.Progression).
+        :param max_workers: Nombre de contrats traités en parallèle.
         """
         self.logger.info("Démarrage du script d'extraction...")
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
+        config = get_config()
 
         # Utiliser un chemin par défaut si aucun chemin n'est spécifié
         if excel_path is None:
-            excel_path = os.path.join(base_dir, '../data_traitement', 'Affranchigo_Demat_helene.xlsx')
+            excel_path = config.data_path('Affranchigo_Demat_helene.xlsx')
 
         if not os.path.exists(excel_path):
             self.logger.error(f"Le fichier Excel spécifié est introuvable : {excel_path}")
@@ -658,8 +735,7 @@ class ExtractionRPA:
         self.init_db()
 
         # Chemin pour enregistrer le fichier JSON
-        json_dir = os.path.join(base_dir, '../data_traitement')
-        json_path = os.path.join(json_dir, 'numeros_contrat_extraction_cf.json')
+        json_path = config.state_path('numeros_contrat_extraction_cf.json')
 
         # Extraire les numéros de contrat à partir du fichier Excel et les sauvegarder dans un fichier JSON
         self.logger.info(f"Extraction des numéros de contrat depuis {excel_path}")
@@ -676,10 +752,15 @@ class ExtractionRPA:
         mot_de_passe = os.getenv("MOT_DE_PASSE")
 
         # Multi-traitement des contrats en parallèle
-        results = self.process_contract_in_parallel(contract_numbers, identifiant, mot_de_passe, max_workers=5)
+        try:
+            results = self.process_contract_in_parallel(contract_numbers, identifiant, mot_de_passe, max_workers=max_workers,
+                                                        progress_callback=progress_callback)
+        finally:
+            self.close_db()
 
         # Sauvegarder les résultats dans un fichier CSV
-        self.save_results_to_csv(results, "results.csv")
+        self.save_results_to_csv(results, config.state_path("results.csv"))
+        statistiques_attente.journaliser(self.logger)
 
         # Fermer tous les WebDrivers du pool
         self.pool.close_all()
@@ -690,9 +771,8 @@ class ExtractionRPA:
         """
         Démarre le RPA avec un fichier Excel par défaut ou personnalisé.
         """
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         if excel_path is None:
-            excel_path = os.path.join(base_dir, 'data_traitement', 'Affranchigo_Demat_helene.xlsx')
+            excel_path = get_config().data_path('Affranchigo_Demat_helene.xlsx')
 
         self.logger.info(f"Lancement du RPA Extraction avec le fichier {excel_path}")
         self.STOP_FLAG = False
@@ -6,6 +6,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
 import pandas as pd
 from rpa_modules import setup_logger
+from rpa_modules.config import get_config
 
 class FrequenceoCase:
     def __init__(self, driver, pool, logger=None):
@@ -53,14 +54,14 @@ class FrequenceoCase:
 
                 WebDriverWait(driver, 10).until(
                     EC.url_changes(
-                        "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/configurateur/put-contract"
+                        get_config().put_contract_url
                     )
                 )
                 self.logger.info("Formulaire soumis avec succes.")
             
                 try:
                     # Retour à l'URL de depart
-                    url_de_depart = "https://www.deviscontrat.net-courrier.extra.laposte.fr/appli/ihm/index/acces-dc"
+                    url_de_depart = get_config().index_url
                     driver.get(url_de_depart)
                     self.logger.info("Retour à l'URL de depart reussi.")
                 except Exception as e:
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import threading
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+
+# Statuts enregistrés dans le journal des contrats
+STATUT_TRAITE = "traite"
+STATUT_NON_MODIFIABLE = "non_modifiable"
+STATUT_MULTISITES = "multisites"
+STATUT_RE_TRAITEMENT_LIB = "re_traitement_lib"
+STATUT_RE_TRAITEMENT_FORFAIT = "re_traitement_forfait"
+# Factures Seres : numéros de facture, distincts des numéros de contrat
+STATUT_SERES_VALIDE = "seres_valide"
+STATUT_SERES_ECHEC = "seres_echec"
+
+# Anciens fichiers JSON remplacés par le journal, importés une seule fois à sa création
+FICHIERS_HISTORIQUES = {
+    "numeros_contrat_traites.json": STATUT_TRAITE,
+    "problèmes_contrats_2.json": STATUT_NON_MODIFIABLE,
+    "annexe_multisites.json": STATUT_MULTISITES,
+    "re_traitement_lib.json": STATUT_RE_TRAITEMENT_LIB,
+    "re_traitement_forfait.json": STATUT_RE_TRAITEMENT_FORFAIT,
+}
+
+DEFAULT_JOURNAL_PATH = "journal_contrats.jsonl"
+
+_journaux = {}
+_journaux_lock = threading.Lock()
+
+
+class ContractJournal:
+    def __init__(self, file_path=DEFAULT_JOURNAL_PATH, fsync=True, logger=None):
+        """
+        Journal des résultats de contrats en ajout seul (une ligne JSON par événement).
+
+        Chaque écriture coûte O(1) : une ligne est ajoutée en fin de fichier, sans relire ni
+        réécrire le fichier. L'état de l'exécution est reconstruit en mémoire au démarrage.
+        :param file_path: Chemin du fichier JSONL.
+        :param fsync: Force l'écriture sur disque après chaque ligne (résistance aux coupures).
+        :param logger: Logger pour les logs.
+        """
+        self.file_path = file_path
+        self.fsync = fsync
+        self.logger = logger or setup_logger('journal_contrats.log')
+        self.lock = threading.Lock()
+        self._statuts = {}
+        self._dernier_statut = {}
+
+        nouveau = not os.path.exists(file_path)
+        self._charger()
+        self._file = open(file_path, "a", encoding="utf-8")
+        if not nouveau and not self._termine_par_saut_de_ligne():
+            # Ligne tronquée par un arrêt brutal : la prochaine entrée ne doit pas s'y coller
+            self._file.write("\n")
+            self._file.flush()
+        if nouveau:
+            self._importer_fichiers_historiques()
+
+    def _charger(self):
+        """
+        Reconstruit l'état en mémoire à partir du journal. Une dernière ligne tronquée par un
+        arrêt brutal est ignorée.
+        """
+        if not os.path.exists(self.file_path):
+            return
+        lignes_invalides = 0
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            for ligne in file:
+                ligne = ligne.strip()
+                if not ligne:
+                    continue
+                try:
+                    entree = json.loads(ligne)
+                    self._appliquer(entree["contrat"], entree["statut"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    lignes_invalides += 1
+        if lignes_invalides:
+            self.logger.warning(f"{lignes_invalides} ligne(s) invalide(s) ignorée(s) dans {self.file_path}.")
+        self.logger.debug(f"Journal {self.file_path} chargé : {len(self._dernier_statut)} contrats connus.")
+
+    def _termine_par_saut_de_ligne(self):
+        with open(self.file_path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() == 0:
+                return True
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def _dossiers_historiques(self):
+        """
+        Dossiers où les anciens RPA écrivaient leurs fichiers JSON : à côté du journal, puis dans
+        les dossiers d'état et de données de la configuration.
+        """
+        config = get_config()
+        dossiers = []
+        for dossier in (os.path.dirname(os.path.abspath(self.file_path)), config.state_dir, config.data_dir):
+            dossier = os.path.abspath(dossier)
+            if dossier not in dossiers:
+                dossiers.append(dossier)
+        return dossiers
+
+    def _importer_fichiers_historiques(self):
+        """
+        Importe les anciens fichiers JSON de suivi pour ne pas perdre l'historique lors de la bascule.
+        """
+        dossiers = self._dossiers_historiques()
+        importes = 0
+        for nom, statut in FICHIERS_HISTORIQUES.items():
+            file_path = next((os.path.join(dossier, nom) for dossier in dossiers if os.path.exists(os.path.join(dossier, nom))), None)
+            if file_path is None:
+                continue
+            importes += 1
+            try:
+                with open(file_path, "r") as file:
+                    contrats = json.load(file)
+            except (json.JSONDecodeError, OSError) as e:
+                self.logger.error(f"Impossible d'importer {file_path} dans le journal : {e}")
+                continue
+            for numero_contrat in contrats:
+                self.record(numero_contrat, statut, source=file_path)
+            self.logger.info(f"{len(contrats)} contrat(s) importé(s) depuis {file_path} ({statut}).")
+        if not importes:
+            self.logger.info(f"Aucun ancien fichier de suivi à importer dans {', '.join(dossiers)}.")
+
+    def _appliquer(self, numero_contrat, statut):
+        self._statuts.setdefault(statut, set()).add(numero_contrat)
+        self._dernier_statut[numero_contrat] = statut
+
+    def record(self, numero_contrat, statut, **details):
+        """
+        Ajoute un événement au journal.
+        :param numero_contrat: Numéro du contrat concerné.
+        :param statut: Statut du contrat (voir les constantes STATUT_*).
+        :param details: Informations complémentaires sérialisées avec l'événement.
+        :return: True si le contrat n'avait pas encore ce statut, False sinon.
+        """
+        entree = {"ts": time.time(), "contrat": numero_contrat, "statut": statut}
+        if details:
+            entree.update(details)
+        ligne = json.dumps(entree, ensure_ascii=False, default=str) + "\n"
+
+        with self.lock:
+            nouveau = numero_contrat not in self._statuts.get(statut, ())
+            self._file.write(ligne)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._appliquer(numero_contrat, statut)
+        return nouveau
+
+    def contains(self, numero_contrat, statut):
+        with self.lock:
+            return numero_contrat in self._statuts.get(statut, ())
+
+    def contracts(self, statut):
+        """
+        Retourne une copie de l'ensemble des contrats ayant reçu le statut donné.
+        """
+        with self.lock:
+            return set(self._statuts.get(statut, ()))
+
+    def last_status(self, numero_contrat):
+        with self.lock:
+            return self._dernier_statut.get(numero_contrat)
+
+    def close(self):
+        with self.lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class LecteurJournal:
+    def __init__(self, file_path=None, filtre=None, depuis_la_fin=True):
+        """
+        Lecture incrémentale du journal pour un suivi en direct : chaque appel à actualiser() ne lit
+        que les lignes ajoutées depuis le précédent.
+
+        Seule la position de chaque événement retenu est gardée en mémoire ; page() relit les
+        lignes demandées dans le fichier.
+        :param file_path: Chemin du journal (par défaut, dans le dossier d'état de la configuration).
+        :param filtre: Fonction (événement -> bool) des événements retenus, ou None pour tous.
+        :param depuis_la_fin: Ignore les événements déjà présents (suivi de l'exécution en cours).
+        """
+        self.file_path = file_path or get_config().state_path(DEFAULT_JOURNAL_PATH)
+        self.filtre = filtre
+        self.lock = threading.Lock()
+        self._positions = []
+        self._position = os.path.getsize(self.file_path) if depuis_la_fin and os.path.exists(self.file_path) else 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self._positions)
+
+    def actualiser(self):
+        """
+        Lit les événements ajoutés depuis le dernier appel. Une ligne en cours d'écriture sera lue au suivant.
+        :return: Liste des nouveaux événements retenus.
+        """
+        with self.lock:
+            if not os.path.exists(self.file_path):
+                return []
+            with open(self.file_path, "rb") as file:
+                file.seek(self._position)
+                donnees = file.read()
+            donnees = donnees[:donnees.rfind(b"\n") + 1]
+
+            nouveaux = []
+            position = self._position
+            for ligne in donnees.splitlines(keepends=True):
+                try:
+                    entree = json.loads(ligne)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    entree = None
+                if isinstance(entree, dict) and (self.filtre is None or self.filtre(entree)):
+                    self._positions.append(position)
+                    nouveaux.append(entree)
+                position += len(ligne)
+            self._position = position
+            return nouveaux
+
+    def page(self, numero, taille):
+        """
+        Événements d'une page, les plus récents en premier.
+        :param numero: Numéro de page (0 : événements les plus récents).
+        :param taille: Nombre d'événements par page.
+        """
+        with self.lock:
+            fin = len(self._positions) - numero * taille
+            positions = self._positions[max(0, fin - taille):max(0, fin)]
+        if not positions:
+            return []
+        evenements = []
+        with open(self.file_path, "rb") as file:
+            for position in reversed(positions):
+                file.seek(position)
+                evenements.append(json.loads(file.readline()))
+        return evenements
+
+
+def open_journal(file_path=None, logger=None):
+    """
+    Retourne l'instance partagée du journal pour un chemin donné, afin que tous les threads et
+    toutes les classes de cas écrivent dans le même fichier via le même verrou.
+    :param file_path: Chemin du journal (par défaut, dans le dossier d'état de la configuration).
+    """
+    file_path = file_path or get_config().state_path(DEFAULT_JOURNAL_PATH)
+    cle = os.path.abspath(file_path)
+    with _journaux_lock:
+        journal = _journaux.get(cle)
+        if journal is None:
+            journal = ContractJournal(file_path, logger=logger)
+            _journaux[cle] = journal
+        return journal
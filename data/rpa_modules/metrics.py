@@ -0,0 +1,221 @@
+import os
+import threading
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+
+# Fichier d'export des métriques, lu par le backend (surchargé par RPA_METRICS_FILE pour chaque job)
+DEFAULT_METRICS_PATH = "metrics.prom"
+INTERVALLE_EXPORT = 5
+# Seuils (secondes) de l'histogramme des durées d'étapes : d'un clic à un contrat complet
+SEUILS_DUREE = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def formater_etiquettes(noms, valeurs, supplementaires=()):
+    paires = list(zip(noms, valeurs)) + list(supplementaires)
+    if not paires:
+        return ""
+    return "{" + ",".join(f'{nom}="{echapper(valeur)}"' for nom, valeur in paires) + "}"
+
+
+def formater_valeur(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Metrique:
+    type = None
+
+    def __init__(self, nom, aide, etiquettes=()):
+        """
+        Métrique nommée, avec une série par combinaison de valeurs d'étiquettes.
+        :param nom: Nom au format Prometheus (rpa_...).
+        :param aide: Description affichée dans la ligne HELP.
+        :param etiquettes: Noms des étiquettes, dans l'ordre.
+        """
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def _cle(self, valeurs):
+        inconnues = set(valeurs) - set(self.etiquettes)
+        if inconnues:
+            raise ValueError(f"Étiquettes inconnues pour {self.nom} : {', '.join(sorted(inconnues))}")
+        return tuple(str(valeurs.get(nom, "")) for nom in self.etiquettes)
+
+    def echantillons(self):
+        with self.lock:
+            return [(cle, valeur) for cle, valeur in self.series.items()]
+
+    def exposition(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.type}"]
+        for cle, valeur in self.echantillons():
+            lignes.append(f"{self.nom}{formater_etiquettes(self.etiquettes, cle)} {formater_valeur(valeur)}")
+        return lignes
+
+
+class Compteur(Metrique):
+    type = "counter"
+
+    def inc(self, valeur=1, **etiquettes):
+        cle = self._cle(etiquettes)
+        with self.lock:
+            self.series[cle] = self.series.get(cle, 0) + valeur
+
+
+class Jauge(Metrique):
+    type = "gauge"
+
+    def __init__(self, nom, aide, etiquettes=()):
+        super().__init__(nom, aide, etiquettes)
+        self._fonction = None
+
+    def definir(self, valeur, **etiquettes):
+        cle = self._cle(etiquettes)
+        with self.lock:
+            self.series[cle] = valeur
+
+    def suivre(self, fonction):
+        """
+        Valeur lue à chaque export (jauge sans étiquettes) : l'objet suivi n'a rien à mettre à jour.
+        """
+        self._fonction = fonction
+
+    def echantillons(self):
+        if self._fonction is not None:
+            try:
+                return [((), self._fonction())]
+            except Exception:
+                return []
+        return super().echantillons()
+
+
+class Histogramme(Metrique):
+    type = "histogram"
+
+    def __init__(self, nom, aide, etiquettes=(), seuils=SEUILS_DUREE):
+        super().__init__(nom, aide, etiquettes)
+        self.seuils = tuple(sorted(seuils))
+
+    def observer(self, valeur, **etiquettes):
+        cle = self._cle(etiquettes)
+        with self.lock:
+            serie = self.series.get(cle)
+            if serie is None:
+                serie = self.series[cle] = {"buckets": [0] * len(self.seuils), "somme": 0.0, "nombre": 0}
+            for index, seuil in enumerate(self.seuils):
+                if valeur <= seuil:
+                    serie["buckets"][index] += 1
+                    break
+            serie["somme"] += valeur
+            serie["nombre"] += 1
+
+    def exposition(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.type}"]
+        with self.lock:
+            series = [(cle, dict(serie, buckets=list(serie["buckets"]))) for cle, serie in self.series.items()]
+        for cle, serie in series:
+            cumul = 0
+            for seuil, nombre in zip(self.seuils, serie["buckets"]):
+                cumul += nombre
+                etiquettes = formater_etiquettes(self.etiquettes, cle, [("le", formater_valeur(float(seuil)))])
+                lignes.append(f"{self.nom}_bucket{etiquettes} {cumul}")
+            etiquettes = formater_etiquettes(self.etiquettes, cle, [("le", "+Inf")])
+            lignes.append(f"{self.nom}_bucket{etiquettes} {serie['nombre']}")
+            etiquettes = formater_etiquettes(self.etiquettes, cle)
+            lignes.append(f"{self.nom}_sum{etiquettes} {formater_valeur(serie['somme'])}")
+            lignes.append(f"{self.nom}_count{etiquettes} {serie['nombre']}")
+        return lignes
+
+
+class Registre:
+    def __init__(self):
+        """
+        Registre des métriques du processus, exporté au format texte de Prometheus dans un fichier
+        que le backend sert sur /metrics.
+        """
+        self.lock = threading.Lock()
+        self.metriques = {}
+        self._arret = threading.Event()
+        self._export = None
+
+    def _enregistrer(self, classe, nom, *arguments, **options):
+        with self.lock:
+            metrique = self.metriques.get(nom)
+            if metrique is None:
+                metrique = self.metriques[nom] = classe(nom, *arguments, **options)
+            elif not isinstance(metrique, classe):
+                raise ValueError(f"Métrique {nom} déjà enregistrée avec le type {metrique.type}")
+            return metrique
+
+    def compteur(self, nom, aide, etiquettes=()):
+        return self._enregistrer(Compteur, nom, aide, etiquettes)
+
+    def jauge(self, nom, aide, etiquettes=()):
+        return self._enregistrer(Jauge, nom, aide, etiquettes)
+
+    def histogramme(self, nom, aide, etiquettes=(), seuils=SEUILS_DUREE):
+        return self._enregistrer(Histogramme, nom, aide, etiquettes, seuils=seuils)
+
+    def exposition(self):
+        with self.lock:
+            metriques = list(self.metriques.values())
+        return "".join(ligne + "\n" for metrique in metriques for ligne in metrique.exposition())
+
+    def ecrire(self, chemin=None):
+        """
+        Écrit l'exposition via un fichier temporaire puis os.replace (jamais de fichier partiel).
+        """
+        chemin = chemin or os.getenv("RPA_METRICS_FILE") or get_config().state_path(DEFAULT_METRICS_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as file:
+            file.write(self.exposition())
+        os.replace(temporaire, chemin)
+
+    def demarrer_export(self, chemin=None, intervalle=INTERVALLE_EXPORT, logger=None):
+        """
+        Écrit les métriques toutes les `intervalle` secondes jusqu'à arreter_export().
+        """
+        logger = logger or setup_logger('metrics.log')
+
+        def exporter():
+            while not self._arret.wait(intervalle):
+                try:
+                    self.ecrire(chemin)
+                except OSError as e:
+                    logger.warning(f"Impossible d'écrire les métriques : {e}")
+
+        self._arret.clear()
+        self._export = threading.Thread(target=exporter, name="metriques-export", daemon=True)
+        self._export.start()
+
+    def arreter_export(self, chemin=None):
+        """
+        Arrête l'export périodique et écrit les valeurs finales.
+        """
+        self._arret.set()
+        if self._export is not None:
+            self._export.join()
+            self._export = None
+        self.ecrire(chemin)
+
+
+# Registre partagé par le pool de WebDrivers et tous les RPA du processus
+registre = Registre()
+
+pool_taille = registre.jauge("rpa_pool_taille", "Nombre de WebDrivers du pool, en cours de démarrage compris.")
+pool_libres = registre.jauge("rpa_pool_drivers_libres", "Nombre de WebDrivers libres dans le pool.")
+pool_occupes = registre.jauge("rpa_pool_drivers_occupes", "Nombre de WebDrivers utilisés ou en cours de démarrage.")
+pool_creations = registre.compteur("rpa_pool_drivers_crees_total", "WebDrivers créés avec succès.")
+pool_echecs_creation = registre.compteur("rpa_pool_echecs_creation_total", "Échecs de création de WebDriver.")
+pool_retraits = registre.compteur("rpa_pool_drivers_retires_total", "WebDrivers fermés par le pool, par motif.", ["motif"])
+contrats = registre.compteur("rpa_contrats_total", "Contrats terminés, par RPA, résultat et type.", ["rpa", "resultat", "type_contrat"])
+durees_etapes = registre.histogramme("rpa_etape_duree_secondes", "Durée des étapes de traitement des contrats.", ["rpa", "etape"])
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+from rpa_modules.metrics import contrats
+
+# Fichier d'état de la progression, lu par le backend (surchargé par RPA_PROGRESS_FILE pour chaque job)
+DEFAULT_PROGRESS_PATH = "progression.json"
+# Écriture au plus une fois par intervalle : le coût ne dépend pas du nombre de contrats
+INTERVALLE_ECRITURE = 1.0
+# Fenêtre glissante du débit courant, pour voir une baisse sans attendre la moyenne de l'exécution
+FENETRE_DEBIT = 300
+
+EN_COURS = "en_cours"
+TERMINE = "termine"
+ECHEC = "echec"
+
+
+def ecrire_atomique(chemin, donnees):
+    """
+    Écrit un fichier JSON via un fichier temporaire puis os.replace : un lecteur voit toujours
+    l'ancienne ou la nouvelle version complète, jamais un fichier à moitié écrit.
+    """
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    os.makedirs(dossier, exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as file:
+        json.dump(donnees, file, ensure_ascii=False)
+    os.replace(temporaire, chemin)
+
+
+def lire_progression(chemin):
+    """
+    Lit un fichier de progression.
+    :return: Dictionnaire, ou None si le fichier est absent ou illisible.
+    """
+    try:
+        with open(chemin, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def estimer(traites, total, debut, recents, maintenant):
+    """
+    Débit (contrats/min) sur la fenêtre glissante, à défaut sur toute l'exécution, et ETA en secondes.
+    :param recents: Horodatages des contrats terminés dans la fenêtre.
+    """
+    if len(recents) >= 2 and recents[-1] > recents[0]:
+        debit = (len(recents) - 1) / (recents[-1] - recents[0]) * 60
+    elif traites and maintenant > debut:
+        debit = traites / (maintenant - debut) * 60
+    else:
+        debit = 0.0
+    restants = None if total is None else max(0, total - traites)
+    eta = round(restants / debit * 60) if restants is not None and debit > 0 else None
+    return round(debit, 2), restants, eta
+
+
+class Progression:
+    def __init__(self, rpa, file_path=None, intervalle=INTERVALLE_ECRITURE, logger=None):
+        """
+        Canal de progression d'un RPA vers le backend : un fichier JSON réécrit de façon atomique
+        (contrats terminés, en échec, restants, débit, ETA, répartition par type).
+
+        L'instance s'utilise comme progress_callback des RPA :
+        progress_callback(pourcentage, total=..., succes=..., type_contrat=...). Un appel avec
+        `succes` compte un contrat terminé ; un appel avec seulement `total` annonce le volume.
+        :param rpa: Nom du RPA.
+        :param file_path: Fichier d'état (par défaut, RPA_PROGRESS_FILE ou progression.json dans le dossier d'état).
+        :param intervalle: Délai minimal entre deux écritures, en secondes.
+        :param logger: Logger pour les logs.
+        """
+        self.rpa = rpa
+        self.file_path = file_path or os.getenv("RPA_PROGRESS_FILE") or get_config().state_path(DEFAULT_PROGRESS_PATH)
+        self.intervalle = intervalle
+        self.logger = logger or setup_logger('progression.log')
+        self.lock = threading.Lock()
+        self.debut = time.time()
+        self.total = None
+        self.traites = 0
+        self.echecs = 0
+        self.par_type = {}
+        self.etat = EN_COURS
+        self._recents = deque()
+        self._derniere_ecriture = 0.0
+        self._ecriture_lock = threading.Lock()
+
+    def __call__(self, pourcentage=None, total=None, succes=None, type_contrat=None):
+        with self.lock:
+            if total is not None:
+                self.total = total
+            if succes is not None:
+                maintenant = time.time()
+                self.traites += 1
+                if not succes:
+                    self.echecs += 1
+                type_contrat = type_contrat or "inconnu"
+                self.par_type[type_contrat] = self.par_type.get(type_contrat, 0) + 1
+                contrats.inc(rpa=self.rpa, resultat="succes" if succes else "echec", type_contrat=type_contrat)
+                self._recents.append(maintenant)
+                while self._recents and self._recents[0] < maintenant - FENETRE_DEBIT:
+                    self._recents.popleft()
+        self.ecrire(force=succes is None)
+
+    def instantane(self):
+        with self.lock:
+            maintenant = time.time()
+            debit, restants, eta = estimer(self.traites, self.total, self.debut, self._recents, maintenant)
+            return {
+                "rpa": self.rpa,
+                "pid": os.getpid(),
+                "etat": self.etat,
+                "debut": self.debut,
+                "maj": maintenant,
+                "total": self.total,
+                "traites": self.traites,
+                "echecs": self.echecs,
+                "restants": restants,
+                "contrats_par_minute": debit,
+                "eta_secondes": eta,
+                "par_type": dict(self.par_type),
+            }
+
+    def ecrire(self, force=False):
+        # Un seul écrivain à la fois : les threads de traitement partagent le fichier temporaire
+        with self._ecriture_lock:
+            maintenant = time.monotonic()
+            if not force and maintenant - self._derniere_ecriture < self.intervalle:
+                return
+            self._derniere_ecriture = maintenant
+            try:
+                ecrire_atomique(self.file_path, self.instantane())
+            except OSError as e:
+                self.logger.warning(f"Impossible d'écrire la progression dans {self.file_path} : {e}")
+
+    def terminer(self, etat=TERMINE):
+        """
+        Écrit l'état final, quel que soit le délai depuis la dernière écriture.
+        """
+        with self.lock:
+            self.etat = etat
+        self.ecrire(force=True)
+
+
+def fusionner_progressions(progressions, rpa):
+    """
+    Agrège les progressions de plusieurs processus (shards) en une seule.
+    :param progressions: Dictionnaires lus par lire_progression (None ignorés).
+    """
+    progressions = [progression for progression in progressions if progression]
+    maintenant = time.time()
+    if not progressions or any(p["etat"] == EN_COURS for p in progressions):
+        etat = EN_COURS
+    else:
+        # Un seul shard en échec suffit : l'exécution répartie n'est pas complète
+        etat = ECHEC if any(p["etat"] == ECHEC for p in progressions) else TERMINE
+    fusion = {
+        "rpa": rpa,
+        "pid": os.getpid(),
+        "etat": etat,
+        "debut": min((p["debut"] for p in progressions), default=maintenant),
+        "maj": maintenant,
+        "total": None,
+        "traites": sum(p["traites"] for p in progressions),
+        "echecs": sum(p["echecs"] for p in progressions),
+        "restants": None,
+        "contrats_par_minute": round(sum(p["contrats_par_minute"] for p in progressions), 2),
+        "eta_secondes": None,
+        "par_type": {},
+        "shards": len(progressions),
+    }
+    for progression in progressions:
+        for type_contrat, nombre in progression["par_type"].items():
+            fusion["par_type"][type_contrat] = fusion["par_type"].get(type_contrat, 0) + nombre
+    if progressions and all(p["total"] is not None for p in progressions):
+        fusion["total"] = sum(p["total"] for p in progressions)
+        fusion["restants"] = max(0, fusion["total"] - fusion["traites"])
+        # Les shards avancent en parallèle : la fin est celle du plus lent
+        etas = [p["eta_secondes"] for p in progressions if p["restants"]]
+        if not etas:
+            fusion["eta_secondes"] = 0
+        elif None not in etas:
+            fusion["eta_secondes"] = max(etas)
+    return fusion
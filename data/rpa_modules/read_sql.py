@@ -1,12 +1,16 @@
 import sqlite3
 import os
 
+from rpa_modules.config import get_config
+
 # Fonction pour lire la table 'infos_extraites'
-def read_db_table(db_path="C:/Users/PHSX095/OneDrive - LA POSTE GROUPE/Documents/GUI/data/data_traitement/data_extraction.db"):
+def read_db_table(db_path=None):
     """
     Lit toutes les lignes de la table 'infos_extraites' dans la base de données SQLite.
     Retourne les résultats sous forme de liste de dictionnaires.
+    :param db_path: Chemin de la base (par défaut, db_path de la configuration).
     """
+    db_path = db_path or get_config().db_path
     try:
         # Vérifier si la base de données existe
         if not os.path.exists(db_path):
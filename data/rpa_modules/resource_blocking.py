@@ -0,0 +1,185 @@
+import json
+import threading
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.timings import suivi_courant
+
+# Motifs (jokers CDP) des ressources inutiles aux robots
+MOTIFS_IMAGES = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp", "*.bmp"]
+MOTIFS_POLICES = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+# Les feuilles de style ne sont bloquées que sur demande : la visibilité des éléments en dépend
+MOTIFS_CSS = ["*.css"]
+DOMAINES_TIERS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+    "*hotjar.com*",
+]
+
+# Taille moyenne supposée d'une ressource bloquée, tant qu'aucune ressource chargée du même type n'a été mesurée
+TAILLES_ESTIMEES = {"Image": 20000, "Font": 40000, "Stylesheet": 25000}
+TAILLE_ESTIMEE_DEFAUT = 10000
+
+
+class StatistiquesBlocage:
+    def __init__(self):
+        """
+        Agrège les requêtes chargées et bloquées sur l'ensemble des navigateurs du processus.
+        """
+        self.lock = threading.Lock()
+        self.totaux = {"requetes": 0, "requetes_bloquees": 0, "octets_recus": 0, "octets_economises_estimes": 0}
+        # Taille moyenne observée par type de ressource chargée : {type: [octets, nombre]}
+        self._tailles = {}
+
+    def taille_estimee(self, type_ressource):
+        with self.lock:
+            octets, nombre = self._tailles.get(type_ressource, (0, 0))
+        if nombre:
+            return octets // nombre
+        return TAILLES_ESTIMEES.get(type_ressource, TAILLE_ESTIMEE_DEFAUT)
+
+    def observer_taille(self, type_ressource, octets):
+        with self.lock:
+            total = self._tailles.setdefault(type_ressource, [0, 0])
+            total[0] += octets
+            total[1] += 1
+
+    def enregistrer(self, mesure):
+        with self.lock:
+            for cle in self.totaux:
+                self.totaux[cle] += mesure.get(cle, 0)
+
+    def journaliser(self, logger):
+        with self.lock:
+            totaux = dict(self.totaux)
+        if not totaux["requetes"]:
+            return
+        logger.info(
+            f"Ressources : {totaux['requetes']} requête(s), {totaux['requetes_bloquees']} bloquée(s), "
+            f"{totaux['octets_recus'] / 1024:.0f} Ko reçus, ~{totaux['octets_economises_estimes'] / 1024:.0f} Ko économisés"
+        )
+
+
+# Statistiques partagées par tous les navigateurs du processus
+statistiques_blocage = StatistiquesBlocage()
+
+
+class BlocageRessources:
+    def __init__(self, bloquer_images=True, bloquer_polices=True, bloquer_css=False, domaines_tiers=None,
+                 allowlist=None, statistiques=None, logger=None):
+        """
+        Profil de blocage des ressources inutiles aux robots (images, polices, domaines tiers).
+
+        Sur Edge et Chromium, le blocage passe par CDP (Network.setBlockedURLs) et les requêtes sont
+        comptées à partir du journal de performance du navigateur ; sur Firefox, seules les
+        préférences (images, polices téléchargeables) sont utilisées, sans mesure.
+        :param bloquer_images: Bloque les images.
+        :param bloquer_polices: Bloque les polices web.
+        :param bloquer_css: Bloque aussi les feuilles de style.
+        :param domaines_tiers: Motifs de domaines tiers à bloquer (par défaut, DOMAINES_TIERS).
+        :param allowlist: Motifs d'URL jamais bloqués, prioritaires sur les motifs bloqués.
+        :param statistiques: Agrégateur des mesures (partagé par défaut).
+        :param logger: Logger pour les logs.
+        """
+        self.motifs = []
+        if bloquer_images:
+            self.motifs += MOTIFS_IMAGES
+        if bloquer_polices:
+            self.motifs += MOTIFS_POLICES
+        if bloquer_css:
+            self.motifs += MOTIFS_CSS
+        self.motifs += DOMAINES_TIERS if domaines_tiers is None else list(domaines_tiers)
+        self.bloquer_images = bloquer_images
+        self.bloquer_polices = bloquer_polices
+        self.allowlist = list(allowlist or [])
+        self.statistiques = statistiques or statistiques_blocage
+        self.logger = logger or setup_logger('resource_blocking.log')
+
+    def preparer_options_chromium(self, options, capacite_logs):
+        """
+        Active le journal de performance (événements réseau uniquement) nécessaire à la mesure.
+        :param capacite_logs: "goog:loggingPrefs" (Chromium) ou "ms:loggingPrefs" (Edge).
+        """
+        options.set_capability(capacite_logs, {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+    def preparer_options_firefox(self, options):
+        if self.bloquer_images:
+            options.set_preference("permissions.default.image", 2)
+        if self.bloquer_polices:
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+
+    def appliquer(self, driver):
+        """
+        Installe le blocage CDP sur un navigateur démarré. L'allowlist est transmise en tête, avec
+        block=False ; les navigateurs antérieurs à cette forme reçoivent la liste simple des motifs,
+        privée des motifs qui recouvrent une entrée de l'allowlist.
+        """
+        if not hasattr(driver, "execute_cdp_cmd"):
+            driver.blocage_actif = False
+            return False
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            motifs = [{"urlPattern": motif, "block": False} for motif in self.allowlist]
+            motifs += [{"urlPattern": motif, "block": True} for motif in self.motifs]
+            try:
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urlPatterns": motifs})
+            except Exception:
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self._motifs_sans_allowlist()})
+            driver.blocage_actif = True
+            self.logger.debug(f"Blocage de {len(self.motifs)} motif(s) de ressources installé ({len(self.allowlist)} exception(s)).")
+        except Exception as e:
+            driver.blocage_actif = False
+            self.logger.warning(f"Blocage des ressources indisponible sur ce navigateur : {e}")
+        return driver.blocage_actif
+
+    def _motifs_sans_allowlist(self):
+        autorises = [motif.strip("*") for motif in self.allowlist]
+        return [motif for motif in self.motifs if not any(autorise and autorise in motif for autorise in autorises)]
+
+    def mesurer(self, driver):
+        """
+        Compte les requêtes chargées et bloquées depuis la dernière mesure (le journal de performance
+        est vidé à chaque lecture) et les rattache au contrat en cours.
+        :return: Dictionnaire des compteurs, ou None si le navigateur ne fournit pas de journal.
+        """
+        try:
+            entrees = driver.get_log("performance")
+        except Exception:
+            return None
+
+        types, requetes, bloquees, octets_recus, octets_economises = {}, 0, 0, 0, 0
+        for entree in entrees:
+            try:
+                message = json.loads(entree["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            methode, parametres = message.get("method"), message.get("params", {})
+            if methode == "Network.requestWillBeSent":
+                requetes += 1
+                types[parametres.get("requestId")] = parametres.get("type")
+            elif methode == "Network.loadingFinished":
+                octets = int(parametres.get("encodedDataLength", 0))
+                octets_recus += octets
+                type_ressource = types.get(parametres.get("requestId"))
+                if type_ressource:
+                    self.statistiques.observer_taille(type_ressource, octets)
+            elif methode == "Network.loadingFailed" and (
+                    parametres.get("blockedReason") or "BLOCKED_BY_CLIENT" in parametres.get("errorText", "")):
+                bloquees += 1
+                octets_economises += self.statistiques.taille_estimee(parametres.get("type"))
+
+        mesure = {
+            "requetes": requetes,
+            "requetes_bloquees": bloquees,
+            "octets_recus": octets_recus,
+            "octets_economises_estimes": octets_economises,
+        }
+        self.statistiques.enregistrer(mesure)
+        suivi = suivi_courant()
+        if suivi is not None:
+            for cle, valeur in mesure.items():
+                suivi.metriques[cle] = suivi.metriques.get(cle, 0) + valeur
+        return mesure
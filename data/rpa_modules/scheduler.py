@@ -0,0 +1,42 @@
+from concurrent.futures import wait, FIRST_COMPLETED
+
+
+def executer_en_flux(executor, elements, fonction, max_en_cours, arret_demande=None, logger=None):
+    """
+    Soumet les éléments à l'executor au fil de l'eau en gardant au plus `max_en_cours` tâches en vol.
+
+    Les éléments sont consommés paresseusement depuis l'itérable : aucun Future n'est créé pour un
+    élément tant qu'une place ne s'est pas libérée. L'arrêt coopératif est vérifié avant chaque
+    soumission ; une fois demandé, plus rien n'est soumis et les tâches en cours se terminent.
+    :param executor: ThreadPoolExecutor utilisé pour le traitement.
+    :param elements: Itérable (ou générateur) des éléments à traiter.
+    :param fonction: Fonction appelée avec chaque élément.
+    :param max_en_cours: Nombre maximum de tâches soumises et non terminées.
+    :param arret_demande: Fonction sans argument retournant True si l'arrêt est demandé.
+    :param logger: Logger pour les logs.
+    :return: Générateur de tuples (élément, future) dans l'ordre de terminaison.
+    """
+    elements = iter(elements)
+    en_cours = {}
+    epuise = False
+
+    while True:
+        while not epuise and len(en_cours) < max_en_cours:
+            if arret_demande and arret_demande():
+                if logger:
+                    logger.info(f"Arrêt demandé : plus aucune soumission, {len(en_cours)} tâche(s) en cours à terminer.")
+                epuise = True
+                break
+            try:
+                element = next(elements)
+            except StopIteration:
+                epuise = True
+                break
+            en_cours[executor.submit(fonction, element)] = element
+
+        if not en_cours:
+            return
+
+        termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+        for future in termines:
+            yield en_cours.pop(future), future
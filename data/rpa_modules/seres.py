@@ -11,12 +11,21 @@ from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support import expected_conditions as EC
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from rpa_modules.debug import setup_logger
+from rpa_modules.waits import Attente, statistiques_attente
+from rpa_modules.timings import open_timings, chronometre, etape
 from selenium.webdriver.common.action_chains import ActionChains
 from rpa_modules.data_processing import extract_contrat_numbers_to_json
-from dash import Dash, dcc, html, dash_table
+from rpa_modules.config import get_config
+from rpa_modules.journal import open_journal, LecteurJournal, STATUT_SERES_VALIDE, STATUT_SERES_ECHEC
+from dash import Dash, dcc, html, dash_table, no_update, callback_context
 from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 
+# Lignes par page du tableau de bord : seule la page affichée est envoyée au navigateur
+TAILLE_PAGE_DASHBOARD = 50
+COLONNES_DASHBOARD = ["Numéro de Contrat", "Statut", "Message", "Durée (s)"]
+
 load_dotenv()
 # Siret destinataire corrigé selon Prmedi
 class SeresRPA:
@@ -24,18 +33,20 @@ class SeresRPA:
     def __init__(self, pool, logger=None):
         self.pool = pool
         self.logger = logger or setup_logger("seres_case.log")
-        self.url = "https://portail.e-facture.net/saml/saml-login.php?nomSP=ARTIMON_PROD"
+        self.url = get_config().seres_url
         self.processed_count = 0
         self.success_count = 0
         self.failure_count = 0
         self.total_duration = 0
-        self.results = []
         self.error_logs = []
         self.lock = threading.Lock()
+        self.timings = open_timings(logger=self.logger)
+        # Résultats écrits dans le journal partagé, source du tableau de bord (plus de liste en mémoire)
+        self.journal = open_journal(logger=self.logger)
     
     def update_metrics(self, success, duration, numero_facture, message):
         """
-        Met à jour les métriques et les résultats pour le tableau de bord.
+        Met à jour les métriques et enregistre le résultat dans le journal, lu par le tableau de bord.
         """
         with self.lock:
             self.processed_count += 1
@@ -44,12 +55,8 @@ class SeresRPA:
             else:
                 self.failure_count += 1
             self.total_duration += duration
-            self.results.append({
-                "Numéro de Contrat": numero_facture,
-                "Statut": "Succès" if success else "Échec",
-                "Message": message,
-                "Durée (s)": duration
-            })
+        self.journal.record(numero_facture, STATUT_SERES_VALIDE if success else STATUT_SERES_ECHEC,
+                            rpa="seres", message=message, duree=duration)
 
 
     def log_error(self, numero_facture, message):
@@ -62,20 +69,25 @@ class SeresRPA:
     def start_dashboard(self):
         """
         Initialise un tableau de bord Dash pour le suivi en temps réel.
+
+        Chaque rafraîchissement ne lit que les événements ajoutés au journal depuis le précédent ;
+        le tableau est paginé côté serveur et le graphique n'est recalculé que si les compteurs changent.
         """
         app = Dash(__name__)
+        lecteur = LecteurJournal(self.journal.file_path, filtre=lambda entree: entree.get("rpa") == "seres")
+        verrou = threading.Lock()
+        agregats = {"succes": 0, "echecs": 0, "duree": 0.0, "affiche": None}
 
         app.layout = html.Div([
             html.H1("Tableau de bord SeresRPA"),
             dash_table.DataTable(
                 id="result-table",
-                columns=[
-                    {"name": "Numéro de Contrat", "id": "Numéro de Contrat"},
-                    {"name": "Statut", "id": "Statut"},
-                    {"name": "Message", "id": "Message"},
-                    {"name": "Durée (s)", "id": "Durée (s)"}
-                ],
+                columns=[{"name": colonne, "id": colonne} for colonne in COLONNES_DASHBOARD],
                 data=[],
+                page_action="custom",
+                page_current=0,
+                page_size=TAILLE_PAGE_DASHBOARD,
+                page_count=1,
                 style_table={"overflowX": "auto"},
                 style_cell={"textAlign": "left"},
                 style_header={"fontWeight": "bold"},
@@ -90,23 +102,52 @@ class SeresRPA:
             dcc.Interval(id="interval-component", interval=1000, n_intervals=0)
         ])
 
+        def ligne_tableau(entree):
+            return {
+                "Numéro de Contrat": entree.get("contrat"),
+                "Statut": "Succès" if entree.get("statut") == STATUT_SERES_VALIDE else "Échec",
+                "Message": entree.get("message"),
+                "Durée (s)": entree.get("duree"),
+            }
+
         @app.callback(
             [Output("result-table", "data"),
+             Output("result-table", "page_count"),
              Output("success-failure-pie", "figure"),
              Output("total-count", "children"),
              Output("average-duration", "children")],
-            [Input("interval-component", "n_intervals")]
+            [Input("interval-component", "n_intervals"),
+             Input("result-table", "page_current")]
         )
-        def update_dashboard(n):
-            total = self.processed_count
-            average_duration = self.total_duration / total if total > 0 else 0
+        def update_dashboard(n, page_current):
+            changement_page = any(declencheur["prop_id"].startswith("result-table.") for declencheur in callback_context.triggered)
+            with verrou:
+                for entree in lecteur.actualiser():
+                    if entree.get("statut") == STATUT_SERES_VALIDE:
+                        agregats["succes"] += 1
+                    else:
+                        agregats["echecs"] += 1
+                    agregats["duree"] += entree.get("duree") or 0
+                compteurs = (agregats["succes"], agregats["echecs"])
+                nouveaux = compteurs != agregats["affiche"]
+                if not nouveaux and not changement_page:
+                    raise PreventUpdate
+                agregats["affiche"] = compteurs
+                duree_totale = agregats["duree"]
+
+            total = sum(compteurs)
+            data = [ligne_tableau(entree) for entree in lecteur.page(page_current or 0, TAILLE_PAGE_DASHBOARD)]
+            page_count = max(1, -(-total // TAILLE_PAGE_DASHBOARD))
+            if not nouveaux:
+                return data, page_count, no_update, no_update, no_update
+
+            average_duration = duree_totale / total if total > 0 else 0
             pie_fig = px.pie(
                 names=["Succès", "Échecs"],
-                values=[self.success_count, self.failure_count],
+                values=list(compteurs),
                 title="Répartition des contrats traités"
             )
-            with self.lock:
-                return self.results, pie_fig, f"{total}", f"{average_duration:.2f} secondes"
+            return data, page_count, pie_fig, f"{total}", f"{average_duration:.2f} secondes"
 
         app.run_server(debug=True, use_reloader=False)
 
@@ -191,6 +232,7 @@ class SeresRPA:
         except Exception as e:
             print(f"Erreur lors de la sauvegarde du fichier ou de la capture d'écran : {e}")
 
+    @chronometre()
     def is_error_page(self, driver):
         try:
             # Localiser l'élément qui pourrait indiquer la page d'erreur
@@ -239,6 +281,7 @@ class SeresRPA:
             self.logger.error(f"Erreur lors du clic sur le bouton '{button_text}' : {e}")
             raise
 
+    @chronometre()
     def click_and_validate_modal(self, driver, main_button_text, modal_button_selector):
         """
         Gère le clic sur un bouton principal et le clic sur un bouton dans une modale qui s'affiche ensuite.
@@ -251,13 +294,13 @@ class SeresRPA:
             # Étape 1 : Clic sur le bouton principal
             self.logger.info(f"Tentative de clic sur le bouton principal '{main_button_text}'...")
             self.click_button_by_text(driver, main_button_text)
-            time.sleep(2)
+            Attente(driver, self.logger).dom_stable("seres.clic_bouton_principal", timeout=2)
             # Étape 2 : Attendre l'apparition de la modale
             self.logger.info(f"Attente de l'apparition de la modale après clic sur '{main_button_text}'...")
             WebDriverWait(driver, 10).until(
                 EC.visibility_of_element_located((By.CSS_SELECTOR, "div.bootbox.modal.fade.bootbox-confirm.in"))
             )
-            time.sleep(2)
+            Attente(driver, self.logger).dom_stable("seres.modale_confirmation", timeout=2)
             # Étape 3 : Clic sur le bouton dans la modale
             self.logger.info(f"Tentative de clic sur le bouton dans la modale avec le sélecteur '{modal_button_selector}'...")
             modal_button = WebDriverWait(driver, 10).until(
@@ -273,6 +316,7 @@ class SeresRPA:
             raise
 
 
+    @chronometre()
     def click_rejets_aife(self, driver):
         """
         Fonction pour cliquer sur la div "Rejets AIFE".
@@ -296,6 +340,7 @@ class SeresRPA:
         except Exception as e:
             self.logger.error(f"Erreur lors du clic sur 'Rejets AIFE' : {e}")
 
+    @chronometre()
     def enter_num_facture(self, driver, numero_facture):
         """
         Saisit le numéro de facture dans le champ de recherche, lance la recherche et nettoie le champ.
@@ -328,9 +373,10 @@ class SeresRPA:
             self.logger.error(f"Erreur lors de la saisie du numéro facture : {e}")
             if "element not interactable" in str(e):
                 self.logger.warning("Nouvelle tentative après 'element not interactable'.")
-                time.sleep(1)  # Attendre brièvement avant de relancer
+                Attente(driver, self.logger).dom_stable("seres.saisie_facture_relance", timeout=1)  # Attendre brièvement avant de relancer
                 self.enter_num_facture(driver, numero_facture)
 
+    @chronometre()
     def select_row_by_facture(self, driver, numero_facture):
         """
         Sélectionne la ligne du tableau correspondant au numéro facture fourni et clique dessus.
@@ -343,7 +389,7 @@ class SeresRPA:
             # Attendre que le tableau contenant les documents soit visible
             wait = WebDriverWait(driver, 10)
             table = wait.until(EC.visibility_of_element_located((By.XPATH, "//table[contains(@id, 'list-documents')]")))
-            time.sleep(2)  # Ajout d'un délai court pour s'assurer que les lignes sont chargées
+            Attente(driver, self.logger).dom_stable("seres.lignes_tableau", timeout=2)  # S'assurer que les lignes sont chargées
 
             # Récupérer toutes les lignes du tableau (exclure la première ligne si elle est un header)
             rows = table.find_elements(By.XPATH, ".//tr[not(contains(@class, 'jqgfirstrow'))]")
@@ -379,6 +425,7 @@ class SeresRPA:
             self.logger.error(f"Erreur lors de la sélection de la ligne avec le numéro facture {numero_facture} : {e}")
             return False
 
+    @chronometre()
     def wait_for_modal(self, driver):
         """
         Attendre l'apparition de la modal pour poursuivre les opérations sur le contrat.
@@ -406,6 +453,7 @@ class SeresRPA:
             self.logger.error(f"Erreur lors de la vérification du SIRET : {e}")
             return False
 
+    @chronometre()
     def remplacer_siret(self, driver, siret_destinataire):
         """
         Remplace le SIRET par celui du payeur.
@@ -414,7 +462,8 @@ class SeresRPA:
             siret_input = driver.find_element(By.ID, "m_client_siret")
             siret_input.clear()
             siret_input.send_keys(siret_destinataire)
-            time.sleep(5)
+            # Le champ est reformaté par la page après la saisie
+            Attente(driver, self.logger).valeur_stable("seres.remplacement_siret", siret_input, timeout=5)
             self.logger.info(f"SIRET remplacé par {siret_destinataire}.")
         except Exception as e:
             self.logger.error(f"Erreur lors du remplacement du SIRET : {e}")
@@ -429,35 +478,37 @@ class SeresRPA:
         success = False
         message = "Erreur inattendue"
         duration = 0
+        attente = Attente(driver, self.logger)
 
         try:
             self.logger.info(f"Début du traitement du contrat {numero_facture}.")
 
             # Étape 1 : Clic sur "Rejets AIFE"
             self.click_rejets_aife(driver)
-            time.sleep(2)
+            attente.dom_stable("seres.rejets_aife", timeout=2)
 
             # Étape 2 : Saisie du numéro de facture
             self.enter_num_facture(driver, numero_facture)
-            time.sleep(2)
+            attente.reseau_inactif("seres.recherche_facture", timeout=2)
 
             # Étape 3 : Sélection de la ligne de la facture
             if not self.select_row_by_facture(driver, numero_facture):
                 message = "Contrat non trouvé"
                 self.logger.warning(f"Contrat {numero_facture} non trouvé. Passage au suivant.")
                 return numero_facture, success, message, duration
-            time.sleep(2)
+            attente.dom_stable("seres.selection_ligne", timeout=2)
             # Étape 4 : Attente de la modal
             self.wait_for_modal(driver)
-            time.sleep(2)
+            attente.dom_stable("seres.ouverture_modale", timeout=2)
             # Étape 5 : Remplacement du SIRET destinataire
             self.remplacer_siret(driver, siret_destinataire)
             # Étape 6 : Clic sur le bouton "Sauvegarder"
-            self.click_button_by_text(driver, "Sauvegarder")
-            time.sleep(2)
+            with etape("sauvegarder"):
+                self.click_button_by_text(driver, "Sauvegarder")
+            attente.reseau_inactif("seres.sauvegarde", timeout=2)
             # Étape 8 : Gestion du bouton "Valider" et clic sur la modale
             self.click_and_validate_modal(driver, "Valider", "body > div.bootbox.modal.fade.bootbox-confirm.in > div > div > div.modal-footer > button.btn.btn-primary")
-            time.sleep(2)
+            attente.dom_stable("seres.validation", timeout=2)
             # Étape 10 : Vérification de la page d'erreur
             if self.is_error_page(driver):
                 raise Exception("Page d'erreur détectée.")
@@ -496,33 +547,38 @@ class SeresRPA:
         """
         Traite un contrat spécifique dans un thread et met à jour les métriques.
         """
-        driver = self.pool.get_driver()
+        with self.timings.contrat(numero_facture, "seres") as suivi:
+            with etape("get_driver"):
+                driver = self.pool.get_driver()
+            suivi.associer_driver(driver)
+
+            # Initialisation des variables critiques
+            success = False
+            message = "Erreur inattendue"
+            duration = 0
+
+            try:
+                # Appel de la méthode principale de traitement
+                numero_facture, success, message, duration = self.process_contract(
+                    driver, numero_facture, siret_destinataire, identifiant, mot_de_passe
+                )
+            except Exception as e:
+                # Gestion des erreurs inattendues
+                message = f"Erreur inattendue : {e}"
+                self.log_error(numero_facture, message)
+            finally:
+                # Toujours retourner le driver au pool
+                self.pool.return_driver(driver)
 
-        # Initialisation des variables critiques
-        success = False
-        message = "Erreur inattendue"
-        duration = 0
-
-        try:
-            # Appel de la méthode principale de traitement
-            numero_facture, success, message, duration = self.process_contract(
-                driver, numero_facture, siret_destinataire, identifiant, mot_de_passe
-            )
-        except Exception as e:
-            # Gestion des erreurs inattendues
-            message = f"Erreur inattendue : {e}"
-            self.log_error(numero_facture, message)
-        finally:
-            # Toujours retourner le driver au pool
-            self.pool.return_driver(driver)
-
-        return numero_facture, success, message, duration
+            return numero_facture, success, message, duration
 
 
-    def main(self, excel_path):
+    def main(self, excel_path=None, progress_callback=None):
         """
         Fonction principale pour gérer le traitement des contrats avec multi-threading.
+        :param progress_callback: Fonction appelée après chaque facture (voir progress.Progression).
         """
+        excel_path = excel_path or get_config().data_path("Rejet SERES 2.xlsx")
         self.logger.info("Démarrage du RPA Seres avec multithreading...")
 
         # Charger les identifiants depuis les variables d'environnement
@@ -533,7 +589,7 @@ class SeresRPA:
             return
 
         # Préparer les données depuis le fichier Excel et JSON
-        json_path = 'data/numeros_contrat_seres.json'
+        json_path = get_config().state_path('numeros_contrat_seres.json')
         extract_contrat_numbers_to_json(excel_path, json_path)
         dictionnaire_siret = self.dictionnaire_siret(excel_path)
         facture_numbers = self.process_json_files(json_path)
@@ -558,7 +614,10 @@ class SeresRPA:
                     futures.append(future)
 
             # Récupération des résultats au fur et à mesure
-            for future in as_completed(futures):
+            if progress_callback:
+                progress_callback(0, total=len(futures))
+            for termines, future in enumerate(as_completed(futures), start=1):
+                success = False
                 try:
                     numero_facture, success, message, duration = future.result()
                     if success:
@@ -567,13 +626,17 @@ class SeresRPA:
                         self.logger.warning(f"Échec du traitement du contrat {numero_facture} : {message}")
                 except Exception as e:
                     self.logger.error(f"Erreur dans un thread de traitement : {e}")
+                if progress_callback:
+                    progress_callback((termines / len(futures)) * 100, total=len(futures), succes=bool(success))
 
+        statistiques_attente.journaliser(self.logger)
         self.logger.info("Traitement de tous les contrats terminé.")
 
-    def start(self, excel_path="data/data_traitement/Rejet SERES 2.xlsx"):
+    def start(self, excel_path=None):
         """
         Démarre le traitement du RPA Seres avec tableau de bord et logs.
         """
+        excel_path = excel_path or get_config().data_path("Rejet SERES 2.xlsx")
         self.logger.info(f"Démarrage du RPA Seres avec le fichier : {excel_path}")
         threading.Thread(target=self.start_dashboard).start()
         self.logger.info(f"Démarrage du tableau de board  dans http://127.0.0.1:8050")
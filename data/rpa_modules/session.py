@@ -0,0 +1,135 @@
+import threading
+from urllib.parse import urlparse
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from rpa_modules.debug import setup_logger
+
+# Champ présent uniquement sur la page de connexion : sa présence signale une session absente ou expirée
+MARQUEUR_CONNEXION = (By.ID, "AUTHENTICATION.LOGIN")
+
+# Champs acceptés par Network.setCookies (les autres champs de Network.getAllCookies sont refusés)
+CHAMPS_COOKIE = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+
+class SessionManager:
+    def __init__(self, url, login, logger=None, marqueur_connexion=MARQUEUR_CONNEXION, timeout_connexion=20):
+        """
+        Session partagée entre les WebDrivers d'un pool.
+
+        Un seul driver s'authentifie ; ses cookies et son sessionStorage sont capturés puis injectés
+        dans les autres drivers. L'expiration est détectée à un seul endroit (page de connexion
+        affichée) et ne déclenche qu'une réauthentification, même si plusieurs threads la constatent.
+        :param url: URL de l'application, rechargée après injection de la session.
+        :param login: Fonction appelée avec un driver pour s'authentifier depuis la page de connexion.
+        :param logger: Logger pour les logs.
+        :param marqueur_connexion: Localisateur d'un élément propre à la page de connexion.
+        :param timeout_connexion: Attente maximale de la sortie de la page de connexion après login.
+        """
+        self.url = url
+        self.login = login
+        self.logger = logger or setup_logger('session.log')
+        self.marqueur_connexion = marqueur_connexion
+        self.timeout_connexion = timeout_connexion
+        self.lock = threading.Lock()
+        # Incrémentée à chaque authentification réussie ; chaque driver retient la génération qu'il porte
+        self.generation = 0
+        self._cookies = None
+        self._session_storage = {}
+
+    def page_de_connexion(self, driver):
+        """
+        Vérifie sans attendre si la page de connexion est affichée.
+        """
+        return bool(driver.find_elements(*self.marqueur_connexion))
+
+    def assurer_session(self, driver):
+        """
+        Garantit que le driver est authentifié : rien à faire si la page de connexion n'est pas
+        affichée ; sinon injection de la session partagée, et authentification seulement si
+        celle-ci est absente ou expirée.
+        :raises RuntimeError: Si la page de connexion est toujours affichée après l'authentification.
+        """
+        if not self.page_de_connexion(driver):
+            return
+
+        generation_vue = getattr(driver, "session_generation", None)
+        with self.lock:
+            # Une session plus récente que celle du driver existe : on l'injecte d'abord
+            if self._cookies is not None and generation_vue != self.generation:
+                self._injecter(driver)
+                if not self.page_de_connexion(driver):
+                    driver.session_generation = self.generation
+                    self.logger.debug(f"Session partagée (génération {self.generation}) injectée dans le driver.")
+                    return
+
+            # Session absente ou expirée : une seule réauthentification, sous verrou
+            self.logger.info("Session absente ou expirée, authentification...")
+            self.login(driver)
+            try:
+                WebDriverWait(driver, self.timeout_connexion).until(lambda d: not self.page_de_connexion(d))
+            except Exception as e:
+                # Le contrat ne doit pas être traité sur la page de connexion : l'appelant le compte en échec
+                raise RuntimeError("Échec de l'authentification : la page de connexion est toujours affichée.") from e
+
+            self._capturer(driver)
+            self.generation += 1
+            driver.session_generation = self.generation
+            self.logger.info(f"Session authentifiée et partagée (génération {self.generation}, {len(self._cookies)} cookie(s)).")
+
+    def _capturer(self, driver):
+        """
+        Capture les cookies de tous les domaines (via CDP si disponible) et le sessionStorage de l'origine courante.
+        """
+        try:
+            self._cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except Exception as e:
+            self.logger.debug(f"CDP indisponible, cookies du domaine courant uniquement : {e}")
+            self._cookies = driver.get_cookies()
+
+        try:
+            origine = self._origine(driver.current_url)
+            stockage = driver.execute_script("return Object.assign({}, window.sessionStorage);")
+            self._session_storage = {origine: stockage} if stockage else {}
+        except Exception as e:
+            self.logger.debug(f"sessionStorage non capturé : {e}")
+            self._session_storage = {}
+
+    def _injecter(self, driver):
+        """
+        Injecte la session partagée dans le driver puis recharge l'URL de l'application.
+        """
+        try:
+            cookies = [self._cookie_cdp(cookie) for cookie in self._cookies]
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        except Exception as e:
+            self.logger.debug(f"Injection CDP impossible, ajout des cookies du domaine courant : {e}")
+            hote = urlparse(driver.current_url).hostname or ""
+            for cookie in self._cookies:
+                if hote.endswith(cookie.get("domain", "").lstrip(".")):
+                    try:
+                        driver.add_cookie({cle: cookie[cle] for cle in ("name", "value", "path", "domain", "secure", "httpOnly") if cle in cookie})
+                    except Exception as erreur_cookie:
+                        self.logger.debug(f"Cookie {cookie.get('name')} non injecté : {erreur_cookie}")
+
+        stockage = self._session_storage.get(self._origine(driver.current_url))
+        if stockage:
+            driver.execute_script(
+                "for (const [cle, valeur] of Object.entries(arguments[0])) { window.sessionStorage.setItem(cle, valeur); }",
+                stockage
+            )
+        driver.get(self.url)
+
+    @staticmethod
+    def _cookie_cdp(cookie):
+        parametres = {cle: cookie[cle] for cle in CHAMPS_COOKIE if cle in cookie}
+        # Cookies de session : pas de date d'expiration à transmettre
+        if cookie.get("session") or parametres.get("expires", 0) < 0:
+            parametres.pop("expires", None)
+        return parametres
+
+    @staticmethod
+    def _origine(url):
+        morceaux = urlparse(url or "")
+        return f"{morceaux.scheme}://{morceaux.netloc}"
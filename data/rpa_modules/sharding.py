@@ -0,0 +1,288 @@
+import os
+import sys
+import csv
+import json
+import time
+import zlib
+import subprocess
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+from rpa_modules.journal import DEFAULT_JOURNAL_PATH
+from rpa_modules.timings import DEFAULT_TIMINGS_PATH
+from rpa_modules.progress import DEFAULT_PROGRESS_PATH, ecrire_atomique, lire_progression, fusionner_progressions
+from rpa_modules.metrics import DEFAULT_METRICS_PATH
+
+# Sous-dossier du dossier d'état contenant un dossier d'état par shard
+DOSSIER_SHARDS = "shards"
+FICHIER_SHARD = "shard.json"
+FICHIER_RESULTATS = "resultats_traitement.csv"
+FICHIER_TYPES = "contract_types_count.csv"
+PREFIXE_MULTISITES = "Nombre de contrats multisites:"
+PREFIXE_NON_MODIFIABLES = "Nombre de contrats non modifiables:"
+# Intervalle d'agrégation des progressions des workers pendant l'exécution
+INTERVALLE_PROGRESSION = 2
+
+
+def shard_de(numero_contrat, nombre_shards):
+    """
+    Shard d'un contrat : hachage stable (CRC32) du numéro, identique d'un processus et d'un hôte à l'autre.
+    """
+    return zlib.crc32(str(numero_contrat).strip().encode("utf-8")) % nombre_shards
+
+
+def parse_shard(valeur):
+    """
+    Lit un shard au format "i/N" (0 <= i < N).
+    :return: Tuple (index, nombre de shards).
+    :raises ValueError: Si le format est invalide.
+    """
+    try:
+        index, nombre = (int(morceau) for morceau in valeur.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Shard invalide : {valeur!r} (format attendu : i/N)")
+    if nombre < 1 or not 0 <= index < nombre:
+        raise ValueError(f"Shard invalide : {valeur!r} (0 <= i < N)")
+    return index, nombre
+
+
+def filtrer_shard(contrats, shard):
+    """
+    Ne garde que les contrats du shard donné ; sans shard, la liste est inchangée.
+    :param shard: Tuple (index, nombre de shards) ou None.
+    """
+    if shard is None:
+        return list(contrats)
+    index, nombre = shard
+    return [numero_contrat for numero_contrat in contrats if shard_de(numero_contrat, nombre) == index]
+
+
+def dossier_shard(index, nombre_shards, state_dir=None):
+    return os.path.join(state_dir or get_config().state_dir, DOSSIER_SHARDS, f"{index}-{nombre_shards}")
+
+
+class CoordinateurShards:
+    def __init__(self, rpa_name, nombre_shards, arguments_worker=(), main_path=None, logger=None, state_dir=None):
+        """
+        Exécution d'un RPA répartie sur plusieurs processus : chaque worker traite un shard de la
+        liste de contrats avec son propre pool de WebDrivers et son propre dossier d'état (journal,
+        temps, CSV), puis les sorties sont fusionnées dans le dossier d'état principal.
+        :param rpa_name: Nom du RPA lancé dans chaque worker.
+        :param nombre_shards: Nombre de workers.
+        :param arguments_worker: Arguments supplémentaires transmis à chaque worker (mode, navigateur...).
+        :param main_path: Chemin de main.py (par défaut, data/main.py).
+        :param logger: Logger pour les logs.
+        :param state_dir: Dossier d'état principal (par défaut, celui de la configuration).
+        """
+        self.rpa_name = rpa_name
+        self.nombre_shards = nombre_shards
+        self.arguments_worker = list(arguments_worker)
+        self.main_path = main_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        self.logger = logger or setup_logger('sharding.log')
+        self.state_dir = state_dir or get_config().state_dir
+        os.makedirs(self.state_dir, exist_ok=True)
+        # Fichier d'arrêt unique pour tous les workers : ils le lisent, seul le coordinateur (ou le
+        # backend qui l'a lancé) l'efface, une fois tous les workers terminés
+        self.stop_file = os.getenv("RPA_STOP_FILE") or os.path.join(self.state_dir, f"{rpa_name.lower()}.stop")
+        self.journal_path = os.path.join(self.state_dir, DEFAULT_JOURNAL_PATH)
+
+    def dossiers(self):
+        return [dossier_shard(index, self.nombre_shards, self.state_dir) for index in range(self.nombre_shards)]
+
+    def preparer(self, indices=None):
+        """
+        Prépare le dossier de chaque shard : anciennes sorties supprimées et journal amorcé avec
+        l'historique de ses seuls contrats, pour que les modes reprise et echecs filtrent comme en
+        exécution simple.
+        :param indices: Shards à préparer (par défaut, tous).
+        """
+        historique = [[] for _ in range(self.nombre_shards)]
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as file:
+                for ligne in file:
+                    try:
+                        numero_contrat = json.loads(ligne)["contrat"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+                    historique[shard_de(numero_contrat, self.nombre_shards)].append(ligne if ligne.endswith("\n") else ligne + "\n")
+
+        for index, dossier in enumerate(self.dossiers()):
+            if indices is not None and index not in indices:
+                continue
+            os.makedirs(dossier, exist_ok=True)
+            for nom in (FICHIER_RESULTATS, FICHIER_TYPES, DEFAULT_TIMINGS_PATH, DEFAULT_PROGRESS_PATH, DEFAULT_METRICS_PATH):
+                chemin = os.path.join(dossier, nom)
+                if os.path.exists(chemin):
+                    os.remove(chemin)
+            with open(os.path.join(dossier, DEFAULT_JOURNAL_PATH), "w", encoding="utf-8") as file:
+                file.writelines(historique[index])
+            ecrire_atomique(os.path.join(dossier, FICHIER_SHARD), {
+                "shard": f"{index}/{self.nombre_shards}",
+                "lignes_journal_initiales": len(historique[index]),
+                # Lignes déjà reportées dans le dossier principal : une fusion ne reporte que la suite
+                "lignes_journal_fusionnees": len(historique[index]),
+                "lignes_temps_fusionnees": 0,
+            })
+
+    def preparer_worker(self, index):
+        """
+        Dossier d'état d'un worker lancé à la main (--shard i/N) : préparé comme par le coordinateur
+        s'il n'existe pas encore, pour que --merge-shards retrouve ses sorties.
+        :return: Chemin du dossier du shard.
+        """
+        dossier = dossier_shard(index, self.nombre_shards, self.state_dir)
+        if not os.path.exists(os.path.join(dossier, FICHIER_SHARD)):
+            self.preparer([index])
+            self.logger.info(f"Dossier du shard {index}/{self.nombre_shards} préparé : {dossier}.")
+        return dossier
+
+    def lancer(self):
+        """
+        Démarre un processus worker par shard, chacun avec RPA_STATE_DIR pointant sur son dossier.
+        :return: Liste des processus.
+        """
+        processus = []
+        for index, dossier in enumerate(self.dossiers()):
+            commande = [sys.executable, self.main_path, self.rpa_name, *self.arguments_worker,
+                        "--shard", f"{index}/{self.nombre_shards}"]
+            # Chaque worker écrit sa progression et ses métriques dans son dossier ; le coordinateur
+            # agrège les progressions, le backend lit les métriques de chaque shard
+            environnement = {**os.environ, "RPA_STATE_DIR": dossier,
+                             "RPA_PROGRESS_FILE": os.path.join(dossier, DEFAULT_PROGRESS_PATH),
+                             "RPA_METRICS_FILE": os.path.join(dossier, DEFAULT_METRICS_PATH),
+                             "RPA_STOP_FILE": self.stop_file}
+            processus.append(subprocess.Popen(commande, env=environnement))
+            self.logger.info(f"Worker {index}/{self.nombre_shards} démarré (pid {processus[-1].pid}, état dans {dossier}).")
+        return processus
+
+    def fusionner(self):
+        """
+        Fusionne les sorties des shards dans le dossier d'état principal : nouvelles lignes des
+        journaux, temps par étape, résultats et décompte des types de contrats.
+
+        Les lignes de journal et de temps déjà reportées sont comptées dans le fichier de chaque
+        shard : fusionner à nouveau (après executer, ou deux fois --merge-shards) ne les duplique pas.
+        """
+        lignes_journal, lignes_temps = [], []
+        etats = []
+        resultats, types = [], {}
+        entete = None
+        multisites, non_modifiables = 0, 0
+
+        for dossier in self.dossiers():
+            chemin_shard = os.path.join(dossier, FICHIER_SHARD)
+            try:
+                with open(chemin_shard, "r", encoding="utf-8") as file:
+                    etat = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                etat = {}
+            journal = self._lire_lignes(os.path.join(dossier, DEFAULT_JOURNAL_PATH))
+            temps = self._lire_lignes(os.path.join(dossier, DEFAULT_TIMINGS_PATH))
+            lignes_journal += journal[etat.get("lignes_journal_fusionnees", etat.get("lignes_journal_initiales", 0)):]
+            lignes_temps += temps[etat.get("lignes_temps_fusionnees", 0):]
+            etats.append((chemin_shard, dict(etat, lignes_journal_fusionnees=len(journal), lignes_temps_fusionnees=len(temps))))
+
+            chemin_resultats = os.path.join(dossier, FICHIER_RESULTATS)
+            if os.path.exists(chemin_resultats):
+                with open(chemin_resultats, "r", newline="", encoding="utf-8") as file:
+                    for ligne in csv.reader(file):
+                        if not ligne:
+                            continue
+                        if ligne[0].startswith(PREFIXE_MULTISITES):
+                            multisites += int(ligne[0][len(PREFIXE_MULTISITES):])
+                        elif ligne[0].startswith(PREFIXE_NON_MODIFIABLES):
+                            non_modifiables += int(ligne[0][len(PREFIXE_NON_MODIFIABLES):])
+                        elif entete is None:
+                            entete = ligne
+                        elif ligne != entete:
+                            resultats.append(ligne)
+
+            chemin_types = os.path.join(dossier, FICHIER_TYPES)
+            if os.path.exists(chemin_types):
+                with open(chemin_types, "r", newline="", encoding="utf-8") as file:
+                    for ligne in csv.DictReader(file):
+                        types[ligne["Type de contrat"]] = types.get(ligne["Type de contrat"], 0) + int(ligne["Nombre"])
+
+        self._ajouter_lignes(self.journal_path, lignes_journal, fsync=True)
+        self._ajouter_lignes(os.path.join(self.state_dir, DEFAULT_TIMINGS_PATH), lignes_temps)
+        # Compteurs avancés une fois les lignes écrites : une fusion interrompue sera refaite
+        for chemin_shard, etat in etats:
+            if os.path.isdir(os.path.dirname(chemin_shard)):
+                ecrire_atomique(chemin_shard, etat)
+
+        if entete is not None:
+            chemin_resultats = os.path.join(self.state_dir, FICHIER_RESULTATS)
+            with open(chemin_resultats, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(entete)
+                writer.writerows(resultats)
+            with open(chemin_resultats, "a", encoding="utf-8") as file:
+                file.write(f"\n{PREFIXE_MULTISITES} {multisites}")
+                file.write(f"\n{PREFIXE_NON_MODIFIABLES} {non_modifiables}")
+        if types:
+            with open(os.path.join(self.state_dir, FICHIER_TYPES), "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(["Type de contrat", "Nombre"])
+                writer.writerows(types.items())
+
+        self.logger.info(
+            f"Shards fusionnés : {len(resultats)} résultat(s), {len(lignes_journal)} événement(s) de journal, "
+            f"{len(lignes_temps)} ligne(s) de temps."
+        )
+
+    def executer(self):
+        """
+        Prépare, lance et attend les workers, puis fusionne leurs sorties (même après un échec
+        partiel, pour ne pas perdre les contrats déjà traités).
+        :return: 0 si tous les workers ont réussi, 1 sinon.
+        """
+        self.preparer()
+        processus = self.lancer()
+        codes = {}
+        try:
+            while len(codes) < len(processus):
+                for index, process in enumerate(processus):
+                    if index not in codes and process.poll() is not None:
+                        codes[index] = process.returncode
+                        self.logger.info(f"Worker {index}/{self.nombre_shards} terminé (code {codes[index]}).")
+                self.agreger_progression()
+                if len(codes) < len(processus):
+                    time.sleep(INTERVALLE_PROGRESSION)
+        finally:
+            for process in processus:
+                if process.poll() is None:
+                    process.terminate()
+            if os.path.exists(self.stop_file):
+                self.logger.info(f"Arrêt demandé traité par les {self.nombre_shards} workers.")
+                os.remove(self.stop_file)
+            self.agreger_progression()
+            self.fusionner()
+        return 0 if len(codes) == len(processus) and all(code == 0 for code in codes.values()) else 1
+
+    def agreger_progression(self):
+        """
+        Écrit la progression globale (somme des workers) là où le backend l'attend pour ce processus.
+        """
+        progressions = [lire_progression(os.path.join(dossier, DEFAULT_PROGRESS_PATH)) for dossier in self.dossiers()]
+        chemin = os.getenv("RPA_PROGRESS_FILE") or os.path.join(self.state_dir, DEFAULT_PROGRESS_PATH)
+        try:
+            ecrire_atomique(chemin, fusionner_progressions(progressions, self.rpa_name))
+        except OSError as e:
+            self.logger.warning(f"Impossible d'écrire la progression globale dans {chemin} : {e}")
+
+    @staticmethod
+    def _lire_lignes(chemin):
+        if not os.path.exists(chemin):
+            return []
+        with open(chemin, "r", encoding="utf-8") as file:
+            return [ligne if ligne.endswith("\n") else ligne + "\n" for ligne in file if ligne.strip()]
+
+    @staticmethod
+    def _ajouter_lignes(chemin, lignes, fsync=False):
+        if not lignes:
+            return
+        with open(chemin, "a", encoding="utf-8") as file:
+            file.writelines(lignes)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
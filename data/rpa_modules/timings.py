@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+from rpa_modules.metrics import durees_etapes
+
+DEFAULT_TIMINGS_PATH = "timings_contrats.jsonl"
+
+_suivi_local = threading.local()
+_journaux = {}
+_journaux_lock = threading.Lock()
+
+
+def identifiant_driver(driver):
+    """
+    Retourne un identifiant court et stable pour un WebDriver (id de session Selenium).
+    """
+    if driver is None:
+        return None
+    return getattr(driver, "session_id", None) or hex(id(driver))
+
+
+class SuiviContrat:
+    def __init__(self, numero_contrat, rpa, driver=None):
+        """
+        Chronométrage des étapes d'un contrat. Les spans sont gardés en mémoire puis écrits en une
+        fois à la fin du contrat, étiquetés avec le type de contrat connu à ce moment-là.
+        :param numero_contrat: Numéro du contrat (ou de la facture) suivi.
+        :param rpa: Nom du RPA (affranchigo, extraction, dematerialisation, seres).
+        :param driver: WebDriver utilisé, s'il est déjà connu.
+        """
+        self.numero_contrat = numero_contrat
+        self.rpa = rpa
+        self.driver_id = identifiant_driver(driver)
+        self.type_contrat = None
+        self.debut = time.perf_counter()
+        self.spans = []
+        # Compteurs libres du contrat (ressources bloquées...), ajoutés à la ligne "contrat"
+        self.metriques = {}
+        self._pile = []
+
+    def associer_driver(self, driver):
+        self.driver_id = identifiant_driver(driver)
+
+    @contextmanager
+    def etape(self, nom):
+        parent = self._pile[-1] if self._pile else None
+        self._pile.append(nom)
+        debut = time.perf_counter()
+        erreur = None
+        try:
+            yield
+        except BaseException as e:
+            erreur = type(e).__name__
+            raise
+        finally:
+            fin = time.perf_counter()
+            self._pile.pop()
+            self.spans.append({
+                "etape": nom,
+                "parent": parent,
+                "debut": round(debut - self.debut, 4),
+                "duree": round(fin - debut, 4),
+                "erreur": erreur,
+            })
+
+    def enregistrer_span(self, nom, duree):
+        """
+        Ajoute un span déjà mesuré (par exemple une attente) rattaché à l'étape en cours.
+        """
+        parent = self._pile[-1] if self._pile else None
+        self.spans.append({
+            "etape": nom,
+            "parent": parent,
+            "debut": round(time.perf_counter() - duree - self.debut, 4),
+            "duree": round(duree, 4),
+            "erreur": None,
+        })
+
+
+class JournalTemps:
+    def __init__(self, file_path=DEFAULT_TIMINGS_PATH, logger=None):
+        """
+        Export JSONL des temps par étape : une ligne par span, étiquetée avec le RPA, le contrat,
+        le type de contrat et le driver. Une ligne "contrat" donne la durée totale.
+        :param file_path: Chemin du fichier JSONL.
+        :param logger: Logger pour les logs.
+        """
+        self.file_path = file_path
+        self.logger = logger or setup_logger('timings.log')
+        self.lock = threading.Lock()
+        self._file = open(file_path, "a", encoding="utf-8")
+
+    @contextmanager
+    def contrat(self, numero_contrat, rpa, driver=None):
+        """
+        Ouvre le suivi d'un contrat pour le thread courant. Les appels à etape() et les méthodes
+        décorées par chronometre() exécutés dans ce bloc y sont rattachés.
+        """
+        suivi = SuiviContrat(numero_contrat, rpa, driver)
+        precedent = getattr(_suivi_local, "suivi", None)
+        _suivi_local.suivi = suivi
+        erreur = None
+        try:
+            yield suivi
+        except BaseException as e:
+            erreur = type(e).__name__
+            raise
+        finally:
+            _suivi_local.suivi = precedent
+            suivi.spans.append({
+                "etape": "contrat",
+                "parent": None,
+                "debut": 0.0,
+                "duree": round(time.perf_counter() - suivi.debut, 4),
+                "erreur": erreur,
+                **suivi.metriques,
+            })
+            self.ecrire(suivi)
+
+    def ecrire(self, suivi):
+        ts = time.time()
+        for span in suivi.spans:
+            durees_etapes.observer(span["duree"], rpa=suivi.rpa, etape=span["etape"])
+        lignes = "".join(
+            json.dumps({
+                "ts": ts,
+                "rpa": suivi.rpa,
+                "contrat": suivi.numero_contrat,
+                "type_contrat": suivi.type_contrat,
+                "driver": suivi.driver_id,
+                **span
+            }, ensure_ascii=False, default=str) + "\n"
+            for span in suivi.spans
+        )
+        try:
+            with self.lock:
+                self._file.write(lignes)
+                self._file.flush()
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Impossible d'écrire les temps du contrat {suivi.numero_contrat} : {e}")
+
+    def close(self):
+        with self.lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def open_timings(file_path=None, logger=None):
+    """
+    Retourne l'instance partagée de l'export des temps pour un chemin donné.
+    :param file_path: Chemin du fichier (par défaut, dans le dossier d'état de la configuration).
+    """
+    file_path = file_path or get_config().state_path(DEFAULT_TIMINGS_PATH)
+    cle = os.path.abspath(file_path)
+    with _journaux_lock:
+        journal = _journaux.get(cle)
+        if journal is None:
+            journal = JournalTemps(file_path, logger=logger)
+            _journaux[cle] = journal
+        return journal
+
+
+def suivi_courant():
+    """
+    Retourne le suivi du contrat en cours dans ce thread, ou None.
+    """
+    return getattr(_suivi_local, "suivi", None)
+
+
+@contextmanager
+def etape(nom):
+    """
+    Chronomètre une étape du contrat en cours. Sans contrat suivi dans le thread, ne fait rien.
+    """
+    suivi = suivi_courant()
+    if suivi is None:
+        yield
+        return
+    with suivi.etape(nom):
+        yield
+
+
+def definir_type_contrat(type_contrat):
+    """
+    Renseigne le type du contrat en cours, repris sur tous ses spans à l'écriture.
+    """
+    suivi = suivi_courant()
+    if suivi is not None:
+        suivi.type_contrat = type_contrat
+
+
+def chronometre(nom=None):
+    """
+    Décorateur chronométrant une méthode comme une étape du contrat en cours.
+    :param nom: Nom de l'étape (par défaut, le nom de la fonction).
+    """
+    def decorateur(fonction):
+        nom_etape = nom or fonction.__name__
+
+        @functools.wraps(fonction)
+        def wrapper(*args, **kwargs):
+            with etape(nom_etape):
+                return fonction(*args, **kwargs)
+        return wrapper
+    return decorateur
@@ -0,0 +1,194 @@
+import time
+import threading
+
+from rpa_modules.debug import setup_logger
+from rpa_modules.config import get_config
+from rpa_modules.timings import suivi_courant
+
+# Stratégies d'attente : rendre la main dès que la condition est remplie, ou attendre tout le
+# timeout comme les pauses fixes d'origine (référence des comparatifs de débit)
+STRATEGIE_CONDITIONNELLE = "conditionnelle"
+STRATEGIE_FIXE = "fixe"
+STRATEGIES = (STRATEGIE_CONDITIONNELLE, STRATEGIE_FIXE)
+
+# Instrumentation injectée une fois par document : horodatage de la dernière mutation du DOM
+# et compteur des requêtes XHR/fetch en cours.
+SCRIPT_ETAT_PAGE = """
+if (!window.__rpaAttente) {
+    var etat = {derniereMutation: Date.now(), derniereRequete: 0, requetes: 0};
+    new MutationObserver(function () { etat.derniereMutation = Date.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    var fin = function () { etat.requetes = Math.max(0, etat.requetes - 1); etat.derniereRequete = Date.now(); };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        etat.requetes++;
+        this.addEventListener('loadend', fin);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetchOrigine = window.fetch;
+        window.fetch = function () {
+            etat.requetes++;
+            return fetchOrigine.apply(this, arguments).finally(fin);
+        };
+    }
+    window.__rpaAttente = etat;
+}
+var e = window.__rpaAttente;
+var maintenant = Date.now();
+return {
+    pret: document.readyState === 'complete',
+    requetes: Math.max(e.requetes, window.jQuery ? window.jQuery.active : 0),
+    silenceDom: maintenant - e.derniereMutation,
+    silenceReseau: e.derniereRequete ? maintenant - e.derniereRequete : maintenant - e.derniereMutation
+};
+"""
+
+
+class StatistiquesAttente:
+    def __init__(self):
+        """
+        Agrège, par étape, le temps réellement passé à attendre et le nombre d'expirations.
+        """
+        self.lock = threading.Lock()
+        self.etapes = {}
+
+    def enregistrer(self, etape, duree, expire):
+        with self.lock:
+            stats = self.etapes.setdefault(etape, {"nombre": 0, "total": 0.0, "max": 0.0, "expirations": 0})
+            stats["nombre"] += 1
+            stats["total"] += duree
+            stats["max"] = max(stats["max"], duree)
+            if expire:
+                stats["expirations"] += 1
+
+    def resume(self):
+        """
+        Retourne les statistiques par étape, triées par temps total d'attente décroissant.
+        """
+        with self.lock:
+            lignes = [
+                {"etape": etape, **stats, "moyenne": stats["total"] / stats["nombre"]}
+                for etape, stats in self.etapes.items()
+            ]
+        return sorted(lignes, key=lambda ligne: ligne["total"], reverse=True)
+
+    def journaliser(self, logger, limite=20):
+        for ligne in self.resume()[:limite]:
+            logger.info(
+                f"Attente {ligne['etape']} : {ligne['nombre']} appel(s), total {ligne['total']:.1f}s, "
+                f"moyenne {ligne['moyenne']:.2f}s, max {ligne['max']:.2f}s, {ligne['expirations']} expiration(s)"
+            )
+
+
+# Statistiques partagées par toutes les instances d'Attente du processus
+statistiques_attente = StatistiquesAttente()
+
+
+class Attente:
+    def __init__(self, driver, logger=None, statistiques=None, intervalle=0.1, strategie=None):
+        """
+        Couche d'attente conditionnelle remplaçant les pauses fixes (time.sleep).
+
+        Chaque attente rend la main dès que sa condition est remplie ; le timeout donné est un
+        plafond par étape, pas une durée fixe. Le temps réellement attendu est enregistré par étape.
+        :param driver: L'instance de WebDriver à surveiller.
+        :param logger: Logger pour les logs.
+        :param statistiques: Agrégateur des temps d'attente (partagé par défaut).
+        :param intervalle: Intervalle de scrutation en secondes.
+        :param strategie: STRATEGIE_CONDITIONNELLE ou STRATEGIE_FIXE (par défaut, celle de la configuration).
+        """
+        self.driver = driver
+        self.logger = logger or setup_logger('waits.log')
+        self.statistiques = statistiques or statistiques_attente
+        self.intervalle = intervalle
+        self.strategie = strategie or get_config().wait_strategy
+        if self.strategie not in STRATEGIES:
+            raise ValueError(f"Stratégie d'attente inconnue : {self.strategie} (disponibles : {', '.join(STRATEGIES)})")
+
+    def etat_page(self):
+        try:
+            return self.driver.execute_script(SCRIPT_ETAT_PAGE)
+        except Exception as e:
+            self.logger.debug(f"État de la page indisponible : {e}")
+            return None
+
+    def _attendre(self, etape, condition, timeout):
+        debut = time.monotonic()
+        limite = debut + timeout
+        atteinte = False
+        if self.strategie == STRATEGIE_FIXE:
+            # Pause de toute la durée, la condition n'est pas évaluée
+            time.sleep(timeout)
+            atteinte = True
+        while not atteinte:
+            try:
+                atteinte = bool(condition())
+            except Exception as e:
+                self.logger.debug(f"Attente {etape} : condition en erreur ({e}).")
+                atteinte = False
+            if atteinte or time.monotonic() >= limite:
+                break
+            time.sleep(self.intervalle)
+
+        duree = time.monotonic() - debut
+        self.statistiques.enregistrer(etape, duree, not atteinte)
+        suivi = suivi_courant()
+        if suivi is not None:
+            suivi.enregistrer_span(f"attente.{etape}", duree)
+        if atteinte:
+            self.logger.debug(f"Attente {etape} : condition atteinte en {duree:.2f}s.")
+        else:
+            self.logger.debug(f"Attente {etape} : timeout de {timeout}s atteint.")
+        return atteinte
+
+    def dom_stable(self, etape, timeout=5, silence=0.3, reseau=True):
+        """
+        Attend que le document soit chargé et que le DOM n'ait plus bougé pendant `silence` secondes.
+        :param etape: Nom de l'étape, utilisé pour les statistiques.
+        :param timeout: Attente maximale en secondes.
+        :param silence: Durée sans mutation requise, en secondes.
+        :param reseau: Exige aussi qu'aucune requête XHR/fetch ne soit en cours.
+        :return: True si la condition est atteinte, False en cas de timeout.
+        """
+        silence_ms = silence * 1000
+
+        def condition():
+            etat = self.etat_page()
+            if not etat or not etat["pret"]:
+                return False
+            if reseau and etat["requetes"] > 0:
+                return False
+            return etat["silenceDom"] >= silence_ms
+
+        return self._attendre(etape, condition, timeout)
+
+    def reseau_inactif(self, etape, timeout=5, silence=0.3):
+        """
+        Attend qu'aucune requête XHR/fetch ne soit en cours depuis `silence` secondes.
+        """
+        silence_ms = silence * 1000
+
+        def condition():
+            etat = self.etat_page()
+            return bool(etat) and etat["pret"] and etat["requetes"] == 0 and etat["silenceReseau"] >= silence_ms
+
+        return self._attendre(etape, condition, timeout)
+
+    def valeur_stable(self, etape, element, timeout=5, silence=0.3):
+        """
+        Attend que la valeur d'un champ (input ou select) ne change plus pendant `silence` secondes,
+        par exemple après une saisie qui déclenche un recalcul côté page.
+        """
+        suivi = {"valeur": None, "depuis": None}
+
+        def condition():
+            valeur = element.get_attribute("value")
+            maintenant = time.monotonic()
+            if suivi["depuis"] is None or valeur != suivi["valeur"]:
+                suivi["valeur"] = valeur
+                suivi["depuis"] = maintenant
+                return False
+            return maintenant - suivi["depuis"] >= silence
+
+        return self._attendre(etape, condition, timeout)
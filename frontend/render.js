@@ -28,23 +28,66 @@ function sendRequest(url, method = 'POST') {
         });
 }
 
-// Fonction pour récupérer les logs en temps réel
+// Nombre maximal de lignes gardées à l'écran : le coût d'affichage ne dépend pas de la taille du log
+const MAX_LOG_LINES = 2000;
+// Curseur renvoyé par /logs : seules les lignes ajoutées depuis l'appel précédent sont transférées
+let logCursor = null;
+let logPolling = null;
+let logStream = null;
+
+// Fonction pour récupérer les nouvelles lignes de logs (repli si le flux SSE est indisponible)
 function fetchLogs() {
-    fetch('http://127.0.0.1:5000/logs')
-        .then(response => response.text())
+    const params = new URLSearchParams();
+    if (logCursor) {
+        params.set('cursor', logCursor);
+    }
+    fetch(`http://127.0.0.1:5000/logs?${params}`)
+        .then(response => response.json())
         .then(data => {
-            appendLog(data);  // Mise à jour des logs
+            logCursor = data.curseur || logCursor;
+            if (data.lignes && data.lignes.length) {
+                appendLog(data.lignes.join("\n"));  // Mise à jour des logs
+            }
         })
         .catch(error => {
             console.error('Erreur lors de la récupération des logs:', error);
         });
 }
 
+// Suivi des logs : flux Server-Sent Events, ou interrogation toutes les 3 secondes à défaut
+function followLogs() {
+    if (logStream || logPolling) {
+        return;  // Un seul suivi, même après plusieurs démarrages
+    }
+    if (window.EventSource) {
+        logStream = new EventSource('http://127.0.0.1:5000/logs/stream');
+        logStream.onmessage = event => {
+            // Dernier curseur reçu : le repli sur /logs reprend ici au lieu de réafficher la fin du fichier
+            logCursor = event.lastEventId || logCursor;
+            appendLog(event.data);
+        };
+        logStream.onerror = () => {
+            // Le navigateur se reconnecte seul ; sans connexion établie, repli sur l'interrogation
+            if (logStream.readyState === EventSource.CLOSED) {
+                logStream = null;
+                logPolling = setInterval(fetchLogs, 3000);
+            }
+        };
+    } else {
+        logPolling = setInterval(fetchLogs, 3000);
+    }
+}
+
 // Fonction pour ajouter des logs au conteneur et défiler automatiquement vers le bas
 function appendLog(newLog) {
     const logContent = document.getElementById('log-content');
     logContent.textContent += newLog + "\n";
-    
+
+    const lines = logContent.textContent.split("\n");
+    if (lines.length > MAX_LOG_LINES) {
+        logContent.textContent = lines.slice(-MAX_LOG_LINES).join("\n");
+    }
+
     // Défilement automatique vers le bas
     const logContentWrapper = document.getElementById('log-content-wrapper');
     logContentWrapper.scrollTop = logContentWrapper.scrollHeight;
@@ -56,7 +99,7 @@ function handleRpaButtonClick(button, method = 'POST') {
     sendRequest(url, method);
 
     if (method === 'POST' && url.startsWith('/start')) {
-        setInterval(fetchLogs, 3000);  // Récupérer les logs toutes les 3 secondes
+        followLogs();  // Suivre les nouvelles lignes de logs
     }
 }
 